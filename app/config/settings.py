@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 from functools import lru_cache
+from typing import Dict
+import json
 import os
 
 load_dotenv()
@@ -8,6 +10,48 @@ load_dotenv()
 class GeminiSettings(BaseModel):
     api_key: str = Field(default_factory=lambda: os.getenv('GEMINI_API'))
     default_model: str = Field(default='gemini-2.5-flash')
+    # Tiered routing: small simple cases try fast_model first and escalate to default_model when its
+    # confidence is below escalation_confidence or its output is invalid. Empty fast_model disables routing.
+    fast_model: str = Field(default_factory=lambda: os.getenv("GEMINI_FAST_MODEL", ""))
+    routing_max_tokens: int = Field(default_factory=lambda: int(os.getenv("GEMINI_ROUTING_MAX_TOKENS", "1500")))
+    routing_max_lines: int = Field(default_factory=lambda: int(os.getenv("GEMINI_ROUTING_MAX_LINES", "60")))
+    escalation_confidence: int = Field(default_factory=lambda: int(os.getenv("GEMINI_ESCALATION_CONFIDENCE", "75")))
+    max_in_flight: int = Field(default_factory=lambda: int(os.getenv("GEMINI_MAX_IN_FLIGHT", "4")))
+    call_timeout_seconds: float = Field(default_factory=lambda: float(os.getenv("GEMINI_CALL_TIMEOUT_SECONDS", "60")))
+    # Redis token bucket shared by all processes; its rate adapts between the two bounds (AIMD)
+    rate_limit_enabled: bool = Field(default_factory=lambda: os.getenv("GEMINI_RATE_LIMIT_ENABLED", "true").lower() == "true")
+    rate_limit_rps: float = Field(default_factory=lambda: float(os.getenv("GEMINI_RATE_LIMIT_RPS", "5")))
+    rate_limit_min_rps: float = Field(default_factory=lambda: float(os.getenv("GEMINI_RATE_LIMIT_MIN_RPS", "0.5")))
+    rate_limit_burst: int = Field(default_factory=lambda: int(os.getenv("GEMINI_RATE_LIMIT_BURST", "5")))
+    # Calls slower than this count as overload for the adaptive concurrency limit
+    latency_target_seconds: float = Field(default_factory=lambda: float(os.getenv("GEMINI_LATENCY_TARGET_SECONDS", "30")))
+    response_cache_ttl_seconds: int = Field(default_factory=lambda: int(os.getenv("GEMINI_RESPONSE_CACHE_TTL", "86400")))
+    # Claim details above max_prompt_tokens are summarized chunk by chunk before the decision prompt
+    max_prompt_tokens: int = Field(default_factory=lambda: int(os.getenv("GEMINI_MAX_PROMPT_TOKENS", "100000")))
+    chunk_tokens: int = Field(default_factory=lambda: int(os.getenv("GEMINI_CHUNK_TOKENS", "20000")))
+    summary_concurrency: int = Field(default_factory=lambda: int(os.getenv("GEMINI_SUMMARY_CONCURRENCY", "4")))
+    chunk_summary_cache_ttl_seconds: int = Field(default_factory=lambda: int(os.getenv("GEMINI_CHUNK_SUMMARY_CACHE_TTL", "604800")))
+    # Static system instruction uploaded once as a Gemini cached content, shared by workers through Redis.
+    # Off by default: the instruction is below the minimum cacheable size of the current models
+    context_cache_enabled: bool = Field(default_factory=lambda: os.getenv("GEMINI_CONTEXT_CACHE_ENABLED", "false").lower() == "true")
+    context_cache_ttl_seconds: int = Field(default_factory=lambda: int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600")))
+    # Opt-in packing of small bulk-history cases into one request; sizes are in batch_size_unit ("tokens" or "chars")
+    batch_enabled: bool = Field(default_factory=lambda: os.getenv("GEMINI_BATCH_ENABLED", "false").lower() == "true")
+    batch_size_unit: str = Field(default_factory=lambda: os.getenv("GEMINI_BATCH_SIZE_UNIT", "tokens"))
+    batch_max_size: int = Field(default_factory=lambda: int(os.getenv("GEMINI_BATCH_MAX_SIZE", "16000")))
+    batch_case_max_size: int = Field(default_factory=lambda: int(os.getenv("GEMINI_BATCH_CASE_MAX_SIZE", "2000")))
+    batch_max_cases: int = Field(default_factory=lambda: int(os.getenv("GEMINI_BATCH_MAX_CASES", "8")))
+    batch_linger_ms: int = Field(default_factory=lambda: int(os.getenv("GEMINI_BATCH_LINGER_MS", "50")))
+    # Circuit breaker: after circuit_failure_threshold consecutive failed or over-budget calls, model work
+    # fails fast for circuit_open_seconds, then one probe call decides whether to close it again.
+    # circuit_open_action: "review" answers REVIEW_REQUIRED flagged MODEL_UNAVAILABLE, "defer" re-queues the case.
+    circuit_enabled: bool = Field(default_factory=lambda: os.getenv("GEMINI_CIRCUIT_ENABLED", "true").lower() == "true")
+    circuit_failure_threshold: int = Field(default_factory=lambda: int(os.getenv("GEMINI_CIRCUIT_FAILURE_THRESHOLD", "5")))
+    circuit_open_seconds: float = Field(default_factory=lambda: float(os.getenv("GEMINI_CIRCUIT_OPEN_SECONDS", "30")))
+    circuit_latency_budget_seconds: float = Field(default_factory=lambda: float(os.getenv("GEMINI_CIRCUIT_LATENCY_BUDGET_SECONDS", "45")))
+    circuit_open_action: str = Field(default_factory=lambda: os.getenv("GEMINI_CIRCUIT_OPEN_ACTION", "review"))
+    # A case deferred this many times in a row gets the "review" answer instead of another re-run
+    circuit_max_deferrals: int = Field(default_factory=lambda: int(os.getenv("GEMINI_CIRCUIT_MAX_DEFERRALS", "5")))
     
 
 class EmailSettings(BaseModel):
@@ -35,6 +79,39 @@ class RedisSetting(BaseModel):
     host: str = Field(default_factory=lambda: os.getenv("REDIS_HOST"))
     password: str = Field(default_factory=lambda: os.getenv("REDIS_PASSWORD"))
     port: str = Field(default_factory=lambda: os.getenv("REDIS_PORT"))
+    metadata_cache_ttl: int = Field(default_factory=lambda: int(os.getenv("METADATA_CACHE_TTL", "300")))
+
+
+class PrescreenSettings(BaseModel):
+    rules_path: str = Field(default_factory=lambda: os.getenv(
+        "PRESCREEN_RULES_PATH", os.path.join(os.path.dirname(__file__), "prescreen_rules.json")
+    ))
+    reload_interval_seconds: float = Field(default_factory=lambda: float(os.getenv("PRESCREEN_RELOAD_INTERVAL_SECONDS", "5")))
+
+
+class TaskSettings(BaseModel):
+    # background task records in Redis expire this long after their last update
+    registry_ttl_seconds: int = Field(default_factory=lambda: int(os.getenv("TASK_REGISTRY_TTL_SECONDS", "86400")))
+    # In-process runner: total slots, tenant weights for fair queuing ({"tenant_id": 2.0}),
+    # default per-tenant slot cap (0 = none) and per-tenant overrides ({"tenant_id": 1})
+    concurrency: int = Field(default_factory=lambda: int(os.getenv("TASK_CONCURRENCY", "3")))
+    tenant_weights: Dict[str, float] = Field(default_factory=lambda: json.loads(os.getenv("TASK_TENANT_WEIGHTS", "{}")))
+    tenant_max_concurrency: int = Field(default_factory=lambda: int(os.getenv("TASK_TENANT_MAX_CONCURRENCY", "0")))
+    tenant_caps: Dict[str, int] = Field(default_factory=lambda: json.loads(os.getenv("TASK_TENANT_CAPS", "{}")))
+    # Adaptive slot limit (AIMD) between the bounds, backing off when a stage of case processing
+    # fails or exceeds its latency target in seconds; TASK_CONCURRENCY is the starting point
+    adaptive_concurrency: bool = Field(default_factory=lambda: os.getenv("TASK_ADAPTIVE_CONCURRENCY", "true").lower() == "true")
+    concurrency_min: int = Field(default_factory=lambda: int(os.getenv("TASK_CONCURRENCY_MIN", "1")))
+    concurrency_max: int = Field(default_factory=lambda: int(os.getenv("TASK_CONCURRENCY_MAX", "16")))
+    stage_latency_targets: Dict[str, float] = Field(default_factory=lambda: json.loads(os.getenv(
+        "TASK_STAGE_LATENCY_TARGETS", '{"model": 90, "save": 20, "case": 120}'
+    )))
+    # Bulk history pipeline: workers per stage (the model stage runs under the slot limit above),
+    # PDF parsing in a process pool of pipeline_extract_workers (0: threads), items queued per stage
+    pipeline_fetch_concurrency: int = Field(default_factory=lambda: int(os.getenv("TASK_PIPELINE_FETCH_CONCURRENCY", "8")))
+    pipeline_extract_workers: int = Field(default_factory=lambda: int(os.getenv("TASK_PIPELINE_EXTRACT_WORKERS", str(os.cpu_count() or 2))))
+    pipeline_persist_concurrency: int = Field(default_factory=lambda: int(os.getenv("TASK_PIPELINE_PERSIST_CONCURRENCY", "2")))
+    pipeline_queue_size: int = Field(default_factory=lambda: int(os.getenv("TASK_PIPELINE_QUEUE_SIZE", "16")))
 
 
 class Settings(BaseModel):
@@ -44,6 +121,8 @@ class Settings(BaseModel):
     supabase: SupabaseSetting = Field(default_factory=SupabaseSetting)
     s3: S3Settings = Field(default_factory=S3Settings)
     redis: RedisSetting = Field(default_factory=RedisSetting)
+    prescreen: PrescreenSettings = Field(default_factory=PrescreenSettings)
+    tasks: TaskSettings = Field(default_factory=TaskSettings)
 
 
 @lru_cache
@@ -55,26 +134,46 @@ def get_settings() -> Settings:
         return {"error": e}
         
 
-def get_prompt(details: str):
+# Bump whenever the prompt text changes so cached model responses are not reused
+PROMPT_VERSION = "2024-claims-v2"
+
+# Same for the chunk summary prompt and its cached summaries
+CHUNK_SUMMARY_PROMPT_VERSION = "2024-chunk-summary-v1"
+
+
+def get_chunk_summary_prompt(chunk: str):
     prompt = f"""
-        You are an AI insurance claims analyst with expertise in fraud detection, policy compliance, and risk assessment. Analyze the following insurance claim and provide a comprehensive decision.
+        You are assisting an insurance claims analyst. The claim packet is too large to review at once,
+        so you are given one part of it. Summarize this part for the analyst who will make the final decision.
 
-        **IMPORTANT:**
-        - If CLAIM DETAILS is empty or missing, respond ONLY with the JSON object below, using:
-            - "decision": "REVIEW_REQUIRED"
-            - "reasoning": "No claim details or supporting documentation were provided for analysis. This case requires immediate human expert intervention to gather necessary data."
-            - "confidence": 50
-            - "riskScore": "HIGH"
-            - "flags": ["MANUAL_REVIEW_REQUIRED"]
-        - Do not include any markdown formatting or code blocks.
-        - Ensure all strings are properly quoted.
-        - Use exact flag names from the list below.
-        - Keep reasoning concise but informative.
-        - Base confidence on strength of evidence and clarity of case.
+        **INSTRUCTIONS:**
+        - Respond with plain text only, no markdown formatting or code blocks.
+        - Keep every fact relevant to the claim: parties, dates, amounts, policy numbers, coverage terms,
+          incident description, injuries or damage, evidence (police, medical, fire department, witnesses, video).
+        - Quote any inconsistencies, missing documentation or possible fraud indicators explicitly.
+        - Do not make a decision and do not speculate beyond the text.
+        - Stay under 400 words.
 
-        **CLAIM DETAILS:**
-        {details}
+        **CLAIM PACKET PART:**
+        {chunk}
+    """
+    return prompt
 
+
+# Output vocabulary of the claim prompts, enforced by the Validator
+DECISIONS = ("APPROVED", "REJECTED", "REVIEW_REQUIRED")
+RISK_SCORES = ("LOW", "MEDIUM", "HIGH")
+KNOWN_FLAGS = (
+    "FRAUD_INDICATORS", "PATTERN_SUSPICIOUS", "DOCUMENTATION_INCONSISTENT",
+    "MANUAL_REVIEW_REQUIRED", "STANDARD_PROCESSING", "EXPEDITED_REVIEW",
+    "POLICE_REPORT_AVAILABLE", "MEDICAL_VERIFIED", "WITNESS_AVAILABLE", "VIDEO_EVIDENCE",
+    "HIGH_VALUE_CLAIM", "REPEAT_CLAIMANT", "POLICY_RECENT",
+    "THIRD_PARTY_LIABILITY", "FIRE_DEPT_VERIFIED", "COVERAGE_ADEQUATE",
+)
+
+
+# Shared by the single-claim and the multi-claim (batched) prompts
+_ANALYSIS_GUIDELINES = """\
         **ANALYSIS REQUIREMENTS:**
         Evaluate the claim based on:
         1. Claim legitimacy and supporting documentation
@@ -84,13 +183,13 @@ def get_prompt(details: str):
         5. Supporting evidence quality and consistency
 
         **OUTPUT FORMAT - RESPOND WITH EXACTLY THIS JSON STRUCTURE:**
-        {{
+        {
         "decision": "[APPROVED|REJECTED|REVIEW_REQUIRED]",
         "reasoning": "[2-3 sentence explanation of your decision, including key factors that influenced the determination]",
         "confidence": [number between 0-100 representing confidence in decision],
         "riskScore": "[LOW|MEDIUM|HIGH]",
         "flags": ["FLAG1", "FLAG2", "FLAG3"]
-        }}
+        }
 
         **DECISION CRITERIA:**
         - APPROVED: Clear legitimate claim with adequate documentation and low fraud risk
@@ -114,7 +213,66 @@ def get_prompt(details: str):
         Evidence: "POLICE_REPORT_AVAILABLE", "MEDICAL_VERIFIED", "WITNESS_AVAILABLE", "VIDEO_EVIDENCE"
         Risk: "HIGH_VALUE_CLAIM", "REPEAT_CLAIMANT", "POLICY_RECENT"
         Verification: "THIRD_PARTY_LIABILITY", "FIRE_DEPT_VERIFIED", "COVERAGE_ADEQUATE"
+"""
+
+
+# Static part of the claim prompt, identical for every case. Sent as the system instruction
+# (through a model-side context cache where available) instead of being re-rendered around each claim.
+SYSTEM_INSTRUCTION = """
+        You are an AI insurance claims analyst with expertise in fraud detection, policy compliance, and risk assessment. Analyze the insurance claim given in CLAIM DETAILS and provide a comprehensive decision.
+
+        **IMPORTANT:**
+        - If CLAIM DETAILS is empty or missing, respond ONLY with the JSON object below, using:
+            - "decision": "REVIEW_REQUIRED"
+            - "reasoning": "No claim details or supporting documentation were provided for analysis. This case requires immediate human expert intervention to gather necessary data."
+            - "confidence": 50
+            - "riskScore": "HIGH"
+            - "flags": ["MANUAL_REVIEW_REQUIRED"]
+        - Do not include any markdown formatting or code blocks.
+        - Ensure all strings are properly quoted.
+        - Use exact flag names from the list below.
+        - Keep reasoning concise but informative.
+        - Base confidence on strength of evidence and clarity of case.
+
+""" + _ANALYSIS_GUIDELINES
+
+
+def get_claim_prompt(details: str):
+    """Dynamic part of the claim prompt."""
+    prompt = f"""
+        **CLAIM DETAILS:**
+        {details}
     """
     return prompt
 
 
+
+
+def get_batch_prompt(cases: list):
+    """cases: [(case_key, details)] of small independent claims analyzed in one request."""
+    case_blocks = "\n".join(
+        f"        === BEGIN CASE {key} ===\n{details}\n        === END CASE {key} ===\n"
+        for key, details in cases
+    )
+    keys = ", ".join(f'"{key}"' for key, _ in cases)
+    prompt = f"""
+        You are an AI insurance claims analyst with expertise in fraud detection, policy compliance, and risk assessment. Analyze each of the following {len(cases)} independent insurance claims and provide a comprehensive decision for every one of them.
+
+        **IMPORTANT:**
+        - Every claim is delimited by "=== BEGIN CASE <key> ===" and "=== END CASE <key> ===".
+        - Analyze each claim on its own. Never use information from one claim when deciding another.
+        - If a claim's details are empty, its decision is "REVIEW_REQUIRED" with confidence 50, riskScore "HIGH" and flags ["MANUAL_REVIEW_REQUIRED"].
+        - Do not include any markdown formatting or code blocks.
+        - Ensure all strings are properly quoted.
+        - Use exact flag names from the list below.
+        - Keep reasoning concise but informative.
+        - Base confidence on strength of evidence and clarity of case.
+
+        **CLAIMS:**
+{case_blocks}
+{_ANALYSIS_GUIDELINES}
+        **BATCH OUTPUT FORMAT:**
+        Respond with ONE JSON object whose keys are exactly {keys} and whose values are
+        the JSON structure described above for the corresponding claim.
+    """
+    return prompt
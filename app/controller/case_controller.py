@@ -1,8 +1,14 @@
 from fastapi import UploadFile
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator
 from app.service.supabase_service import SupabaseService
 from app.service.s3_service import FileService
 from app.service.case_service import CaseService
+from app.service.metadata_cache_service import MetadataCacheService
+from app.utils.pagination import encode_cursor
+from app.utils.sse import format_sse
+
+CASE_COLUMNS = ("id", "case_name", "is_active")
+DEFAULT_CASE_COLUMNS = "id, case_name"
 
 # This controller include the logic of the route
 class CaseControllerV2():
@@ -10,14 +16,41 @@ class CaseControllerV2():
         self.sp_service = SupabaseService()
         self.case_service = CaseService()
         self.file_service =  FileService()
+        self.metadata_cache = MetadataCacheService()
+
+    async def get_cases(
+        self,
+        limit: int,
+        after_id: Optional[str] = None,
+        columns: str = DEFAULT_CASE_COLUMNS
+    ) -> Dict[str, Any]:
+        # return {"items": List[{id:..., case_name:...}], "next_cursor": ...}
+        async def load_page() -> Dict[str, Any]:
+            rows, has_more = await self.sp_service.get_page(
+                table_name="case",
+                columns=columns,
+                limit=limit,
+                after_id=after_id,
+                filters={"is_active": True}
+            )
+            if rows is None:
+                return {"items": [], "next_cursor": None, "error": "Failed to fetch cases"}
+
+            next_cursor = encode_cursor(rows[-1]["id"]) if has_more and rows else None
+            return {"items": rows, "next_cursor": next_cursor}
 
-    async def get_cases(self) -> List[Dict[str, Any]]:
-        # return List[{id:..., case_name:...}]
         try:
-            case_list = await self.sp_service.get_all_name_id(table_name="case")
-            return case_list
+            return await self.metadata_cache.read_through(
+                entity="case",
+                key=f"list:{limit}:{after_id or ''}:{columns}",
+                producer=load_page,
+                scope=MetadataCacheService.LIST_SCOPE
+            )
         except Exception as e:
-            return []
+            return {"items": [], "next_cursor": None, "error": str(e)}
+
+    def export_cases(self, columns: str = DEFAULT_CASE_COLUMNS) -> AsyncIterator[Dict[str, Any]]:
+        return self.sp_service.stream_all(table_name="case", columns=columns, filters={"is_active": True})
 
     async def get_latest_response(self, case_id: str) -> Dict[str, Any]:
         try:
@@ -46,6 +79,7 @@ class CaseControllerV2():
                 case_id = case_row["id"] if case_row and "id" in case_row else None
                 if not case_id:
                     return {"success": False, "error": "Failed to create case."}
+                await self.metadata_cache.invalidate("case", MetadataCacheService.LIST_SCOPE)
 
             await self.case_service.save_manual_and_files(case_id=case_id, case_name=case_name, manual_inputs=manual_inputs, files=files, response_data_id=None)
 
@@ -59,6 +93,7 @@ class CaseControllerV2():
             case_id = case_row["id"] if case_row and "id" in case_row else None
             if not case_id:
                 return {"success": False, "error": "Failed to update case."}
+            await self.metadata_cache.invalidate("case", case_id, MetadataCacheService.LIST_SCOPE)
             return {"success": True, "case_id": case_id, "case_name": new_case_name}
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -74,6 +109,10 @@ class CaseControllerV2():
                     results.append({"case_id": case_id, "success": False, "error": "Failed to update case."})
                 else:
                     results.append({"case_id": case_id_returned, "success": True, "is_active": False})
+
+            deleted_ids = [r["case_id"] for r in results if r["success"]]
+            if deleted_ids:
+                await self.metadata_cache.invalidate("case", *deleted_ids, MetadataCacheService.LIST_SCOPE)
             return {"results": results}
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -84,7 +123,8 @@ class CaseControllerV2():
         case_id: Optional[str],
         case_name: Optional[str],
         manual_input: Optional[str],
-        files: Optional[List[UploadFile]]
+        files: Optional[List[UploadFile]],
+        force: bool = False
     ) -> Dict[str, Any]:
         try:
             '''
@@ -113,6 +153,7 @@ class CaseControllerV2():
                 # create a case
                 case_row = await self.sp_service.insert(table_name="case", object={"case_name": case_name})
                 case_id = case_row["id"] if case_row and "id" in case_row else None
+                await self.metadata_cache.invalidate("case", MetadataCacheService.LIST_SCOPE)
                 result = await self.case_service.proceed_with_model(case_id, case_name, manual_input, files)
                 return result, case_id
             
@@ -122,13 +163,59 @@ class CaseControllerV2():
                     return result, case_id
             
                 else:
-                    result = await self.case_service.proceed_with_model_history_files(case_id)
+                    result = await self.case_service.proceed_with_model_history_files(case_id, force=force)
                     return result, case_id
 
 
         except Exception as e:
             return {"success": False, "error submit one case function": str(e)}
 
+    async def submit_one_case_stream(
+        self,
+        case_id: Optional[str],
+        case_name: Optional[str],
+        manual_input: Optional[str],
+        files: Optional[List[UploadFile]],
+        force: bool = False
+    ) -> AsyncIterator[str]:
+        """
+        Streaming variant of submit_one_case. Uploads are read and a new case is created before
+        streaming starts; the returned iterator yields the server-sent events.
+        """
+        file_contents = await self.case_service.read_uploaded_files(files) if files else []
+        if not case_id or case_id == "":
+            case_row = await self.sp_service.insert(table_name="case", object={"case_name": case_name})
+            case_id = case_row["id"] if case_row and "id" in case_row else None
+            await self.metadata_cache.invalidate("case", MetadataCacheService.LIST_SCOPE)
+        return self._stream_submit(case_id, case_name, manual_input, file_contents, force)
+
+
+    async def _stream_submit(
+        self,
+        case_id: Optional[str],
+        case_name: Optional[str],
+        manual_input: Optional[str],
+        file_contents: List[Dict[str, Any]],
+        force: bool
+    ) -> AsyncIterator[str]:
+        yield format_sse("case", {"case_id": case_id})
+        try:
+            if manual_input or file_contents:
+                events = self.case_service.proceed_with_model_stream(case_id, case_name, manual_input, file_contents)
+            else:
+                events = self.case_service.proceed_with_model_history_files_stream(case_id, force=force)
+
+            async for event, data in events:
+                if event == "stage":
+                    yield format_sse("stage", {"stage": data})
+                elif event == "delta":
+                    yield format_sse("delta", {"text": data})
+                else:
+                    yield format_sse("result", {"case_id": case_id, "success": True, "result": data})
+        except Exception as e:
+            yield format_sse("error", {"case_id": case_id, "success": False, "error": str(e)})
+
+
     async def submit_bulk(self, case_ids: List[str]) -> Dict[str, Any]:
         try:
             for id in case_ids:
@@ -1,6 +1,6 @@
 import logging
 from fastapi import UploadFile, File
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, AsyncIterator
 from app.service.claim_manager_service import ClaimManagerService
 
 logger = logging.getLogger(__name__)
@@ -55,18 +55,21 @@ class ClaimManagerController:
             return False
 
 
-    async def get_all_claim(self) -> List[Dict[str, Any]]:
+    async def get_all_claim(self, limit: int, after_id: Optional[str], columns: str) -> Dict[str, Any]:
         try:
-            res = await self.claim_manager_service.get_all_claim()
-            if not res:
+            res = await self.claim_manager_service.get_all_claim(limit=limit, after_id=after_id, columns=columns)
+            if not res["items"]:
                 logger.error("Error in get_all_claim, either None or crash")
-                return []
 
             return res
 
         except Exception as e:
-            logger.error("Error in get_all_claim", str(e), exc_info=True)
-            return []
+            logger.error("Error in get_all_claim: %s", str(e), exc_info=True)
+            return {"items": [], "next_cursor": None}
+
+
+    def export_claims(self, columns: str) -> AsyncIterator[Dict[str, Any]]:
+        return self.claim_manager_service.export_claims(columns=columns)
 
 
     async def update_claim_name(self, id: str, new_name: str) -> bool:
@@ -1,19 +1,44 @@
 from typing import List, Dict, Any
 from app.service.supabase_service import SupabaseService
 from app.service.s3_service import FileService
+from app.service.metadata_cache_service import MetadataCacheService
 
 
 class FileController:
     def __init__(self):
         self.sp_service = SupabaseService()
         self.file_service = FileService()
+        self.metadata_cache = MetadataCacheService()
 
 
     async def get_case_files_links_supabase(self, case_id: str) -> List[Dict[str, Any]]:
         try:
-            files = await self.sp_service.get_files_by_case_id(case_id)
+            # case + active files + active responses (newest first) in one round trip,
+            # cached until a write touches the case. Presigned URLs are never cached.
+            snapshot = await self.metadata_cache.read_through(
+                entity="case",
+                key=f"{case_id}:snapshot",
+                producer=lambda: self.sp_service.get_case_snapshot(
+                    table_name="case",
+                    case_id=case_id,
+                    case_columns="id",
+                    file_columns="id, s3_link",
+                    response_columns="id, s3_link, created_at",
+                    response_limit=None
+                ),
+                scope=case_id
+            )
+            if not snapshot:
+                return []
+
             result = []
-            for file in files:
+            seen = set()
+            for file in snapshot.get("files") or []:
+                # Deduplicate by s3_link, same as get_files_by_case_id
+                if not file.get("s3_link") or file["s3_link"] in seen:
+                    continue
+                seen.add(file["s3_link"])
+
                 s3_key = file.get("s3_link", "")
                 file_id = file.get("id", "")
                 filename = s3_key.split("/")[-1]
@@ -30,8 +55,7 @@ class FileController:
                     "id": file_id
                 })
 
-            responses = await self.sp_service.get_responses_by_case_id(case_id)
-            for resp in responses:
+            for resp in snapshot.get("response") or []:
                 s3_key = resp.get("s3_link", "")
                 response_file_id = resp.get("id", "")
                 filename = s3_key.split("/")[-1]
@@ -61,6 +85,8 @@ class FileController:
                 id=file_id,
                 objects={"is_active": False}
             )
+            if isinstance(result, dict):
+                await self.metadata_cache.invalidate("case", result.get("case_id"))
             return result is not None
         except Exception as e:
             print(f"Error removing file {file_id}: {e}")
@@ -74,6 +100,8 @@ class FileController:
                 id=file_id,
                 objects={"is_active": False}
             )
+            if isinstance(result, dict):
+                await self.metadata_cache.invalidate("case", result.get("case_id"))
             return result is not None
         except Exception as e:
             print(f"Error removing response {file_id}: {e}")
@@ -1,6 +1,6 @@
 import logging
 from app.service.tenant_service import TenantService
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, AsyncIterator
 
 logger = logging.getLogger(__name__)
 
@@ -17,14 +17,17 @@ class TenantController():
             logger.error("Tenant Controller Error - create_new_tenant for name: %s - %s", name, str(e), exc_info=True)
             return False
 
-    async def get_all_tenants(self) -> List[Dict[str, Any]]:
+    async def get_all_tenants(self, limit: int, after_id: Optional[str], columns: str) -> Dict[str, Any]:
         try:
-            res = await self.tenant_service.get_all_tenants()
+            res = await self.tenant_service.get_all_tenants(limit=limit, after_id=after_id, columns=columns)
             return res
 
         except Exception as e:
             logger.error("Tenant Controller Error - get_all_tenants - %s", str(e), exc_info=True)
-            return []
+            return {"items": [], "next_cursor": None}
+
+    def export_tenants(self, columns: str) -> AsyncIterator[Dict[str, Any]]:
+        return self.tenant_service.export_tenants(columns=columns)
         
     async def get_tenant(self, id: str) -> Dict[str, Any]:
         try:
@@ -4,6 +4,7 @@ from app.routes.email_routes import create_email_route
 from app.routes.case_routes import create_case_route
 from app.routes.tenant_routes import create_tenant_routes
 from app.routes.claim_manager_route import create_claim_manager_routes
+from app.routes.metrics_routes import create_metrics_route
 from app.config.security import security_setting
 from app.config.dependencies import require_api_key
 
@@ -23,6 +24,7 @@ def create_application() -> FastAPI:
         app.include_router(create_case_route(), dependencies=[Depends(require_api_key)])
         app.include_router(create_tenant_routes(), dependencies=[Depends(require_api_key)])
         app.include_router(create_claim_manager_routes(), dependencies=[Depends(require_api_key)])
+        app.include_router(create_metrics_route(), dependencies=[Depends(require_api_key)])
 
         return app
 
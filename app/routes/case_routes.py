@@ -1,10 +1,15 @@
-from app.controller.case_controller import CaseControllerV2
+from app.controller.case_controller import CaseControllerV2, CASE_COLUMNS, DEFAULT_CASE_COLUMNS
 from app.controller.file_controller import FileController
-from app.service.task_service import get_task_status, get_tasks_status, submit_case_history
+from app.service.task_service import (
+    get_task_status, get_tasks_status, submit_case_history_bulk, watch_tasks,
+    get_job_status, get_job_failures, watch_job, get_scheduler_stats
+)
 from app.schema.schema import BulkSubmitRequest, BulkTaskStatusRequest
-from typing import List, Dict, Any
-from fastapi.responses import JSONResponse
-from fastapi import APIRouter, UploadFile, File, Form, Body
+from app.utils.pagination import decode_cursor, encode_cursor, clamp_limit, resolve_columns, to_ndjson, DEFAULT_PAGE_SIZE
+from app.utils.sse import SSE_HEADERS, format_sse
+from typing import List, Dict, Any, Optional
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import APIRouter, UploadFile, File, Form, Body, Query
 
 case_controller_v2 = CaseControllerV2()
 file_controller = FileController()
@@ -16,17 +21,42 @@ def create_case_route() -> APIRouter:
 
 
     @router.get("/")
-    async def get_all_cases():
+    async def get_all_cases(
+        limit: int = Query(DEFAULT_PAGE_SIZE),
+        cursor: Optional[str] = Query(None),
+        columns: Optional[str] = Query(None),
+    ):
+        """
+        Keyset paginated. Pass the returned next_cursor back as ?cursor= for the next page.
+        """
         try:
-            result = await case_controller_v2.get_cases()
-            if result: 
-                return JSONResponse({"result": result, "success": True, "count": len(result)}, status_code=200)
-            return JSONResponse({"result": result, "success": True, "count": len(result)}, status_code=500)
+            after_id = decode_cursor(cursor)
+            selected = resolve_columns(columns, CASE_COLUMNS, DEFAULT_CASE_COLUMNS)
+        except ValueError as e:
+            return JSONResponse({"success": False, "result": [], "error": str(e)}, status_code=400)
+
+        try:
+            page = await case_controller_v2.get_cases(limit=clamp_limit(limit), after_id=after_id, columns=selected)
+            result = page["items"]
+            if "error" in page:
+                return JSONResponse({"result": result, "success": False, "count": len(result), "error": page["error"]}, status_code=500)
+            return JSONResponse({"result": result, "success": True, "count": len(result), "next_cursor": page["next_cursor"]}, status_code=200)
         
         except Exception as e:
             return JSONResponse({"success": False, "result": [], "error": str(e)}, status_code=500)
 
 
+    @router.get("/export")
+    async def export_cases(columns: Optional[str] = Query(None)):
+        """Stream every active case as NDJSON, one row per line."""
+        try:
+            selected = resolve_columns(columns, CASE_COLUMNS, DEFAULT_CASE_COLUMNS)
+        except ValueError as e:
+            return JSONResponse({"success": False, "error": str(e)}, status_code=400)
+
+        return StreamingResponse(to_ndjson(case_controller_v2.export_cases(columns=selected)), media_type="application/x-ndjson")
+
+
     @router.get("/{case_id}")
     async def case_data(case_id: str):
         try:
@@ -77,18 +107,44 @@ def create_case_route() -> APIRouter:
         case_name: str = Form(None),
         manual_input: str = Form(None),
         files: List[UploadFile] = File(None),
+        force: bool = Form(False),
     ):
         try:
             result, case_id = await case_controller_v2.submit_one_case(
                 case_id=case_id,
                 case_name=case_name,
                 manual_input=manual_input,
-                files=files)
+                files=files,
+                force=force)
             return JSONResponse({"case_id": case_id,"success": True, "result": result}, status_code=200)
         except Exception as e:
             return JSONResponse({"success": False, "error": str(e)}, status_code=500)
 
 
+    @router.post("/submit/stream")
+    async def submit_one_case_stream(
+        case_id: str = Form(None),
+        case_name: str = Form(None),
+        manual_input: str = Form(None),
+        files: List[UploadFile] = File(None),
+        force: bool = Form(False),
+    ):
+        """
+        Same as /submit, as server-sent events:
+        case -> stage (extracting, prompting, generating, validating, saving) / delta (model output) -> result or error.
+        """
+        try:
+            events = await case_controller_v2.submit_one_case_stream(
+                case_id=case_id,
+                case_name=case_name,
+                manual_input=manual_input,
+                files=files,
+                force=force)
+            return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+        except Exception as e:
+            return JSONResponse({"success": False, "error": str(e)}, status_code=500)
+
+
     # @router.post("/submit/bulk")
     # async def submit_bulk(case_ids: List[str]):
     #     try:
@@ -103,18 +159,59 @@ def create_case_route() -> APIRouter:
     @router.post("/v2/submit/bulk", status_code=202)
     async def submit_bulk_v2(req: BulkSubmitRequest):
         """
-        Body: { "case_ids": ["id1","id2",...] }
-        Enqueues in-process background jobs and returns their IDs.
+        Body: { "case_ids": ["id1","id2",...], "force": false, "priority": "bulk" }
+        Unless force is true, cases whose files are unchanged since their latest response are not re-analyzed.
+        priority is one of high, normal, bulk; tenants share the runner fairly within a priority.
+        Enqueues one in-process bulk job and returns its ID (for /jobs/{job_id}) and the per-case task IDs.
         """
         case_ids = req.case_ids
         if not case_ids:
             return JSONResponse({"success": False, "error": "case_ids required"}, status_code=400)
 
-        accepted = []
-        for cid in case_ids:
-            task_id = submit_case_history(str(cid))
-            accepted.append({"case_id": str(cid), "task_id": task_id})
-        return JSONResponse({"success": True, "accepted": accepted}, status_code=202)
+        try:
+            job = submit_case_history_bulk([str(cid) for cid in case_ids], force=req.force, priority=req.priority)
+        except ValueError as e:
+            return JSONResponse({"success": False, "error": str(e)}, status_code=400)
+        return JSONResponse({"success": True, "job_id": job["job_id"], "accepted": job["accepted"]}, status_code=202)
+
+
+    @router.get("/jobs/{job_id}")
+    async def get_bulk_job(job_id: str):
+        """Aggregate progress of a bulk job: counters per state, throughput and ETA."""
+        status = get_job_status(job_id)
+        if status["state"] == "NOT_FOUND":
+            return JSONResponse({"success": False, "error": "Job not found"}, status_code=404)
+        return {"success": True, "result": status}
+
+
+    @router.get("/jobs/{job_id}/failures")
+    async def get_bulk_job_failures(
+        job_id: str,
+        limit: int = Query(DEFAULT_PAGE_SIZE),
+        cursor: Optional[str] = Query(None),
+    ):
+        """Failed cases of a bulk job in failure order. Pass the returned next_cursor back as ?cursor=."""
+        try:
+            offset = int(decode_cursor(cursor) or 0)
+        except ValueError:
+            return JSONResponse({"success": False, "result": [], "error": "Invalid cursor"}, status_code=400)
+
+        page = get_job_failures(job_id, offset, clamp_limit(limit))
+        next_cursor = encode_cursor(str(page["next_offset"])) if page["next_offset"] is not None else None
+        return {"success": True, "result": page["items"], "count": len(page["items"]), "total": page["total"], "next_cursor": next_cursor}
+
+
+    @router.get("/jobs/{job_id}/events")
+    async def stream_bulk_job_events(job_id: str):
+        """A bulk job as server-sent events: job (aggregate status) / update (task transitions) / ping -> end."""
+        async def events():
+            try:
+                async for event, data in watch_job(job_id):
+                    yield format_sse(event, data)
+            except Exception as e:
+                yield format_sse("error", {"success": False, "error": str(e)})
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
 
     # @router.get("/tasks/{task_id}")
     # async def get_celery_task(task_id: str):
@@ -132,6 +229,32 @@ def create_case_route() -> APIRouter:
         return {"results": get_tasks_status(task_ids)}
 
 
+    @router.get("/tasks/queues")
+    async def get_task_queues():
+        """Slots in use and queued/running tasks per tenant of the background runner (this worker)."""
+        return {"success": True, "result": get_scheduler_stats()}
+
+
+    @router.get("/tasks/events")
+    async def stream_task_events(task_ids: str = Query(...)):
+        """
+        ?task_ids=id1,id2,... as server-sent events, instead of polling /tasks/status:
+        task (current status of each) -> update (state transitions, from any worker) / ping -> end.
+        """
+        ids = [tid for tid in (t.strip() for t in task_ids.split(",")) if tid]
+        if not ids:
+            return JSONResponse({"success": False, "error": "task_ids required"}, status_code=400)
+
+        async def events():
+            try:
+                async for event, data in watch_tasks(ids):
+                    yield format_sse(event, data)
+            except Exception as e:
+                yield format_sse("error", {"success": False, "error": str(e)})
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
     @router.put("/")
     async def update_case(
         case_id: str = Form(...),
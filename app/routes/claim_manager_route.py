@@ -1,8 +1,10 @@
 from fastapi import APIRouter
-from fastapi.responses import JSONResponse
-from fastapi import APIRouter, UploadFile, File, Form
-from typing import List
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import APIRouter, UploadFile, File, Form, Query
+from typing import List, Optional
 from app.controller.claim_manager_controller import ClaimManagerController
+from app.service.claim_manager_service import CLAIM_COLUMNS, DEFAULT_CLAIM_COLUMNS
+from app.utils.pagination import decode_cursor, clamp_limit, resolve_columns, to_ndjson, DEFAULT_PAGE_SIZE
 
 
 claim_manager_controller = ClaimManagerController()
@@ -35,6 +37,17 @@ def create_claim_manager_routes() -> APIRouter:
             return JSONResponse({"success": False, "error": e}, status_code=500) 
 
     
+    @router.get("/export")
+    async def export_claims(columns: Optional[str] = Query(None)):
+        """Stream every claim as NDJSON, one row per line."""
+        try:
+            selected = resolve_columns(columns, CLAIM_COLUMNS, DEFAULT_CLAIM_COLUMNS)
+        except ValueError as e:
+            return JSONResponse({"success": False, "error": str(e)}, status_code=400)
+
+        return StreamingResponse(to_ndjson(claim_manager_controller.export_claims(columns=selected)), media_type="application/x-ndjson")
+
+
     @router.get("/{id}")
     async def get_claim_by_id(id: str):
         try:
@@ -49,13 +62,23 @@ def create_claim_manager_routes() -> APIRouter:
 
 
     @router.get("/")
-    async def get_all_claim():
+    async def get_all_claim(
+        limit: int = Query(DEFAULT_PAGE_SIZE),
+        cursor: Optional[str] = Query(None),
+        columns: Optional[str] = Query(None),
+    ):
         try:
-            res = await claim_manager_controller.get_all_claim()
-            if not res:
+            after_id = decode_cursor(cursor)
+            selected = resolve_columns(columns, CLAIM_COLUMNS, DEFAULT_CLAIM_COLUMNS)
+        except ValueError as e:
+            return JSONResponse({"success": False, "result": [], "error": str(e)}, status_code=400)
+
+        try:
+            res = await claim_manager_controller.get_all_claim(limit=clamp_limit(limit), after_id=after_id, columns=selected)
+            if not res["items"]:
                 return JSONResponse({"success": False, "result": [], "error": "get_all_claim"}, status_code=500) 
 
-            return JSONResponse({"success": True, "result": res}, status_code=200)
+            return JSONResponse({"success": True, "result": res["items"], "next_cursor": res["next_cursor"]}, status_code=200)
 
         except Exception as e:
             return JSONResponse({"success": False, "result": [], "error": e}, status_code=500) 
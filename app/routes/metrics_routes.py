@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.utils.metrics import metrics
+
+
+def create_metrics_route() -> APIRouter:
+    router = APIRouter(
+        prefix="/metrics"
+    )
+
+    @router.get("/")
+    async def get_metrics():
+        """Prometheus text format for this process."""
+        return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    return router
@@ -1,7 +1,10 @@
-from fastapi import APIRouter
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Optional
 from app.schema.schema import TenantCreationRequest
 from app.controller.tenant_controller import TenantController
+from app.service.tenant_service import TENANT_COLUMNS, DEFAULT_TENANT_COLUMNS
+from app.utils.pagination import decode_cursor, clamp_limit, resolve_columns, to_ndjson, DEFAULT_PAGE_SIZE
 
 
 tenant_controller = TenantController()
@@ -25,17 +28,38 @@ def create_tenant_routes() -> APIRouter:
 
     
     @router.get("/")
-    async def get_all_tenants():
+    async def get_all_tenants(
+        limit: int = Query(DEFAULT_PAGE_SIZE),
+        cursor: Optional[str] = Query(None),
+        columns: Optional[str] = Query(None),
+    ):
         try:
-            res = await tenant_controller.get_all_tenants()
-            if not res:
+            after_id = decode_cursor(cursor)
+            selected = resolve_columns(columns, TENANT_COLUMNS, DEFAULT_TENANT_COLUMNS)
+        except ValueError as e:
+            return JSONResponse({"success": False, "result": [], "error": str(e)}, status_code=400)
+
+        try:
+            res = await tenant_controller.get_all_tenants(limit=clamp_limit(limit), after_id=after_id, columns=selected)
+            if not res["items"]:
                 return JSONResponse({"success": False, "result": [], "error": "get_all_tenants"}, status_code=500) 
 
-            return JSONResponse({"success": True, "result": res}, status_code=200)
+            return JSONResponse({"success": True, "result": res["items"], "next_cursor": res["next_cursor"]}, status_code=200)
         except Exception as e:
             return JSONResponse({"success": False, "result": [], "error": e}, status_code=500) 
 
 
+    @router.get("/export")
+    async def export_tenants(columns: Optional[str] = Query(None)):
+        """Stream every tenant as NDJSON, one row per line."""
+        try:
+            selected = resolve_columns(columns, TENANT_COLUMNS, DEFAULT_TENANT_COLUMNS)
+        except ValueError as e:
+            return JSONResponse({"success": False, "error": str(e)}, status_code=400)
+
+        return StreamingResponse(to_ndjson(tenant_controller.export_tenants(columns=selected)), media_type="application/x-ndjson")
+
+
     @router.get("/{id}")
     async def get_tenant(id: str):
         try:
@@ -17,6 +17,8 @@ class CaseSubmission(BaseModel):
 
 class BulkSubmitRequest(BaseModel):
     case_ids: List[str]
+    force: bool = False
+    priority: str = "bulk"
 
 class BulkTaskStatusRequest(BaseModel):
     task_ids: List[str]
@@ -63,6 +63,12 @@ class CachingService():
             return 0
         return int(self.redis.delete(*keys))
 
+    async def incr(self, key: str, ttl_seconds: Optional[int] = None) -> int:
+        value = int(self.redis.incr(key))
+        if ttl_seconds is not None:
+            self.redis.expire(name=key, time=ttl_seconds)
+        return value
+
     async def exists(self, key: str) -> bool:
         return bool(self.redis.exists(key))
 
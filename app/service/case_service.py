@@ -1,8 +1,20 @@
 from app.service.supabase_service import SupabaseService
-from app.service.s3_service import FileService
+from app.service.s3_service import FileService, join_documents, pdf_text_from_bytes
 from app.service.model_service import ModelService
-from typing import List, Optional, Dict, Any
+from app.service.metadata_cache_service import MetadataCacheService
+from app.utils.metrics import metrics
+from app.utils.call_recorder import record_model_calls
+from app.service.circuit_breaker import is_deferred, is_model_unavailable, model_unavailable_result
+from app.config.settings import get_settings
+from app.service.task_registry import get_task_registry
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator
 from fastapi import UploadFile
+from datetime import datetime, timezone
+from concurrent.futures import Executor
+import asyncio
+import hashlib
+import math
+import uuid
 
 
 class CaseService:
@@ -10,6 +22,7 @@ class CaseService:
         self.sp_service = SupabaseService()
         self.file_service = FileService()
         self.model_service = ModelService()
+        self.metadata_cache = MetadataCacheService()
 
         
     async def save_manual_input(
@@ -119,13 +132,20 @@ class CaseService:
         # Bulk insert new files
         if files_to_insert:
             await self.sp_service.insert_bulk(table_name="files", objects=files_to_insert)
+            await self.metadata_cache.invalidate("case", case_id)
     
 
     async def proceed_with_model(self, case_id: str, case_name: str, manual_input: str, files: Optional[List[UploadFile]]):
         # Now much simpler and testable
-        file_contents = await self._read_uploaded_files(files) if files else []
-        response = await self.model_service.generate_response_v2(file_contents, manual_input or "")
-        response_data_id = await self._save_model_response(response, case_id)
+        file_contents = await self.read_uploaded_files(files) if files else []
+        with record_model_calls(case_id=case_id) as recorder:
+            response = await self.model_service.generate_response_v2(file_contents, manual_input or "")
+        response_data_id = None
+        if is_deferred(response):
+            # the files are still saved below, so the deferred history run has the case's inputs
+            self.defer_history_run(case_id, response["retry_after_seconds"])
+        else:
+            response_data_id = await self._save_model_response(response, case_id, model_metrics=recorder.summary())
         
         await self.save_manual_and_files(
             case_id=case_id, case_name=case_name, manual_inputs=manual_input,
@@ -134,26 +154,45 @@ class CaseService:
         return response
     
 
-    async def proceed_with_model_history_files(self, case_id: str):
+    async def proceed_with_model_history_files(self, case_id: str, force: bool = False, deferral: int = 0):
         """
         Generate model response using previously uploaded files for a case.
         Uses cached PDF text and aggregates with manual input.
+        Unless force is set, returns the latest response unchanged when the case's files
+        (ids, s3 keys, ETags) are the same as when it was produced.
+        deferral counts the deferred runs that led to this one; a deferred answer carries the
+        "deferred_task_id" of the next run, until circuit_max_deferrals is reached and the case
+        gets the MODEL_UNAVAILABLE review answer instead.
         """
-        # Get file metadata from Supabase
-        files_metadata = await self.sp_service.get_files_by_case_id(case_id)
-        
-        # Aggregate content from existing files
-        manual_input, aggregated_details = await self._aggregate_file_contents_from_metadata(files_metadata)
+        # Get file metadata from Supabase (cached until the case's files change)
+        files_metadata = await self.metadata_cache.read_through(
+            entity="case",
+            key=f"{case_id}:files",
+            producer=lambda: self.sp_service.get_files_by_case_id(case_id),
+            scope=case_id
+        ) or []
+
+        input_fingerprint = await self.compute_input_fingerprint(case_id, files_metadata)
+        if not force:
+            latest = (await self.sp_service.get_latest_responses_by_case_ids([case_id])).get(case_id)
+            unchanged = await self.get_unchanged_response(latest, input_fingerprint)
+            if unchanged is not None:
+                return unchanged
         
-        # Generate model response using aggregated content
-        combined_input = f"{manual_input}{aggregated_details}"
-        response = await self.model_service.generate_response_v2(
-            file_contents=[],  # No new files to parse
-            manual_input=combined_input
-        )
+        with record_model_calls(case_id=case_id, tenant_id=self.history_tenant_id(files_metadata)) as recorder:
+            response = await self.analyze_history_files(files_metadata)
+        if is_deferred(response):
+            if deferral < get_settings().gemini.circuit_max_deferrals:
+                task_id = self.defer_history_run(case_id, response["retry_after_seconds"], deferral + 1)
+                return {**response, "deferred_task_id": task_id}
+            # the model stayed down through every re-run: leave the case to a reviewer
+            metrics.incr("model_deferrals_exhausted_total")
+            response = model_unavailable_result("review", 0)
         
         # Save the response
-        response_data_id = await self._save_model_response(response, case_id)
+        response_data_id = await self._save_model_response(
+            response, case_id, input_fingerprint=input_fingerprint, model_metrics=recorder.summary()
+        )
         
         # Link existing files to this new response
         if response_data_id:
@@ -162,9 +201,266 @@ class CaseService:
         return response
 
 
+    async def proceed_with_model_stream(
+        self,
+        case_id: str,
+        case_name: str,
+        manual_input: str,
+        file_contents: List[Dict[str, Any]]
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streaming proceed_with_model. Takes already read uploads, since the request's files are
+        closed once the streaming response starts. Yields ("stage", name), ("delta", text)
+        and finally ("result", response) after everything is saved.
+        """
+        yield "stage", "extracting"
+        details, extraction_failed = await self.model_service.extract_details(file_contents, manual_input or "")
+
+        response = None
+        with record_model_calls(case_id=case_id) as recorder:
+            async for event, data in self.model_service.generate_stream(details, extraction_failed=extraction_failed):
+                if event == "result":
+                    response = data
+                else:
+                    yield event, data
+
+        yield "stage", "saving"
+        response_data_id = None
+        if is_deferred(response):
+            self.defer_history_run(case_id, response["retry_after_seconds"])
+        else:
+            response_data_id = await self._save_model_response(response, case_id, model_metrics=recorder.summary())
+        await self.save_manual_and_files(
+            case_id=case_id, case_name=case_name, manual_inputs=manual_input,
+            files=None, response_data_id=response_data_id, file_contents=file_contents
+        )
+        yield "result", response
+
+
+    async def proceed_with_model_history_files_stream(self, case_id: str, force: bool = False) -> AsyncIterator[Tuple[str, Any]]:
+        """Streaming proceed_with_model_history_files, same events as proceed_with_model_stream."""
+        yield "stage", "extracting"
+        files_metadata = await self.metadata_cache.read_through(
+            entity="case",
+            key=f"{case_id}:files",
+            producer=lambda: self.sp_service.get_files_by_case_id(case_id),
+            scope=case_id
+        ) or []
+
+        input_fingerprint = await self.compute_input_fingerprint(case_id, files_metadata)
+        if not force:
+            latest = (await self.sp_service.get_latest_responses_by_case_ids([case_id])).get(case_id)
+            unchanged = await self.get_unchanged_response(latest, input_fingerprint)
+            if unchanged is not None:
+                yield "result", unchanged
+                return
+
+        details, extraction_failed = await self.build_history_details(files_metadata)
+        tenant_id = self.history_tenant_id(files_metadata)
+        response = None
+        with record_model_calls(case_id=case_id, tenant_id=tenant_id) as recorder:
+            async for event, data in self.model_service.generate_stream(
+                details,
+                tenant_id=tenant_id,
+                extraction_failed=extraction_failed
+            ):
+                if event == "result":
+                    response = data
+                else:
+                    yield event, data
+
+        if is_deferred(response):
+            self.defer_history_run(case_id, response["retry_after_seconds"])
+            yield "result", response
+            return
+
+        yield "stage", "saving"
+        response_data_id = await self._save_model_response(
+            response, case_id, input_fingerprint=input_fingerprint, model_metrics=recorder.summary()
+        )
+        if response_data_id:
+            await self._link_existing_files_to_response(files_metadata, case_id, response_data_id)
+        yield "result", response
+
+
+    async def analyze_history_files(self, files_metadata: List[Dict]):
+        """Aggregate the content of already stored files and run the model on it. Nothing is persisted."""
+        combined_input, extraction_failed = await self.build_history_details(files_metadata)
+        return await self.analyze_history_details(files_metadata, combined_input, extraction_failed)
+
+
+    async def analyze_history_details(self, files_metadata: List[Dict], details: str, extraction_failed: bool):
+        """Run the model on history details already built from files_metadata. Nothing is persisted."""
+        return await self.model_service.generate_response_v2(
+            file_contents=[],  # No new files to parse
+            manual_input=details,
+            tenant_id=self.history_tenant_id(files_metadata),
+            extraction_failed=extraction_failed
+        )
+
+
+    async def build_history_details(self, files_metadata: List[Dict]) -> Tuple[str, bool]:
+        """
+        Claim details the model sees for a history run: manual input followed by the PDF text.
+        Also reports whether the case has PDFs but none of them yielded any text.
+        """
+        manual_input, aggregated_details = await self._aggregate_file_contents_from_metadata(files_metadata)
+        has_pdfs = any(file.get("s3_link", "").lower().endswith(".pdf") for file in files_metadata)
+        return self._compose_history_details(manual_input, [aggregated_details], has_pdfs)
+
+
+    async def fetch_history_inputs(self, files_metadata: List[Dict]) -> Dict[str, Any]:
+        """
+        I/O half of build_history_details: {"manual_input": ..., "pdfs": [...]} with, per PDF in file
+        order, {"s3_key", "text"} when its text is cached, else {"s3_key", "content"} (raw bytes).
+        """
+        manual_input = ""
+        pdfs: List[Dict[str, Any]] = []
+        for file in files_metadata:
+            s3_link = file.get("s3_link", "")
+            filename = s3_link.split("/")[-1].lower()
+
+            if filename.endswith(".pdf"):
+                text = await self.file_service.get_cached_pdf_text(s3_link)
+                if text is not None:
+                    pdfs.append({"s3_key": s3_link, "text": text})
+                else:
+                    pdfs.append({"s3_key": s3_link, "content": await self.file_service.download_bytes(s3_link)})
+
+            elif filename.endswith(".txt"):
+                manual_input = await self._load_text_from_s3(s3_link)
+
+        return {"manual_input": manual_input, "pdfs": pdfs}
+
+
+    async def extract_history_inputs(self, inputs: Dict[str, Any], executor: Optional[Executor] = None) -> Tuple[str, bool]:
+        """
+        CPU half of build_history_details for fetch_history_inputs' result: the downloaded PDFs are
+        parsed on executor (a process pool keeps parsing off the event loop), their text is cached,
+        and the result is the same (details, extraction_failed).
+        """
+        loop = asyncio.get_running_loop()
+
+        async def text_of(pdf: Dict[str, Any]) -> str:
+            if "text" in pdf:
+                return pdf["text"]
+            if not pdf.get("content"):
+                return ""
+            text = await loop.run_in_executor(executor, pdf_text_from_bytes, pdf["content"])
+            if text:
+                await self.file_service.cache_pdf_text(pdf["s3_key"], text)
+            return text
+
+        pdf_texts = await asyncio.gather(*[text_of(pdf) for pdf in inputs["pdfs"]])
+        return self._compose_history_details(inputs["manual_input"], pdf_texts, bool(inputs["pdfs"]))
+
+
+    def history_tenant_id(self, files_metadata: List[Dict]) -> Optional[str]:
+        """Tenant owning the case's files, used to select per-tenant pre-screen rules."""
+        return next((file["tenant_id"] for file in files_metadata if file.get("tenant_id")), None)
+
+
+    def defer_history_run(self, case_id: str, retry_after_seconds: float, deferral: int = 1) -> str:
+        """
+        Re-run the case from its stored files on the Celery queue once the model circuit may have closed.
+        deferral is the number of this re-run (see proceed_with_model_history_files).
+        Returns the task id, which is tracked in the task registry like in-process tasks.
+        """
+        # imported here, the tasks module imports this one
+        from app.tasks.case_tasks import process_case_history
+        task_id = str(uuid.uuid4())
+        get_task_registry().create([task_id], enqueued_at=datetime.now(timezone.utc).isoformat(), meta={"step": "deferred"})
+        process_case_history.apply_async(
+            args=[case_id],
+            kwargs={"deferral": deferral},
+            countdown=max(1, math.ceil(retry_after_seconds)),
+            task_id=task_id
+        )
+        metrics.incr("model_deferred_cases_total")
+        return task_id
+
+
+    async def compute_input_fingerprint(self, case_id: str, files_metadata: List[Dict]) -> str:
+        """Hash of the case's input file set: file ids, s3 keys and their current ETags."""
+        # only the case's own inputs: listing the prefix would also walk every stored response
+        etags = await self.file_service.get_etags([file.get("s3_link", "") for file in files_metadata])
+        parts = sorted(
+            f"{file.get('id', '')}|{file.get('s3_link', '')}|{etags.get(file.get('s3_link', ''), '')}"
+            for file in files_metadata
+        )
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+    async def get_unchanged_response(self, latest_response: Optional[Dict], input_fingerprint: str) -> Optional[dict]:
+        """Content of latest_response if it was produced from the same input file set, else None."""
+        if not latest_response or latest_response.get("input_fingerprint") != input_fingerprint:
+            return None
+
+        content = await self.file_service.extract_content(latest_response["s3_link"])
+        if not self._is_valid_result(content):
+            return None
+
+        metrics.incr("history_unchanged_skips_total")
+        return content
+
+
+    async def save_model_responses_bulk(self, items: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Persist many history results at once.
+        items: [{"case_id": ..., "response": ..., "files_metadata": [...], "input_fingerprint": optional, "model_metrics": optional}]
+        One insert_bulk for every response row, then one update_bulk per new response relinking its files.
+        Returns the response_id (or None) of each item, in item order: a case may appear more than once.
+        An item whose files could not be relinked counts as not saved.
+        """
+        rows = []
+        for item in items:
+            saved = await self.file_service.save_respose_v2(response=item["response"], case_id=item["case_id"])
+            rows.append({
+                "case_id": item["case_id"],
+                "s3_link": saved.get("s3_key") if isinstance(saved, dict) else None,
+                # bulk inserts need the same keys on every row
+                "input_fingerprint": item.get("input_fingerprint") if self._is_valid_result(item["response"]) else None,
+                "model_metrics": item.get("model_metrics")
+            })
+
+        inserted = await self.sp_service.insert_bulk(table_name="response", objects=rows) if rows else []
+        if not isinstance(inserted, list):
+            inserted = []
+
+        # match inserted rows back to cases by their unique s3 key
+        response_id_by_key = {(row.get("case_id"), row.get("s3_link")): row.get("id") for row in inserted}
+        result: List[Optional[str]] = []
+        relinks: Dict[str, str] = {}
+        for item, row in zip(items, rows):
+            response_data_id = response_id_by_key.get((row["case_id"], row["s3_link"])) if row["s3_link"] else None
+            result.append(response_data_id)
+            if response_data_id:
+                # a later result for the same case wins, as it would with one update per response
+                for file_metadata in item["files_metadata"]:
+                    if file_metadata.get("id"):
+                        relinks[file_metadata["id"]] = response_data_id
+
+        file_ids_by_response: Dict[str, List[str]] = {}
+        for file_id, response_data_id in relinks.items():
+            file_ids_by_response.setdefault(response_data_id, []).append(file_id)
+        failed_relinks = set()
+        for response_data_id, file_ids in file_ids_by_response.items():
+            updated = await self.sp_service.update_bulk(
+                table_name="files",
+                ids=file_ids,
+                objects={"response_id": response_data_id}
+            )
+            if not isinstance(updated, list):
+                failed_relinks.add(response_data_id)
+        result = [None if response_data_id in failed_relinks else response_data_id for response_data_id in result]
+
+        await self.metadata_cache.invalidate("case", *dict.fromkeys(item["case_id"] for item in items))
+        return result
+
+
 # -------------------------------------------------------------Helper Function------------------------------------------------------------------
 
-    async def _read_uploaded_files(self, files: List[UploadFile]) -> List[Dict[str, Any]]:
+    async def read_uploaded_files(self, files: List[UploadFile]) -> List[Dict[str, Any]]:
         """Extract this for easier testing"""
         file_contents = []
         for file in files:
@@ -173,18 +469,43 @@ class CaseService:
         return file_contents
         
 
-    async def _save_model_response(self, response: dict, case_id: str) -> Optional[str]:
+    async def _save_model_response(
+        self,
+        response: dict,
+        case_id: str,
+        input_fingerprint: Optional[str] = None,
+        model_metrics: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
         """Extract this for easier testing"""
         response_saved_res = await self.file_service.save_respose_v2(response=response, case_id=case_id)
         response_s3_key = response_saved_res.get("s3_key") if isinstance(response_saved_res, dict) else None
         
+        response_object = {"case_id": case_id, "s3_link": response_s3_key}
+        # only successful analyses may be reused by change detection
+        if input_fingerprint and self._is_valid_result(response):
+            response_object["input_fingerprint"] = input_fingerprint
+        # per-call model instrumentation (ModelCallRecorder.summary), absent for pre-screened results
+        if model_metrics and model_metrics.get("calls"):
+            response_object["model_metrics"] = model_metrics
+
         response_row = await self.sp_service.insert(
             table_name="response",
-            object={"case_id": case_id, "s3_link": response_s3_key}
+            object=response_object
         )
+        await self.metadata_cache.invalidate("case", case_id)
         return response_row.get("id") if response_row else None
 
 
+    def _is_valid_result(self, response: Any) -> bool:
+        # MODEL_UNAVAILABLE answers are stored for the reviewer but must never satisfy change detection
+        return isinstance(response, dict) and "error" not in response and not is_model_unavailable(response)
+
+
+    def _compose_history_details(self, manual_input: str, pdf_texts: List[str], has_pdfs: bool) -> Tuple[str, bool]:
+        aggregated_details = join_documents(pdf_texts)
+        return join_documents([manual_input, aggregated_details]), has_pdfs and not aggregated_details.strip()
+
+
     async def _aggregate_file_contents_from_metadata(self, files_metadata: List[Dict]) -> tuple[str, str]:
         """
         Extract and aggregate content from files based on metadata.
@@ -207,30 +528,24 @@ class CaseService:
                 # Load manual input text
                 manual_input = await self._load_text_from_s3(s3_link)
 
-        aggregated_details = "".join(details_parts)
+        aggregated_details = join_documents(details_parts)
         return manual_input, aggregated_details
 
 
     async def _load_text_from_s3(self, s3_key: str) -> str:
         """Load text content from S3 key."""
         try:
-            s3_obj = self.file_service.s3_client.get_object(
-                Bucket=self.file_service.aws_bucket_name,
-                Key=s3_key
-            )
-            return s3_obj["Body"].read().decode("utf-8")
+            return (await asyncio.to_thread(self.file_service.read_object, s3_key)).decode("utf-8")
         except Exception:
             return ""
 
 
     async def _link_existing_files_to_response(self, files_metadata: List[Dict], case_id: str, response_data_id: str) -> None:
-        """Link existing files to a new response by updating their response_id."""
-        for file_metadata in files_metadata:
-            file_id = file_metadata.get("id")
-            if file_id:
-                # Update existing file record to link to new response
-                await self.sp_service.update(
-                    table_name="files",
-                    id=file_id,
-                    objects={"response_id": response_data_id}
-                )
+        """Link existing files to a new response by updating their response_id in one query."""
+        file_ids = [file_metadata.get("id") for file_metadata in files_metadata if file_metadata.get("id")]
+        if file_ids:
+            await self.sp_service.update_bulk(
+                table_name="files",
+                ids=file_ids,
+                objects={"response_id": response_data_id}
+            )
@@ -0,0 +1,167 @@
+from app.config.settings import get_settings
+from app.utils.metrics import metrics
+from typing import Any, Callable, Optional
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MODEL_UNAVAILABLE_FLAG = "MODEL_UNAVAILABLE"
+
+_MODEL_UNAVAILABLE_REASONING = (
+    "The analysis model is currently unavailable, so this claim could not be analyzed automatically. "
+    "This case requires human review or resubmission once the service has recovered."
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker():
+    """
+    Process-wide breaker around the model dependency.
+    failure_threshold consecutive failures (timeouts, 429/5xx, or calls slower than the latency budget)
+    open the circuit; callers are then rejected without waiting on Gemini. After open_seconds one probe
+    is let through (half-open): its success closes the circuit, its failure opens it again.
+    """
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        open_seconds: float,
+        latency_budget_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.open_seconds = open_seconds
+        self.latency_budget_seconds = latency_budget_seconds
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._set_state(CLOSED)
+
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+
+    def allow(self) -> bool:
+        """Whether a model call may be attempted now. In half-open state only the probe is allowed."""
+        with self._lock:
+            now = self._clock()
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if now - self._opened_at < self.open_seconds:
+                    return False
+                self._set_state(HALF_OPEN)
+            # a probe that never reported back (e.g. cancelled) does not keep the circuit half-open forever
+            if self._probe_started_at is not None and now - self._probe_started_at < self.open_seconds:
+                return False
+            self._probe_started_at = now
+            metrics.incr("circuit_breaker_probes_total", breaker=self.name)
+            return True
+
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe may be attempted, 0 when the circuit is closed."""
+        with self._lock:
+            if self._state == CLOSED:
+                return 0.0
+            started = self._probe_started_at if self._state == HALF_OPEN and self._probe_started_at is not None else self._opened_at
+            return max(0.0, self.open_seconds - (self._clock() - started))
+
+
+    def on_success(self, latency_seconds: float) -> None:
+        if self.latency_budget_seconds and latency_seconds > self.latency_budget_seconds:
+            metrics.incr("circuit_breaker_slow_calls_total", breaker=self.name)
+            self.on_failure()
+            return
+        with self._lock:
+            if self._state == OPEN:
+                # a call started before the circuit opened says nothing about recovery
+                return
+            self._failures = 0
+            if self._state == HALF_OPEN:
+                logger.info("Circuit %s closed after a successful probe", self.name)
+                self._set_state(CLOSED)
+
+
+    def on_failure(self) -> None:
+        with self._lock:
+            if self._state == OPEN:
+                return
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                logger.warning("Circuit %s opened after %d failure(s)", self.name, self._failures)
+                metrics.incr("circuit_breaker_trips_total", breaker=self.name)
+                self._opened_at = self._clock()
+                self._set_state(OPEN)
+
+
+    def _set_state(self, state: str) -> None:
+        # callers hold the lock (or are the constructor)
+        self._state = state
+        self._probe_started_at = None
+        if state == CLOSED:
+            self._failures = 0
+        metrics.set_gauge("circuit_breaker_state", _STATE_GAUGE[state], breaker=self.name)
+
+
+def model_unavailable_result(action: str, retry_after_seconds: float) -> dict:
+    """
+    What a caller gets while the model circuit is open: a REVIEW_REQUIRED decision flagged
+    MODEL_UNAVAILABLE, or, with action "defer", a marker asking the caller to retry the case later.
+    """
+    if action == "defer":
+        return {
+            "error": "Model unavailable, analysis deferred",
+            "deferred": True,
+            "retry_after_seconds": round(retry_after_seconds, 1),
+        }
+    return {
+        "decision": "REVIEW_REQUIRED",
+        "reasoning": _MODEL_UNAVAILABLE_REASONING,
+        "confidence": 0,
+        "riskScore": "HIGH",
+        "flags": ["MANUAL_REVIEW_REQUIRED", MODEL_UNAVAILABLE_FLAG],
+    }
+
+
+def is_model_unavailable(result: Any) -> bool:
+    """True for both forms of model_unavailable_result; such results are never cached or reused."""
+    if not isinstance(result, dict):
+        return False
+    return bool(result.get("deferred")) or MODEL_UNAVAILABLE_FLAG in (result.get("flags") or [])
+
+
+def is_deferred(result: Any) -> bool:
+    return isinstance(result, dict) and bool(result.get("deferred"))
+
+
+_BREAKER: Optional[CircuitBreaker] = None
+
+
+def get_circuit_breaker() -> Optional[CircuitBreaker]:
+    """The process-wide model circuit breaker, or None when disabled in settings."""
+    global _BREAKER
+    gemini_setting = get_settings().gemini
+    if not gemini_setting.circuit_enabled:
+        return None
+    if _BREAKER is None:
+        _BREAKER = CircuitBreaker(
+            name="gemini",
+            failure_threshold=gemini_setting.circuit_failure_threshold,
+            open_seconds=gemini_setting.circuit_open_seconds,
+            latency_budget_seconds=gemini_setting.circuit_latency_budget_seconds
+        )
+    return _BREAKER
@@ -1,17 +1,25 @@
 import logging
 from app.service.supabase_service import SupabaseService
+from app.service.metadata_cache_service import MetadataCacheService
+from app.service.filename_index_service import FilenameIndexService, split_filename
 from app.schema.schema import CaseStatus
 from fastapi import UploadFile, File, Form
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, AsyncIterator
+from app.utils.pagination import encode_cursor
 import uuid
 import boto3
 from app.config.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
+CLAIM_COLUMNS = ("id", "tenant_id", "case_name", "status")
+DEFAULT_CLAIM_COLUMNS = "id, tenant_id, case_name, status"
+
 class ClaimManagerService:
     def __init__(self):
         self.sp_service = SupabaseService()
+        self.metadata_cache = MetadataCacheService()
+        self.filename_index = FilenameIndexService()
         setting = get_settings()
         s3_setting = setting.s3
         self.s3_client = boto3.client(
@@ -46,6 +54,7 @@ class ClaimManagerService:
                 logger.warning("Failed to insert case for tenant_id: %s, case_name: %s", tenant_id, name)
                 return False
             
+            await self.metadata_cache.invalidate("cases", MetadataCacheService.LIST_SCOPE)
             logger.info("Successfully created empty claim for tenant_id: %s, case_name: %s", tenant_id, name)
             return True
 
@@ -78,6 +87,7 @@ class ClaimManagerService:
                 return False
             
             case_id = res["id"]
+            await self.metadata_cache.invalidate("cases", MetadataCacheService.LIST_SCOPE)
 
             if files:
                 for file in files:
@@ -118,10 +128,16 @@ class ClaimManagerService:
 
     async def get_claim_by_id(self, id: str) -> Dict[str, Any]:
         try:
-            general_data = await self.sp_service.get_row_by_id(
-                id=id,
-                table_name="cases",
-                columns="id, tenant_id, case_name, status"
+            # case row + its files in one round trip, cached until a write touches the case
+            general_data = await self.metadata_cache.read_through(
+                entity="cases",
+                key=id,
+                producer=lambda: self.sp_service.get_case_snapshot(
+                    table_name="cases",
+                    case_id=id,
+                    case_columns="id, tenant_id, case_name, status",
+                    file_columns="id, tenant_id, name, kind, s3_bucket, s3_key, uploaded_at"
+                )
             )
             if not general_data:
                 logger.warning("No case found with id: %s", id)
@@ -129,12 +145,10 @@ class ClaimManagerService:
             
             tenant_id = general_data["tenant_id"]
 
-            related_files = await self.sp_service.get_all_files(
-                table_name="files",
-                case_id=id,
-                tenant_id=tenant_id,
-                columns="id, name, kind, s3_bucket, s3_key, uploaded_at"
-            )
+            related_files = [
+                file for file in general_data.get("files") or []
+                if file.get("tenant_id") == tenant_id
+            ]
             files_with_urls = []
             if related_files:
                 for file in related_files:
@@ -170,21 +184,44 @@ class ClaimManagerService:
             return {}
 
 
-    async def get_all_claim(self) -> List[Dict[str, Any]]:
-        try:
-            res = await self.sp_service.get_all(
+    async def get_all_claim(
+        self,
+        limit: int,
+        after_id: Optional[str] = None,
+        columns: str = DEFAULT_CLAIM_COLUMNS
+    ) -> Dict[str, Any]:
+        async def load_page() -> Dict[str, Any]:
+            rows, has_more = await self.sp_service.get_page(
                 table_name="cases",
-                columns="id, tenant_id, case_name, status"
+                columns=columns,
+                limit=limit,
+                after_id=after_id
             )
-            if not res:
+            if not rows:
+                return {"items": [], "next_cursor": None}
+
+            next_cursor = encode_cursor(rows[-1]["id"]) if has_more else None
+            return {"items": rows, "next_cursor": next_cursor}
+
+        try:
+            page = await self.metadata_cache.read_through(
+                entity="cases",
+                key=f"list:{limit}:{after_id or ''}:{columns}",
+                producer=load_page,
+                scope=MetadataCacheService.LIST_SCOPE
+            )
+            if not page["items"]:
                 logger.error("Error get_all_claim either empty or None")
-                return []
 
-            return res
+            return page
 
         except Exception as e:
             logger.error("Error get_all_claim")
-            return []
+            return {"items": [], "next_cursor": None}
+
+
+    def export_claims(self, columns: str = DEFAULT_CLAIM_COLUMNS) -> AsyncIterator[Dict[str, Any]]:
+        return self.sp_service.stream_all(table_name="cases", columns=columns)
 
 
     async def update_claim_name(self, id: str, new_name: str) -> bool:
@@ -199,6 +236,7 @@ class ClaimManagerService:
             if not res:
                 return False
             
+            await self.metadata_cache.invalidate("cases", id, MetadataCacheService.LIST_SCOPE)
             return True
 
         except Exception as e:
@@ -212,32 +250,17 @@ class ClaimManagerService:
         
             logger.info("Found case for tenant_id: %s", tenant_id)
             
-            # Get existing files for this case to check for name conflicts
-            existing_files = await self.sp_service.get_all_files(
-                table_name="files",
-                case_id=case_id,
-                tenant_id=tenant_id,
-                columns="name"
-            )
-            
-            existing_file_names = []
-            if existing_files:
-                existing_file_names = [file["name"] for file in existing_files]
-                logger.info("Found %d existing files in case", len(existing_file_names))
-            
             uploaded_count = 0
             
             for file in files:
+                final_filename = None
                 try:
-                    # Generate unique filename if conflict exists
-                    final_filename = self._resolve_filename_conflict(file.filename, existing_file_names)
+                    # Reserve a unique filename in the per-case index (also covers conflicts within this batch)
+                    final_filename = await self._reserve_filename(tenant_id, case_id, file.filename)
                     
                     if final_filename != file.filename:
                         logger.info("Filename conflict resolved: '%s' -> '%s'", file.filename, final_filename)
                     
-                    # Add the new filename to existing names to avoid conflicts within this batch
-                    existing_file_names.append(final_filename)
-                    
                     file_id = str(uuid.uuid4())
                     s3_key = f"{tenant_id}/{case_id}/uploads/{file_id}_{final_filename}"
                     
@@ -261,6 +284,7 @@ class ClaimManagerService:
                     
                     if not insert_res:
                         logger.error("Failed to insert file %s into database", final_filename)
+                        await self._release_filename(case_id, final_filename)
                         return False
                     
                     logger.info("Successfully uploaded and saved file: %s", final_filename)
@@ -268,6 +292,7 @@ class ClaimManagerService:
                     
                 except Exception as file_error:
                     logger.error("Failed to upload file %s: %s", file.filename, str(file_error), exc_info=True)
+                    await self._release_filename(case_id, final_filename)
                     return False  # Fail fast on any file error
             
             logger.info("Successfully uploaded %d files for case_id: %s", uploaded_count, case_id)
@@ -277,6 +302,10 @@ class ClaimManagerService:
             logger.error("Error in upload_files_existed_case for case_id: %s - %s", case_id, str(e), exc_info=True)
             return False
 
+        finally:
+            # a partial batch may have landed before a failure, so always drop the cached case
+            await self.metadata_cache.invalidate("cases", case_id)
+
 
     async def replace_existed_file(self, tenant_id: str, case_id: str, file_id: str, new_file: UploadFile) -> bool:
         try:
@@ -298,50 +327,43 @@ class ClaimManagerService:
                 logger.error("File %s does not belong to tenant %s or case %s", file_id, tenant_id, case_id)
                 return False
             
-            # Get existing files to check for name conflicts (excluding the file being replaced)
-            existing_files = await self.sp_service.get_all_files(
-                table_name="files",
-                case_id=case_id,
-                tenant_id=tenant_id,
-                columns="id, name"
-            )
-            
-            # Create list of existing names excluding the current file
-            existing_file_names = []
-            if existing_files:
-                existing_file_names = [file["name"] for file in existing_files if file["id"] != file_id]
-                logger.info("Found %d other files in case for conflict checking", len(existing_file_names))
-            
-            # Resolve filename conflicts
-            final_filename = self._resolve_filename_conflict(new_file.filename, existing_file_names)
-            
-            if final_filename != new_file.filename:
-                logger.info("Filename conflict resolved: '%s' -> '%s'", new_file.filename, final_filename)
-            
-            # Generate new S3 key (keeping same file ID to maintain references)
-            new_s3_key = f"{tenant_id}/{case_id}/uploads/{file_id}_{final_filename}"
-            
-            # Upload new file to S3
-            logger.info("Uploading replacement file %s to S3", final_filename)
-            self.s3_client.upload_fileobj(new_file.file, self.aws_bucket_name, new_s3_key)
-            
-            # Update database record
-            res = await self.sp_service.update( 
-                table_name="files",
-                id=file_id,
-                objects={
-                    "name": final_filename,  # Use resolved filename
-                    "s3_key": new_s3_key
-                }
-            )
+            # Free the old name first so the replacement may keep it
+            old_filename = existing_file["name"]
+            await self._release_filename(case_id, old_filename)
+
+            final_filename = None
+            uploaded_s3_key = None
+            try:
+                # Resolve filename conflicts (excluding the file being replaced)
+                final_filename = await self._reserve_filename(tenant_id, case_id, new_file.filename, exclude_file_id=file_id)
+
+                if final_filename != new_file.filename:
+                    logger.info("Filename conflict resolved: '%s' -> '%s'", new_file.filename, final_filename)
+
+                # Generate new S3 key (keeping same file ID to maintain references)
+                new_s3_key = f"{tenant_id}/{case_id}/uploads/{file_id}_{final_filename}"
+
+                # Upload new file to S3
+                logger.info("Uploading replacement file %s to S3", final_filename)
+                self.s3_client.upload_fileobj(new_file.file, self.aws_bucket_name, new_s3_key)
+                uploaded_s3_key = new_s3_key
+
+                # Update database record
+                res = await self.sp_service.update(
+                    table_name="files",
+                    id=file_id,
+                    objects={
+                        "name": final_filename,  # Use resolved filename
+                        "s3_key": new_s3_key
+                    }
+                )
+            except Exception:
+                await self._undo_replacement(case_id, final_filename, old_filename, uploaded_s3_key)
+                raise
 
             if not res:
                 logger.error("Failed to update file record in database for file_id: %s", file_id)
-                # Clean up the newly uploaded file since DB update failed
-                try:
-                    self.s3_client.delete_object(Bucket=self.aws_bucket_name, Key=new_s3_key)
-                except Exception as cleanup_error:
-                    logger.error("Failed to cleanup uploaded file after DB error: %s", str(cleanup_error))
+                await self._undo_replacement(case_id, final_filename, old_filename, uploaded_s3_key)
                 return False
 
             # Delete old S3 file after successful update
@@ -360,6 +382,53 @@ class ClaimManagerService:
             logger.error("Error in replace_existed_file for file_id: %s - %s", file_id, str(e), exc_info=True)
             return False
 
+        finally:
+            await self.metadata_cache.invalidate("cases", case_id)
+
+
+    async def _reserve_filename(self, tenant_id: str, case_id: str, filename: str, exclude_file_id: str = None) -> str:
+        """
+        Pick a free name through the per-case index; the case is only listed when the index is cold.
+        Falls back to listing + _resolve_filename_conflict if Redis is unavailable.
+        """
+        async def load_names() -> List[str]:
+            existing_files = await self.sp_service.get_all_files(
+                table_name="files",
+                case_id=case_id,
+                tenant_id=tenant_id,
+                columns="id, name"
+            )
+            return [file["name"] for file in existing_files or [] if file["id"] != exclude_file_id]
+
+        try:
+            return await self.filename_index.reserve(case_id, filename, load_names)
+        except Exception as e:
+            logger.warning("Filename index unavailable for case %s, listing files instead: %s", case_id, str(e))
+            return self._resolve_filename_conflict(filename, await load_names())
+
+
+    async def _release_filename(self, case_id: str, filename: str) -> None:
+        if not filename:
+            return
+        try:
+            await self.filename_index.release(case_id, filename)
+        except Exception as e:
+            logger.warning("Failed to release filename %s for case %s: %s", filename, case_id, str(e))
+
+
+    async def _undo_replacement(self, case_id: str, new_filename: str, old_filename: str, new_s3_key: str = None) -> None:
+        """The record still carries the old name: give it back to the index and drop the uploaded replacement."""
+        await self._release_filename(case_id, new_filename)
+        try:
+            await self.filename_index.add(case_id, old_filename)
+        except Exception as e:
+            logger.warning("Failed to restore filename %s for case %s: %s", old_filename, case_id, str(e))
+        if new_s3_key:
+            try:
+                self.s3_client.delete_object(Bucket=self.aws_bucket_name, Key=new_s3_key)
+            except Exception as cleanup_error:
+                logger.error("Failed to cleanup uploaded replacement file %s: %s", new_s3_key, str(cleanup_error))
+
 
     def _resolve_filename_conflict(self, original_filename: str, existing_names: List[str]) -> str:
         """
@@ -369,16 +438,12 @@ class ClaimManagerService:
         - document.pdf -> document (1).pdf -> document (2).pdf
         - image.jpg -> image (1).jpg -> image (2).jpg
         """
+        existing_names = set(existing_names)
         if original_filename not in existing_names:
             return original_filename
         
         # Split filename and extension
-        if '.' in original_filename:
-            name_part, extension = original_filename.rsplit('.', 1)
-            extension = '.' + extension
-        else:
-            name_part = original_filename
-            extension = ''
+        name_part, extension = split_filename(original_filename)
         
         # Find the next available number
         counter = 1
@@ -403,6 +468,7 @@ class ClaimManagerService:
             logger.info("Service: Removing %d files", len(file_ids))
             
             deleted_count = 0
+            touched_case_ids = set()
             
             for file_id in file_ids:
                 try:
@@ -410,12 +476,14 @@ class ClaimManagerService:
                     file_info = await self.sp_service.get_row_by_id(
                         id=file_id,
                         table_name="files",
-                        columns="id, name, s3_bucket, s3_key"
+                        columns="id, case_id, name, s3_bucket, s3_key"
                     )
                     
                     if not file_info:
                         logger.warning("File %s not found, skipping", file_id)
                         continue
+
+                    touched_case_ids.add(file_info.get("case_id"))
                     
                     # Delete from S3 first
                     try:
@@ -445,6 +513,7 @@ class ClaimManagerService:
                     
                     if res:
                         deleted_count += 1
+                        await self._release_filename(file_info.get("case_id"), file_info["name"])
                         logger.info("Successfully deleted file: %s (%s)", file_id, file_info["name"])
                     else:
                         logger.error("Failed to delete file from database: %s", file_id)
@@ -452,6 +521,7 @@ class ClaimManagerService:
                 except Exception as file_error:
                     logger.error("Error deleting file %s: %s", file_id, str(file_error))
             
+            await self.metadata_cache.invalidate("cases", *touched_case_ids)
             logger.info("Successfully deleted %d out of %d files", deleted_count, len(file_ids))
             return deleted_count > 0  # Return true if at least one file was deleted
             
@@ -520,6 +590,12 @@ class ClaimManagerService:
             if not res:
                 logger.error("Failed to delete case from database: %s", case_id)
                 return False
+
+            await self.metadata_cache.invalidate("cases", case_id, MetadataCacheService.LIST_SCOPE)
+            try:
+                await self.filename_index.drop(case_id)
+            except Exception as index_error:
+                logger.warning("Failed to drop filename index for case %s: %s", case_id, str(index_error))
             
             logger.info("Successfully deleted case %s and %d associated files", case_id, len(case_files) if case_files else 0)
             return True
@@ -0,0 +1,153 @@
+from app.service.caching_service import CachingService
+from typing import Awaitable, Callable, Iterable, List, Tuple
+import asyncio
+import re
+import time
+import uuid
+
+# "report (3).pdf" -> ("report", "3")
+_SUFFIX_PATTERN = re.compile(r"^(?P<stem>.*) \((?P<n>\d+)\)$")
+
+_INDEX_TTL_SECONDS = 24 * 60 * 60
+_MAX_PROBES = 1000
+
+# One worker rebuilds a case's index at a time; the others poll for its ready marker
+_BUILD_LOCK_SECONDS = 30
+_BUILD_POLL_SECONDS = 0.05
+
+
+def split_filename(filename: str) -> Tuple[str, str]:
+    """Split into (name_part, extension) the same way the conflict resolver always has."""
+    if '.' in filename:
+        name_part, extension = filename.rsplit('.', 1)
+        return name_part, '.' + extension
+    return filename, ''
+
+
+class FilenameIndexService():
+    """
+    Per-case filename index kept in Redis so upload conflict checks never list the case:
+      fname:names:{case_id}  SET of names in use
+      fname:max:{case_id}    HASH "stem|ext" -> highest "(n)" suffix handed out
+      fname:ready:{case_id}  marker that the index was built from the database
+      fname:building:{case_id}  lock held by the worker rebuilding the index
+    Reservations are SADD based, so two concurrent uploads can never get the same name.
+    Every write renews the TTL of the names and counters; the index is rebuilt from scratch
+    once the ready marker expires, by one worker at a time so a rebuild never wipes a name
+    another worker has just reserved.
+    """
+    def __init__(self):
+        self.caching_service = CachingService()
+
+
+    async def reserve(self, case_id: str, filename: str, load_names: Callable[[], Awaitable[List[str]]]) -> str:
+        """Claim filename for the case, or the next free "name (n).ext" if it is taken."""
+        await self._ensure_loaded(case_id, load_names)
+        redis = self.caching_service.redis
+        names_key = self._names_key(case_id)
+
+        try:
+            if redis.sadd(names_key, filename):
+                return filename
+
+            name_part, extension = split_filename(filename)
+            counter_field = self._counter_field(name_part, extension)
+            for _ in range(_MAX_PROBES):
+                counter = redis.hincrby(self._max_key(case_id), counter_field, 1)
+                candidate = f"{name_part} ({counter}){extension}"
+                if redis.sadd(names_key, candidate):
+                    return candidate
+
+            # Fallback to UUID suffix
+            candidate = f"{name_part}_{str(uuid.uuid4())[:8]}{extension}"
+            redis.sadd(names_key, candidate)
+            return candidate
+        finally:
+            self._renew(case_id)
+
+
+    async def add(self, case_id: str, *names: str) -> None:
+        names = [n for n in names if n]
+        if names and self.caching_service.redis.exists(self._ready_key(case_id)):
+            self.caching_service.redis.sadd(self._names_key(case_id), *names)
+            self._renew(case_id)
+
+
+    async def release(self, case_id: str, *names: str) -> None:
+        names = [n for n in names if n]
+        if names:
+            self.caching_service.redis.srem(self._names_key(case_id), *names)
+
+
+    async def drop(self, case_id: str) -> None:
+        await self.caching_service.delete(self._names_key(case_id), self._max_key(case_id), self._ready_key(case_id))
+
+
+    async def _ensure_loaded(self, case_id: str, load_names: Callable[[], Awaitable[List[str]]]) -> None:
+        redis = self.caching_service.redis
+        building_key = self._building_key(case_id)
+        deadline = time.monotonic() + _BUILD_LOCK_SECONDS
+        while not redis.exists(self._ready_key(case_id)):
+            if redis.set(building_key, "1", nx=True, ex=_BUILD_LOCK_SECONDS):
+                try:
+                    # the previous holder may have finished between our check and the lock
+                    if not redis.exists(self._ready_key(case_id)):
+                        await self._rebuild(case_id, load_names)
+                finally:
+                    redis.delete(building_key)
+                return
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Timed out waiting for the filename index of case {case_id}")
+            await asyncio.sleep(_BUILD_POLL_SECONDS)
+
+
+    async def _rebuild(self, case_id: str, load_names: Callable[[], Awaitable[List[str]]]) -> None:
+        redis = self.caching_service.redis
+        names = await load_names()
+        pipe = redis.pipeline()
+        # names left from an expired build may belong to files that are gone
+        pipe.delete(self._names_key(case_id), self._max_key(case_id))
+        if names:
+            pipe.sadd(self._names_key(case_id), *names)
+            for field, counter in self._max_suffixes(names).items():
+                pipe.hset(self._max_key(case_id), field, counter)
+        for key in (self._names_key(case_id), self._max_key(case_id)):
+            pipe.expire(key, _INDEX_TTL_SECONDS)
+        pipe.set(self._ready_key(case_id), "1", ex=_INDEX_TTL_SECONDS)
+        pipe.execute()
+
+
+    def _renew(self, case_id: str) -> None:
+        # EXPIRE at build time misses keys that only a later SADD/HINCRBY creates
+        pipe = self.caching_service.redis.pipeline()
+        for key in (self._names_key(case_id), self._max_key(case_id)):
+            pipe.expire(key, _INDEX_TTL_SECONDS)
+        pipe.execute()
+
+
+    def _max_suffixes(self, names: Iterable[str]) -> dict:
+        counters = {}
+        for name in names:
+            name_part, extension = split_filename(name)
+            match = _SUFFIX_PATTERN.match(name_part)
+            if not match:
+                continue
+            field = self._counter_field(match.group("stem"), extension)
+            counters[field] = max(counters.get(field, 0), int(match.group("n")))
+        return counters
+
+
+    def _counter_field(self, name_part: str, extension: str) -> str:
+        return f"{name_part}|{extension}"
+
+    def _names_key(self, case_id: str) -> str:
+        return f"fname:names:{case_id}"
+
+    def _max_key(self, case_id: str) -> str:
+        return f"fname:max:{case_id}"
+
+    def _ready_key(self, case_id: str) -> str:
+        return f"fname:ready:{case_id}"
+
+    def _building_key(self, case_id: str) -> str:
+        return f"fname:building:{case_id}"
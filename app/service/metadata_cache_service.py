@@ -0,0 +1,80 @@
+import logging
+from app.config.settings import get_settings
+from app.service.caching_service import CachingService
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Version counters outlive any cached value, so a reset counter can never hit stale data
+_VERSION_TTL_SECONDS = 7 * 24 * 60 * 60
+
+
+class MetadataCacheService():
+    """
+    Read-through cache for rarely changing rows (cases, tenants, file listings).
+
+    Values live under versioned keys: meta:{entity}:{key}:v{n}. Writers never delete
+    cached values, they bump the version of the scope they touched (a row id or "list"),
+    so a reader racing a writer can only ever fill a key nobody will read again.
+    Redis errors fall back to the producer.
+    """
+    LIST_SCOPE = "list"
+
+    def __init__(self):
+        self.caching_service = CachingService()
+        self.ttl_seconds = get_settings().redis.metadata_cache_ttl
+
+
+    async def read_through(
+        self,
+        entity: str,
+        key: str,
+        producer: Callable[[], Awaitable[Any]],
+        scope: Optional[str] = None,
+        ttl_seconds: Optional[int] = None
+    ) -> Any:
+        try:
+            version = await self._get_version(entity, scope or key)
+            cache_key = f"meta:{entity}:{key}:v{version}"
+            cached = await self.caching_service.get_json(cache_key)
+            if cached is not None:
+                return cached
+        except Exception as e:
+            logger.warning("Metadata cache read failed for %s:%s - %s", entity, key, str(e))
+            return await producer()
+
+        value = await producer()
+        if self._is_cacheable(value):
+            try:
+                await self.caching_service.set_json(cache_key, value, ttl_seconds=ttl_seconds or self.ttl_seconds)
+            except Exception as e:
+                logger.warning("Metadata cache write failed for %s:%s - %s", entity, key, str(e))
+        return value
+
+
+    async def invalidate(self, entity: str, *scopes: str) -> None:
+        """Bump the version of every scope so the next read goes to Supabase."""
+        for scope in scopes:
+            if not scope:
+                continue
+            try:
+                await self.caching_service.incr(self._version_key(entity, scope), ttl_seconds=_VERSION_TTL_SECONDS)
+            except Exception as e:
+                logger.warning("Metadata cache invalidation failed for %s:%s - %s", entity, scope, str(e))
+
+
+    async def _get_version(self, entity: str, scope: str) -> int:
+        raw = await self.caching_service.get_str(self._version_key(entity, scope))
+        return int(raw) if raw else 0
+
+
+    def _version_key(self, entity: str, scope: str) -> str:
+        return f"meta:ver:{entity}:{scope}"
+
+
+    def _is_cacheable(self, value: Any) -> bool:
+        if not value:
+            return False
+        if isinstance(value, dict) and ("error" in value or value.get("items") == []):
+            return False
+        return True
@@ -0,0 +1,112 @@
+from app.service.model_service import ModelService
+from app.utils.chunking import estimate_tokens
+from app.utils.metrics import metrics
+from app.utils.call_recorder import ModelCallRecorder, current_recorder, use_recorder
+from app.config.settings import get_settings
+from typing import Any, List, Optional, Set, Tuple
+import asyncio
+
+
+class ModelRequestBatcher():
+    """
+    Packs small claims submitted concurrently into ModelService.generate_batch calls.
+    A pack is sent once it reaches max_cases or max_size, or linger_seconds after its first claim.
+    Claims larger than case_max_size are never packed.
+    """
+    def __init__(
+        self,
+        model_service: ModelService,
+        max_cases: int,
+        max_size: int,
+        case_max_size: int,
+        linger_seconds: float,
+        size_unit: str = "tokens"
+    ):
+        self.model_service = model_service
+        self.max_cases = max(1, int(max_cases))
+        self.max_size = max_size
+        self.case_max_size = case_max_size
+        self.linger_seconds = linger_seconds
+        self.size_unit = size_unit
+        self._pending: List[Tuple[str, asyncio.Future, Optional[ModelCallRecorder]]] = []
+        self._pending_size = 0
+        self._linger_task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+
+    async def submit(self, details: str) -> Any:
+        """Model result for one claim, same shape as ModelService.generate_from_details."""
+        size = self._size(details)
+        if size > self.case_max_size:
+            metrics.incr("model_batch_cases_total", outcome="oversized")
+            return await self.model_service.generate_from_details(details)
+
+        if self._pending and self._pending_size + size > self.max_size:
+            self._flush()
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((details, future, current_recorder()))
+        self._pending_size += size
+        if len(self._pending) >= self.max_cases:
+            self._flush()
+        elif self._linger_task is None:
+            self._linger_task = asyncio.create_task(self._flush_after_linger())
+        return await future
+
+
+    def _size(self, details: str) -> int:
+        return len(details) if self.size_unit == "chars" else estimate_tokens(details)
+
+
+    async def _flush_after_linger(self) -> None:
+        await asyncio.sleep(self.linger_seconds)
+        self._linger_task = None
+        self._flush()
+
+
+    def _flush(self) -> None:
+        if self._linger_task is not None:
+            self._linger_task.cancel()
+            self._linger_task = None
+        batch, self._pending, self._pending_size = self._pending, [], 0
+        if not batch:
+            return
+        task = asyncio.create_task(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future, Optional[ModelCallRecorder]]]) -> None:
+        # the packed call is made for every member, so each case's recorder gets it, marked as shared
+        batch_recorder = ModelCallRecorder()
+        try:
+            with use_recorder(batch_recorder):
+                results = await self.model_service.generate_batch([details for details, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            for _, _, recorder in batch:
+                if recorder is not None:
+                    for call in batch_recorder.calls:
+                        recorder.add({**call, "shared_by": len(batch)})
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+def create_model_batcher(model_service: ModelService) -> Optional[ModelRequestBatcher]:
+    """Batcher configured from settings, or None when batching is disabled."""
+    gemini_setting = get_settings().gemini
+    if not gemini_setting.batch_enabled:
+        return None
+    return ModelRequestBatcher(
+        model_service=model_service,
+        max_cases=gemini_setting.batch_max_cases,
+        max_size=gemini_setting.batch_max_size,
+        case_max_size=gemini_setting.batch_case_max_size,
+        linger_seconds=gemini_setting.batch_linger_ms / 1000,
+        size_unit=gemini_setting.batch_size_unit
+    )
@@ -0,0 +1,162 @@
+from app.config.settings import get_settings
+from app.service.rate_limiter import ClusterRateLimiter
+from app.service.circuit_breaker import CircuitBreaker, get_circuit_breaker
+from app.utils.aimd import AIMDController
+from app.utils.metrics import metrics
+from typing import Any, Awaitable, Callable, Optional
+import asyncio
+import time
+import weakref
+
+
+def is_overload_error(e: Exception) -> bool:
+    """Gemini 429 / RESOURCE_EXHAUSTED."""
+    return getattr(e, "code", None) == 429 or "RESOURCE_EXHAUSTED" in str(e)
+
+
+def is_unavailable_error(e: Exception) -> bool:
+    """Errors that say the dependency is unhealthy rather than the request being wrong: 429, 5xx, connection errors."""
+    code = getattr(e, "code", None)
+    return is_overload_error(e) or (isinstance(code, int) and code >= 500) or isinstance(e, ConnectionError)
+
+
+class _LoopSlots():
+    def __init__(self):
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+
+
+class ModelCallLimiter():
+    """
+    Process-wide cap on in-flight Gemini calls with a per-call timeout.
+    The cap adapts (AIMD) to observed latency, 429s and timeouts, between 1 and max_in_flight.
+    With a ClusterRateLimiter, every call also takes a token from the Redis bucket shared by all processes.
+    With a CircuitBreaker, call outcomes and latencies (excluding queueing) are reported to it.
+    Slot bookkeeping is per event loop, since Celery tasks run each job in a fresh asyncio.run loop.
+    """
+    def __init__(
+        self,
+        max_in_flight: int,
+        timeout_seconds: float,
+        rate_limiter: Optional[ClusterRateLimiter] = None,
+        latency_target_seconds: Optional[float] = None,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.timeout_seconds = timeout_seconds
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker
+        self.concurrency = AIMDController(
+            initial=self.max_in_flight,
+            minimum=1,
+            maximum=self.max_in_flight,
+            increase=1 / self.max_in_flight,
+            latency_target_seconds=latency_target_seconds
+        )
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopSlots]" = weakref.WeakKeyDictionary()
+        metrics.set_gauge("model_limiter_max_in_flight", self.max_in_flight)
+        metrics.set_gauge("model_limiter_concurrency_limit", self.limit)
+
+
+    @property
+    def limit(self) -> int:
+        return max(1, int(self.concurrency.value))
+
+
+    async def run(self, call: Callable[[], Awaitable[Any]], timeout_seconds: Optional[float] = None) -> Any:
+        """Wait for a free slot (and a cluster token), then await call() with a timeout. Raises asyncio.TimeoutError on timeout."""
+        slots = self._loop_slots()
+        queued_at = time.perf_counter()
+        metrics.add_gauge("model_limiter_waiting", 1)
+        try:
+            async with slots.condition:
+                await slots.condition.wait_for(lambda: slots.in_flight < self.limit)
+                slots.in_flight += 1
+        finally:
+            metrics.add_gauge("model_limiter_waiting", -1)
+
+        metrics.add_gauge("model_limiter_in_flight", 1)
+        try:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            metrics.observe("model_limiter_wait_seconds", time.perf_counter() - queued_at)
+
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(call(), timeout=timeout_seconds or self.timeout_seconds)
+            except asyncio.TimeoutError:
+                metrics.incr("model_limiter_timeouts_total")
+                await self._on_overload()
+                if self.breaker is not None:
+                    self.breaker.on_failure()
+                raise
+            except Exception as e:
+                if is_overload_error(e):
+                    metrics.incr("model_limiter_overloads_total")
+                    await self._on_overload()
+                if self.breaker is not None and is_unavailable_error(e):
+                    self.breaker.on_failure()
+                raise
+
+            await self._on_success(time.perf_counter() - started)
+            return result
+        finally:
+            metrics.add_gauge("model_limiter_in_flight", -1)
+            async with slots.condition:
+                slots.in_flight -= 1
+                slots.condition.notify_all()
+
+
+    async def _on_success(self, latency_seconds: float) -> None:
+        if self.breaker is not None:
+            self.breaker.on_success(latency_seconds)
+        self.concurrency.on_success(latency_seconds, time.monotonic())
+        metrics.set_gauge("model_limiter_concurrency_limit", self.limit)
+        if self.rate_limiter is not None:
+            # like AIMDController.on_success: a call above the latency target is an overload signal
+            target = self.concurrency.latency_target_seconds
+            if target is not None and latency_seconds > target:
+                await self.rate_limiter.on_overload()
+            else:
+                await self.rate_limiter.on_success()
+
+
+    async def _on_overload(self) -> None:
+        self.concurrency.on_overload(time.monotonic())
+        metrics.set_gauge("model_limiter_concurrency_limit", self.limit)
+        if self.rate_limiter is not None:
+            await self.rate_limiter.on_overload()
+
+
+    def _loop_slots(self) -> _LoopSlots:
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = _LoopSlots()
+            self._slots[loop] = slots
+        return slots
+
+
+_LIMITER: Optional[ModelCallLimiter] = None
+
+
+def get_model_limiter() -> ModelCallLimiter:
+    global _LIMITER
+    if _LIMITER is None:
+        gemini_setting = get_settings().gemini
+        rate_limiter = None
+        if gemini_setting.rate_limit_enabled:
+            rate_limiter = ClusterRateLimiter(
+                name="gemini",
+                max_rps=gemini_setting.rate_limit_rps,
+                min_rps=gemini_setting.rate_limit_min_rps,
+                burst=gemini_setting.rate_limit_burst
+            )
+        _LIMITER = ModelCallLimiter(
+            gemini_setting.max_in_flight,
+            gemini_setting.call_timeout_seconds,
+            rate_limiter=rate_limiter,
+            latency_target_seconds=gemini_setting.latency_target_seconds,
+            breaker=get_circuit_breaker()
+        )
+    return _LIMITER
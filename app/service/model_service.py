@@ -1,9 +1,72 @@
-from app.service.s3_service import FileService
+from app.service.s3_service import FileService, join_documents
+from app.service.caching_service import CachingService
 from app.utils.validator import Validator
-from app.config.settings import get_prompt, get_settings
+from app.utils.metrics import metrics
+from app.utils.call_recorder import current_recorder
+from app.utils.chunking import estimate_tokens, split_into_chunks
+from app.config.settings import (
+    get_claim_prompt, get_batch_prompt, get_chunk_summary_prompt, get_settings,
+    PROMPT_VERSION, CHUNK_SUMMARY_PROMPT_VERSION, SYSTEM_INSTRUCTION
+)
+from app.service.model_limiter import get_model_limiter
+from app.service.circuit_breaker import OPEN, get_circuit_breaker, is_model_unavailable, model_unavailable_result
+from app.service.rules_engine import get_rules_engine
 # from fastapi import UploadFile
 from google import genai
-# from typing import List
+from google.genai import types
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Identical prompts currently being generated, keyed by (event loop id, fingerprint)
+_IN_FLIGHT: Dict[Tuple[int, str], asyncio.Future] = {}
+
+# Summaries of summaries are taken at most this many times for a single packet
+_MAX_REDUCE_ROUNDS = 3
+
+# Stop using a shared context cache name this long before it expires server-side
+_CONTEXT_CACHE_MARGIN_SECONDS = 60
+# After a failed context cache creation, all workers send the instruction inline for this long before trying again
+_CONTEXT_CACHE_RETRY_SECONDS = 300
+# Smallest prompt prefix Gemini accepts as cached content, by model name prefix (unknown models: the default)
+_CONTEXT_CACHE_MIN_TOKENS = {"gemini-2.5-flash": 1024, "gemini-2.5-pro": 4096}
+_CONTEXT_CACHE_DEFAULT_MIN_TOKENS = 4096
+_INSTRUCTION_TOKENS = estimate_tokens(SYSTEM_INSTRUCTION)
+
+# Inline form of the static instruction, built once
+_INLINE_INSTRUCTION_CONFIG = types.GenerateContentConfig(system_instruction=SYSTEM_INSTRUCTION)
+
+
+def note_extraction_failure(details: str, extraction_failed: bool) -> str:
+    """Details for the model; a failed extraction the pre-screen let through is passed on as a note."""
+    if not extraction_failed:
+        return details
+    return join_documents([
+        details,
+        "Note: text could not be extracted from one or more uploaded documents (e.g. scanned or image-only PDFs); "
+        "their content is missing from the details above."
+    ])
+
+
+def _instruction_cacheable(model: str) -> bool:
+    """Whether SYSTEM_INSTRUCTION reaches the model's minimum cacheable size; creating a smaller cache always fails."""
+    min_tokens = next(
+        (tokens for prefix, tokens in _CONTEXT_CACHE_MIN_TOKENS.items() if model.startswith(prefix)),
+        _CONTEXT_CACHE_DEFAULT_MIN_TOKENS
+    )
+    return _INSTRUCTION_TOKENS >= min_tokens
+
+
+def _is_cached_content_error(e: Exception) -> bool:
+    """The request was refused because its cached content is gone or invalid (404/400/403 naming it)."""
+    code = getattr(e, "code", None)
+    return code in (400, 403, 404) and "cache" in str(e).lower()
+
 
 class ModelService():
     def __init__(self):
@@ -11,36 +74,658 @@ class ModelService():
         self.client = genai.Client(api_key=gemini_setting.api_key)
         self.model = gemini_setting.default_model
         self.validator = Validator()
+        self.limiter = get_model_limiter()
+        self.rules_engine = get_rules_engine()
+        self.caching_service = CachingService()
+        self.response_cache_ttl = gemini_setting.response_cache_ttl_seconds
+        self.max_prompt_tokens = gemini_setting.max_prompt_tokens
+        self.chunk_tokens = gemini_setting.chunk_tokens
+        self.summary_concurrency = gemini_setting.summary_concurrency
+        self.chunk_summary_cache_ttl = gemini_setting.chunk_summary_cache_ttl_seconds
+        self.context_cache_enabled = gemini_setting.context_cache_enabled
+        self.context_cache_ttl = gemini_setting.context_cache_ttl_seconds
+        # per model: (config, local expiry) and the time of the next creation attempt after a failure
+        self._instruction_configs: Dict[str, Tuple[types.GenerateContentConfig, float]] = {}
+        self._context_cache_retry_at: Dict[str, float] = {}
+        self.fast_model = gemini_setting.fast_model
+        self.routing_max_tokens = gemini_setting.routing_max_tokens
+        self.routing_max_lines = gemini_setting.routing_max_lines
+        self.escalation_confidence = gemini_setting.escalation_confidence
+        self.breaker = get_circuit_breaker()
+        self.circuit_open_action = gemini_setting.circuit_open_action
+
+
+    async def generate_response_v2(
+        self,
+        file_contents: list,
+        manual_input: str,
+        tenant_id: Optional[str] = None,
+        extraction_failed: bool = False
+    ):
+        try:
+            details, failed = await self.extract_details(file_contents, manual_input)
+
+            extraction_failed = extraction_failed or failed
+            screened = self.prescreen(details, tenant_id=tenant_id, extraction_failed=extraction_failed)
+            if screened is not None:
+                return screened
+            return await self.generate_from_details(note_extraction_failure(details, extraction_failed))
+
+        except Exception as e:
+            return str(e)
+
+
+    async def extract_details(self, file_contents: list, manual_input: str) -> Tuple[str, bool]:
+        """Claim details from uploaded PDFs plus manual input, and whether the PDFs yielded no text."""
+        file_service = FileService()
+        extracted = await file_service.extract_text(file_contents)
+        extraction_failed = bool(file_contents) and (not extracted.strip() or extracted.startswith("Error extracting text"))
+        # an extraction error message is not claim text
+        return join_documents(["" if extraction_failed else extracted, manual_input]), extraction_failed
+
+
+    async def generate_stream(
+        self,
+        details: str,
+        tenant_id: Optional[str] = None,
+        extraction_failed: bool = False
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streaming counterpart of generate_from_details. Yields ("stage", name) for prompting,
+        generating and validating, ("delta", text) for incremental model output, and finally
+        ("result", result) with the validated JSON (or an error dict).
+        Pre-screened and cached cases, and oversized packets (map-reduce), yield only the result.
+        """
+        screened = self.prescreen(details, tenant_id=tenant_id, extraction_failed=extraction_failed)
+        if screened is not None:
+            yield "result", screened
+            return
+        details = note_extraction_failure(details, extraction_failed)
+
+        fingerprint = self.prompt_fingerprint(details)
+        cached = await self._get_cached_response(fingerprint)
+        if cached is not None:
+            metrics.incr("model_response_cache_total", outcome="hit")
+            yield "result", cached
+            return
+        metrics.incr("model_response_cache_total", outcome="miss")
+
+        if estimate_tokens(details) > self.max_prompt_tokens:
+            yield "stage", "generating"
+            yield "result", await self._generate(details)
+            return
+
+        if not self._model_available():
+            yield "result", self._model_unavailable()
+            return
 
+        yield "stage", "prompting"
+        base_prompt = get_claim_prompt(details)
+        config = await self._get_instruction_config(self.model)
 
-    async def generate_response_v2(self, file_contents: list, manual_input: str):
+        yield "stage", "generating"
+        parts = []
+        final: Dict[str, Any] = {}
+        started = time.perf_counter()
         try:
-            file_service = FileService()
-            details = await file_service.extract_text(file_contents)
-            details += manual_input
-            base_prompt = get_prompt(details)
-            prompt = base_prompt
-            MAX_RETRIES = 2
+            async for delta in self._stream_claim(base_prompt, config, final):
+                parts.append(delta)
+                yield "delta", delta
+        except asyncio.TimeoutError:
+            self._record_call("stream", self.model, 1, base_prompt, None, started, "timeout")
+            yield "result", {"error": f"Gemini call timed out after {self.limiter.timeout_seconds}s"}
+            return
+        except Exception as e:
+            self._record_call("stream", self.model, 1, base_prompt, None, started, "error")
+            # overload and other failures end the stream: more calls now would only add load (see _generate_claim)
+            if config is _INLINE_INSTRUCTION_CONFIG or not _is_cached_content_error(e):
+                logger.warning("Gemini streaming failed: %s", str(e))
+                yield "result", {"error": str(e)}
+                return
+            # the cached content expired or was evicted server-side, the regular call goes inline
+            logger.warning("Gemini context cache unusable while streaming, falling back to a regular call: %s", str(e))
+            await self._drop_context_cache(self.model)
+            parts = None
+
+        yield "stage", "validating"
+        result = None
+        if parts is not None:
+            text = "".join(parts)
+            outcome = "valid"
+            is_valid, result = self.validator.validate_gemini_response(text)
+            if not is_valid:
+                outcome = "repaired"
+                is_valid, result = self.validator.repair_gemini_response(text)
+            metrics.incr("model_response_validation_total", outcome="streamed" if is_valid else "retry")
+            self._record_call("stream", self.model, 1, base_prompt, final.get("response"), started, outcome if is_valid else "invalid")
+            if not is_valid:
+                result = None
+        if result is None:
+            result = await self._generate_with_retries(base_prompt, self.model, max_retries=2)
+
+        if self._is_cacheable(result):
+            await self._set_cached_response(fingerprint, result)
+        yield "result", result
+
+
+    def prescreen(self, details: str, tenant_id: Optional[str] = None, extraction_failed: bool = False) -> Optional[dict]:
+        """Decision from the deterministic rules engine, or None when the case needs the model."""
+        return self.rules_engine.evaluate(details, tenant_id=tenant_id, extraction_failed=extraction_failed)
+
+
+    async def generate_from_details(self, details: str):
+        """
+        Answer from the prompt-fingerprint cache when possible; identical prompts already
+        in flight in this process share one Gemini call.
+        """
+        fingerprint = self.prompt_fingerprint(details)
+
+        cached = await self._get_cached_response(fingerprint)
+        if cached is not None:
+            metrics.incr("model_response_cache_total", outcome="hit")
+            return cached
+
+        loop = asyncio.get_running_loop()
+        in_flight_key = (id(loop), fingerprint)
+        pending = _IN_FLIGHT.get(in_flight_key)
+        if pending is not None:
+            metrics.incr("model_response_cache_total", outcome="coalesced")
+            result = await asyncio.shield(pending)
+            return dict(result) if isinstance(result, dict) else result
+
+        metrics.incr("model_response_cache_total", outcome="miss")
+        future = loop.create_future()
+        # followers may all be gone; never leave an unretrieved exception behind
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        _IN_FLIGHT[in_flight_key] = future
+        try:
+            result = await self._generate(details)
+            future.set_result(result)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+            raise
+        finally:
+            _IN_FLIGHT.pop(in_flight_key, None)
+
+        if self._is_cacheable(result):
+            await self._set_cached_response(fingerprint, result)
+        return result
+
+
+    async def generate_batch(self, details_list: List[str]) -> List[Any]:
+        """
+        Analyze several small claims with one packed Gemini request, one result per claim.
+        Claims already in the response cache are not sent; claims whose part of the packed
+        answer is missing or invalid fall back to individual generate_from_details calls.
+        """
+        results: List[Any] = [None] * len(details_list)
+        pending = []
+        for i, details in enumerate(details_list):
+            cached = await self._get_cached_response(self.prompt_fingerprint(details))
+            if cached is not None:
+                metrics.incr("model_response_cache_total", outcome="hit")
+                results[i] = cached
+            else:
+                pending.append(i)
+
+        fallbacks = pending
+        if len(pending) > 1:
+            packed = await self._generate_packed([details_list[i] for i in pending])
+            fallbacks = []
+            for i, result in zip(pending, packed):
+                if result is None:
+                    fallbacks.append(i)
+                    continue
+                metrics.incr("model_batch_cases_total", outcome="batched")
+                results[i] = result
+                await self._set_cached_response(self.prompt_fingerprint(details_list[i]), result)
+            if fallbacks:
+                metrics.incr("model_batch_cases_total", len(fallbacks), outcome="fallback")
+
+        individual = await asyncio.gather(*[self.generate_from_details(details_list[i]) for i in fallbacks])
+        for i, result in zip(fallbacks, individual):
+            results[i] = result
+        return results
+
+
+    def prompt_fingerprint(self, details: str) -> str:
+        normalized = " ".join((details or "").split())
+        raw = f"{self.model}\n{PROMPT_VERSION}\n{normalized}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+    async def _generate(self, details: str):
+        if not self._model_available():
+            return self._model_unavailable()
+
+        if estimate_tokens(details) > self.max_prompt_tokens:
+            details = await self._reduce_details(details)
+            if details is None:
+                return {"error": "Failed to summarize oversized claim packet"}
+
+        assembly_started = time.perf_counter()
+        base_prompt = get_claim_prompt(details)
+        metrics.observe("model_prompt_assembly_seconds", time.perf_counter() - assembly_started)
+
+        if self._routes_to_fast_tier(details):
+            metrics.incr("model_routing_total", tier="fast")
+            result = await self._generate_on_tier(base_prompt, self.fast_model, "fast", max_retries=0)
+            if self._is_cacheable(result) and result["confidence"] >= self.escalation_confidence:
+                return result
+            # the stronger model gets the case when the fast one is unsure or unusable
+            reason = "low_confidence" if self._is_cacheable(result) else "invalid"
+            metrics.incr("model_escalations_total", reason=reason)
+        else:
+            metrics.incr("model_routing_total", tier="default")
+
+        return await self._generate_on_tier(base_prompt, self.model, "default", max_retries=2)
+
+
+    def _routes_to_fast_tier(self, details: str) -> bool:
+        """Small, simple cases (few tokens, few lines of documents) go to the fast model first."""
+        if not self.fast_model or self.fast_model == self.model:
+            return False
+        return (
+            estimate_tokens(details) <= self.routing_max_tokens
+            and details.count("\n") + 1 <= self.routing_max_lines
+        )
+
+
+    async def _generate_on_tier(self, base_prompt: str, model: str, tier: str, max_retries: int):
+        started = time.perf_counter()
+        try:
+            return await self._generate_with_retries(base_prompt, model, max_retries)
+        finally:
+            metrics.observe("model_tier_latency_seconds", time.perf_counter() - started, tier=tier)
+
+
+    async def _generate_with_retries(self, base_prompt: str, model: str, max_retries: int):
+        prompt = base_prompt
+
+        for attempt in range(max_retries + 1):
+            if self.breaker is not None and self.breaker.state == OPEN:
+                # the circuit opened while this case was being routed or retried
+                return self._model_unavailable()
+            started = time.perf_counter()
+            try:
+                response = await self._generate_claim(prompt, model)
+            except asyncio.TimeoutError:
+                self._record_call("claim", model, attempt + 1, prompt, None, started, "timeout")
+                return {"error": f"Gemini call timed out after {self.limiter.timeout_seconds}s"}
+            except Exception:
+                self._record_call("claim", model, attempt + 1, prompt, None, started, "error")
+                raise
+
+            is_valid, result = self.validator.validate_gemini_response(response.text)
+            if is_valid:
+                metrics.incr("model_response_validation_total", outcome="valid")
+                self._record_call("claim", model, attempt + 1, prompt, response, started, "valid")
+                return result
+
+            # only pay for another generation when the local repair cannot fix the output
+            is_valid, result = self.validator.repair_gemini_response(response.text)
+            if is_valid:
+                metrics.incr("model_response_validation_total", outcome="repaired")
+                self._record_call("claim", model, attempt + 1, prompt, response, started, "repaired")
+                return result
+            metrics.incr("model_response_validation_total", outcome="retry")
+            self._record_call("claim", model, attempt + 1, prompt, response, started, "invalid")
+            
+            prompt = (
+                base_prompt +
+                "IMPORTANT: Your previous response was not valid JSON or did not match the required structure. "
+                "Please respond ONLY with the correct JSON object as specified above, no extra text."
+            )
+
+        # If all retries failed
+        return {"error": f"Invalid Gemini response after {max_retries + 1} attempts: {result}"}
+
+
+    async def _generate_claim(self, prompt: str, model: str):
+        """One Gemini call for the dynamic claim section; the static instruction comes from the config."""
+        config = await self._get_instruction_config(model)
+        try:
+            response = await self._call_with_config(prompt, config, model)
+        except asyncio.TimeoutError:
+            raise
+        except Exception as e:
+            # overload and other failures are not the cache's fault: dropping the shared name would make
+            # every worker create a new (billed) cache and double the load with inline retries
+            if config is _INLINE_INSTRUCTION_CONFIG or not _is_cached_content_error(e):
+                raise
+            # the cached content expired or was evicted server-side, fall back to the inline instruction
+            logger.warning("Gemini context cache unusable, sending instruction inline: %s", str(e))
+            await self._drop_context_cache(model)
+            config = _INLINE_INSTRUCTION_CONFIG
+            response = await self._call_with_config(prompt, config, model)
+
+        metrics.incr("model_prompt_chars_total", len(prompt), part="dynamic")
+        if config is _INLINE_INSTRUCTION_CONFIG:
+            metrics.incr("model_prompt_chars_total", len(SYSTEM_INSTRUCTION), part="static_inline")
+        return response
+
 
-            for attempt in range(MAX_RETRIES + 1):
-                response = self.client.models.generate_content(
-                    model=self.model,
-                    contents=prompt
+    async def _stream_claim(self, prompt: str, config: types.GenerateContentConfig, final: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Text chunks of a streamed generation. The whole stream holds one limiter slot and shares
+        its timeout; chunks are handed over through a queue so they can be yielded as they arrive.
+        The last chunk, which carries the usage totals, is left in final["response"].
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        async def consume():
+            stream = await self.client.aio.models.generate_content_stream(model=self.model, contents=prompt, config=config)
+            last_chunk = None
+            async for chunk in stream:
+                if chunk.text:
+                    queue.put_nowait(chunk.text)
+                last_chunk = chunk
+            # usage metadata is cumulative, the last chunk carries the totals
+            final["response"] = last_chunk
+
+        task = asyncio.create_task(self.limiter.run(consume))
+        task.add_done_callback(lambda _: queue.put_nowait(done))
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                yield item
+            await task
+        finally:
+            if not task.done():
+                task.cancel()
+
+
+    async def _call_with_config(self, prompt: str, config: types.GenerateContentConfig, model: str):
+        # async client so a slow generation never blocks the event loop
+        return await self.limiter.run(
+            lambda: self.client.aio.models.generate_content(model=model, contents=prompt, config=config)
+        )
+
+
+    async def _get_instruction_config(self, model: Optional[str] = None) -> types.GenerateContentConfig:
+        """
+        Config referencing a Gemini cached content that holds SYSTEM_INSTRUCTION, created once per
+        model and prompt version and shared by workers through Redis. Falls back to sending the
+        instruction inline when caching is disabled, the instruction is too small to cache, or the
+        cache cannot be created (a failure is shared through Redis, so other workers do not retry it).
+        """
+        model = model or self.model
+        now = time.monotonic()
+        if (
+            not self.context_cache_enabled
+            or not _instruction_cacheable(model)
+            or now < self._context_cache_retry_at.get(model, 0.0)
+        ):
+            metrics.incr("model_prompt_prefix_total", mode="inline")
+            return _INLINE_INSTRUCTION_CONFIG
+        config, expires_at = self._instruction_configs.get(model, (None, 0.0))
+        if config is not None and now < expires_at:
+            metrics.incr("model_prompt_prefix_total", mode="cached")
+            return config
+
+        cache_key = self._context_cache_key(model)
+        try:
+            name = await self.caching_service.get_str(cache_key)
+            remaining = await self.caching_service.ttl(cache_key) if isinstance(name, str) else -1
+            if not isinstance(name, str) or not isinstance(remaining, int) or remaining <= 0:
+                backoff = await self.caching_service.ttl(self._context_cache_unavailable_key(model))
+                if isinstance(backoff, int) and backoff > 0:
+                    # another worker failed to create the cache recently
+                    self._context_cache_retry_at[model] = now + backoff
+                    metrics.incr("model_prompt_prefix_total", mode="inline")
+                    return _INLINE_INSTRUCTION_CONFIG
+                cached_content = await self.client.aio.caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=SYSTEM_INSTRUCTION,
+                        display_name=f"claims-instruction-{PROMPT_VERSION}",
+                        ttl=f"{self.context_cache_ttl}s"
+                    )
                 )
-                is_valid, result = self.validator.validate_gemini_response(response.text)
-                if is_valid:
-                    # await file_service.save_response(case_id, result)
-                    return result
-                
-                prompt = (
-                    base_prompt +
-                    "IMPORTANT: Your previous response was not valid JSON or did not match the required structure. "
-                    "Please respond ONLY with the correct JSON object as specified above, no extra text."
+                name = cached_content.name
+                remaining = self.context_cache_ttl - _CONTEXT_CACHE_MARGIN_SECONDS
+                await self.caching_service.set_str(cache_key, name, ttl_seconds=remaining)
+        except Exception as e:
+            # e.g. the instruction is below the model's minimum cacheable size
+            logger.warning("Gemini context cache unavailable, sending instruction inline: %s", str(e))
+            await self._back_off_context_cache(model)
+            metrics.incr("model_prompt_prefix_total", mode="inline")
+            return _INLINE_INSTRUCTION_CONFIG
+
+        config = types.GenerateContentConfig(cached_content=name)
+        self._instruction_configs[model] = (config, now + remaining)
+        metrics.incr("model_prompt_prefix_total", mode="cached")
+        return config
+
+
+    async def _drop_context_cache(self, model: str) -> None:
+        self._instruction_configs.pop(model, None)
+        await self._back_off_context_cache(model)
+        try:
+            await self.caching_service.delete(self._context_cache_key(model))
+        except Exception as e:
+            logger.warning("Gemini context cache key cleanup failed: %s", str(e))
+
+
+    async def _back_off_context_cache(self, model: str) -> None:
+        self._context_cache_retry_at[model] = time.monotonic() + _CONTEXT_CACHE_RETRY_SECONDS
+        try:
+            await self.caching_service.set_str(
+                self._context_cache_unavailable_key(model), "1", ttl_seconds=_CONTEXT_CACHE_RETRY_SECONDS
+            )
+        except Exception as e:
+            logger.warning("Gemini context cache backoff could not be shared: %s", str(e))
+
+
+    def _context_cache_key(self, model: str) -> str:
+        return f"model:context_cache:{model}:{PROMPT_VERSION}"
+
+
+    def _context_cache_unavailable_key(self, model: str) -> str:
+        return f"model:context_cache_unavailable:{model}:{PROMPT_VERSION}"
+
+
+    def _record_call(self, kind: str, model: str, attempt: int, prompt: str, response: Any, started: float, outcome: str) -> None:
+        """
+        Per-call instrumentation: metrics tagged by model/kind/outcome (and tenant when known),
+        one structured log event, and an entry in the current case's ModelCallRecorder, which is
+        persisted with the saved response.
+        """
+        recorder = current_recorder()
+        tenant_id = recorder.tenant_id if recorder else None
+        latency_seconds = time.perf_counter() - started
+        usage = self._usage(response)
+        call = {
+            "model": model,
+            "kind": kind,
+            "attempt": attempt,
+            "outcome": outcome,
+            "prompt_chars": len(prompt),
+            # Gemini's count when available, else the local estimate of the dynamic prompt
+            "prompt_tokens": usage.get("prompt", estimate_tokens(prompt)),
+            "cached_tokens": usage.get("cached", 0),
+            "output_tokens": usage.get("output", 0),
+            "latency_ms": round(latency_seconds * 1000, 1),
+        }
+
+        metrics.incr("model_calls_total", model=model, kind=kind, outcome=outcome, tenant=tenant_id)
+        metrics.observe("model_call_latency_seconds", latency_seconds, model=model, kind=kind)
+        metrics.observe("model_call_attempt", attempt, model=model, kind=kind)
+        for direction in ("prompt", "cached", "output"):
+            metrics.incr("model_call_tokens_total", call[f"{direction}_tokens"], model=model, direction=direction, tenant=tenant_id)
+
+        logger.info(
+            "model_call %s",
+            json.dumps({**call, "case_id": recorder.case_id if recorder else None, "tenant_id": tenant_id})
+        )
+        if recorder is not None:
+            recorder.add(call)
+
+
+    def _usage(self, response: Any) -> Dict[str, int]:
+        usage = getattr(response, "usage_metadata", None)
+        counts = {}
+        for field, kind in (
+            ("prompt_token_count", "prompt"),
+            ("cached_content_token_count", "cached"),
+            ("candidates_token_count", "output"),
+        ):
+            value = getattr(usage, field, None)
+            if isinstance(value, int):
+                counts[kind] = value
+                metrics.incr("model_tokens_total", value, kind=kind)
+        return counts
+
+
+    async def _generate_packed(self, details_list: List[str]) -> List[Optional[dict]]:
+        """One request for all claims; returns the validated result per claim, None where unusable."""
+        if not self._model_available():
+            # every claim falls back to generate_from_details, which answers per the open-circuit action
+            return [None] * len(details_list)
+        keys = [f"CASE_{i}" for i in range(1, len(details_list) + 1)]
+        prompt = get_batch_prompt(list(zip(keys, details_list)))
+        metrics.incr("model_batch_requests_total")
+        started = time.perf_counter()
+        try:
+            response = await self.limiter.run(
+                lambda: self.client.aio.models.generate_content(model=self.model, contents=prompt)
+            )
+            data = self.validator.extract_json_object(response.text)
+        except Exception as e:
+            logger.warning("Packed Gemini request for %d cases failed: %s", len(keys), str(e))
+            self._record_call("batch", self.model, 1, prompt, None, started, "error")
+            return [None] * len(keys)
+
+        self._record_call("batch", self.model, 1, prompt, response, started, "valid" if isinstance(data, dict) else "invalid")
+        if not isinstance(data, dict):
+            return [None] * len(keys)
+
+        results = []
+        for key in keys:
+            item = data.get(key)
+            is_valid, result = self.validator.validate_gemini_data(item)
+            if not is_valid and isinstance(item, dict):
+                is_valid, result = self.validator.repair_gemini_response(json.dumps(item))
+            results.append(result if is_valid else None)
+        return results
+
+
+    async def _reduce_details(self, details: str) -> Optional[str]:
+        """
+        Map-reduce mode for packets over the prompt budget: split into token-budgeted chunks,
+        summarize them concurrently, and repeat on the summaries until they fit.
+        Returns None if any chunk could not be summarized.
+        """
+        metrics.incr("model_map_reduce_total")
+        for _ in range(_MAX_REDUCE_ROUNDS):
+            chunks = split_into_chunks(details, self.chunk_tokens)
+            semaphore = asyncio.Semaphore(max(1, self.summary_concurrency))
+            summaries = await asyncio.gather(*[self._summarize_chunk(chunk, semaphore) for chunk in chunks])
+            if any(summary is None for summary in summaries):
+                return None
+
+            details = self._join_summaries(summaries)
+            if estimate_tokens(details) <= self.max_prompt_tokens:
+                break
+        return details
+
+
+    async def _summarize_chunk(self, chunk: str, semaphore: asyncio.Semaphore) -> Optional[str]:
+        """Summary of one chunk, cached by content hash so later runs over the same documents reuse it."""
+        cache_key = f"model:chunk:{self._chunk_fingerprint(chunk)}"
+        cached = await self._get_cached_summary(cache_key)
+        if cached:
+            metrics.incr("model_chunk_summary_total", outcome="hit")
+            return cached
+
+        prompt = get_chunk_summary_prompt(chunk)
+        async with semaphore:
+            started = time.perf_counter()
+            response = None
+            try:
+                response = await self.limiter.run(
+                    lambda: self.client.aio.models.generate_content(model=self.model, contents=prompt)
                 )
+                summary = (response.text or "").strip()
+            except Exception as e:
+                logger.warning("Chunk summary failed: %s", str(e))
+                summary = ""
+            self._record_call("chunk_summary", self.model, 1, prompt, response, started, "valid" if summary else "error")
+
+        if not summary:
+            metrics.incr("model_chunk_summary_total", outcome="error")
+            return None
 
-            # If all retries failed
-            return {"error": f"Invalid Gemini response after {MAX_RETRIES + 1} attempts: {result}"}
+        metrics.incr("model_chunk_summary_total", outcome="miss")
+        await self._set_cached_summary(cache_key, summary)
+        return summary
 
+
+    def _chunk_fingerprint(self, chunk: str) -> str:
+        raw = f"{self.model}\n{CHUNK_SUMMARY_PROMPT_VERSION}\n{chunk}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+    def _join_summaries(self, summaries: List[str]) -> str:
+        total = len(summaries)
+        return "\n\n".join(
+            f"[Summary of claim packet part {i} of {total}]\n{summary}"
+            for i, summary in enumerate(summaries, start=1)
+        )
+
+
+    async def _get_cached_summary(self, cache_key: str) -> Optional[str]:
+        if self.chunk_summary_cache_ttl <= 0:
+            return None
+        try:
+            return await self.caching_service.get_str(cache_key)
         except Exception as e:
-            return str(e)
+            logger.warning("Chunk summary cache read failed: %s", str(e))
+            return None
+
 
+    async def _set_cached_summary(self, cache_key: str, summary: str) -> None:
+        if self.chunk_summary_cache_ttl <= 0:
+            return
+        try:
+            await self.caching_service.set_str(cache_key, summary, ttl_seconds=self.chunk_summary_cache_ttl)
+        except Exception as e:
+            logger.warning("Chunk summary cache write failed: %s", str(e))
+
+
+    def _is_cacheable(self, result: Any) -> bool:
+        return isinstance(result, dict) and "error" not in result and not is_model_unavailable(result)
+
+
+    def _model_available(self) -> bool:
+        return self.breaker is None or self.breaker.allow()
+
+
+    def _model_unavailable(self) -> dict:
+        metrics.incr("model_circuit_rejections_total", action=self.circuit_open_action)
+        return model_unavailable_result(self.circuit_open_action, self.breaker.retry_after() if self.breaker else 0.0)
+
+
+    async def _get_cached_response(self, fingerprint: str):
+        if self.response_cache_ttl <= 0:
+            return None
+        try:
+            return await self.caching_service.get_json(f"model:response:{fingerprint}")
+        except Exception as e:
+            logger.warning("Model response cache read failed: %s", str(e))
+            return None
+
+
+    async def _set_cached_response(self, fingerprint: str, result: Dict[str, Any]) -> None:
+        if self.response_cache_ttl <= 0:
+            return
+        try:
+            await self.caching_service.set_json(f"model:response:{fingerprint}", result, ttl_seconds=self.response_cache_ttl)
+        except Exception as e:
+            logger.warning("Model response cache write failed: %s", str(e))
@@ -0,0 +1,114 @@
+from app.service.caching_service import CachingService
+from app.utils.metrics import metrics
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Token bucket whose refill rate lives in the same hash, so every process shares one rate.
+# KEYS[1] bucket; ARGV: default_rate, burst. Returns {wait_ms, rate}.
+_ACQUIRE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local rate = tonumber(redis.call('HGET', KEYS[1], 'rate') or ARGV[1])
+local burst = tonumber(ARGV[2])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or burst)
+local ts = tonumber(redis.call('HGET', KEYS[1], 'ts') or now)
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now, 'rate', tostring(rate))
+redis.call('PEXPIRE', KEYS[1], 3600000)
+return {wait, tostring(rate)}
+"""
+
+# AIMD on the shared rate. KEYS[1] bucket; ARGV: mode (inc|dec), amount, min, max, default_rate, cooldown_ms.
+# Decreases closer together than cooldown_ms count once, so one 429 burst does not collapse the rate.
+_ADJUST_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local rate = tonumber(redis.call('HGET', KEYS[1], 'rate') or ARGV[5])
+if ARGV[1] == 'dec' then
+    local last = tonumber(redis.call('HGET', KEYS[1], 'dec_at') or 0)
+    if now - last < tonumber(ARGV[6]) then
+        return tostring(rate)
+    end
+    rate = rate * tonumber(ARGV[2])
+    redis.call('HSET', KEYS[1], 'dec_at', now)
+else
+    rate = rate + tonumber(ARGV[2])
+end
+rate = math.max(tonumber(ARGV[3]), math.min(tonumber(ARGV[4]), rate))
+redis.call('HSET', KEYS[1], 'rate', tostring(rate))
+redis.call('PEXPIRE', KEYS[1], 3600000)
+return tostring(rate)
+"""
+
+
+class ClusterRateLimiter():
+    """
+    Redis token bucket shared by every process calling Gemini (API workers, Celery workers,
+    in-process background tasks), with AIMD on its refill rate: 429s and slow responses halve
+    the rate cluster-wide, successes add `increase_rps` back up to `max_rps`.
+    Fails open when Redis is unreachable so model calls are never blocked by the limiter itself.
+    """
+    def __init__(
+        self,
+        name: str,
+        max_rps: float,
+        min_rps: float,
+        burst: int,
+        increase_rps: float = 0.1,
+        decrease_factor: float = 0.5,
+        cooldown_seconds: float = 2.0
+    ):
+        self.key = f"ratelimit:{name}"
+        self.max_rps = max_rps
+        self.min_rps = min_rps
+        self.burst = max(1, int(burst))
+        self.increase_rps = increase_rps
+        self.decrease_factor = decrease_factor
+        self.cooldown_ms = int(cooldown_seconds * 1000)
+        self.caching_service = CachingService()
+        self._acquire_script = self.caching_service.redis.register_script(_ACQUIRE_SCRIPT)
+        self._adjust_script = self.caching_service.redis.register_script(_ADJUST_SCRIPT)
+
+
+    async def acquire(self) -> None:
+        """Wait until the shared bucket hands out a token."""
+        while True:
+            try:
+                wait_ms, rate = self._acquire_script(keys=[self.key], args=[self.max_rps, self.burst])
+            except Exception as e:
+                metrics.incr("model_rate_limiter_errors_total")
+                logger.warning("Cluster rate limiter unavailable, continuing without it: %s", str(e))
+                return
+            metrics.set_gauge("model_rate_limit_permitted_rps", float(rate))
+            if int(wait_ms) <= 0:
+                return
+            metrics.incr("model_rate_limiter_throttled_total")
+            await asyncio.sleep(int(wait_ms) / 1000)
+
+
+    async def on_success(self) -> None:
+        await self._adjust("inc", self.increase_rps)
+
+
+    async def on_overload(self) -> None:
+        await self._adjust("dec", self.decrease_factor)
+
+
+    async def _adjust(self, mode: str, amount: float) -> None:
+        try:
+            rate = self._adjust_script(
+                keys=[self.key],
+                args=[mode, amount, self.min_rps, self.max_rps, self.max_rps, self.cooldown_ms]
+            )
+            metrics.set_gauge("model_rate_limit_permitted_rps", float(rate))
+        except Exception as e:
+            metrics.incr("model_rate_limiter_errors_total")
+            logger.warning("Cluster rate limiter adjustment failed: %s", str(e))
@@ -0,0 +1,156 @@
+from app.config.settings import get_settings
+from app.utils.metrics import metrics
+from typing import Any, Dict, List, Optional
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Same payload the claim prompt asks the model to return for empty details
+_EMPTY_DETAILS_REASONING = (
+    "No claim details or supporting documentation were provided for analysis. "
+    "This case requires immediate human expert intervention to gather necessary data."
+)
+_EXTRACTION_FAILED_REASONING = (
+    "Text could not be extracted from the uploaded documents, so the claim cannot be analyzed automatically. "
+    "This case requires human review of the original files."
+)
+# With a failed extraction, the remaining text must have at least this many letters/digits
+# (or min_detail_chars, if higher) for the model to analyze it
+_EXTRACTION_FAILED_MIN_CHARS = 40
+
+
+class _Rule():
+    def __init__(self, config: Dict[str, Any]):
+        self.id = str(config["id"]).upper()
+        self.tenants = set(config.get("tenants") or [])
+        self.pattern = re.compile(config["pattern"])
+        self.result = {
+            "decision": config.get("decision", "REVIEW_REQUIRED"),
+            "reasoning": config.get("reasoning", f"Matched pre-screen rule {self.id}."),
+            "confidence": config.get("confidence", 50),
+            "riskScore": config.get("riskScore", "HIGH"),
+            "flags": list(config.get("flags") or []) + [f"RULE_{self.id}"],
+        }
+
+
+class RulesEngine():
+    """
+    Deterministic pre-screen evaluated before any model call. Built-in rules cover empty or
+    near-empty details, and failed text extraction when little else is left; configurable regex rules, global or per tenant,
+    are loaded from a JSON file and reloaded when its mtime changes.
+    A match returns a complete decision carrying a RULE_<ID> flag.
+    """
+    def __init__(self, rules_path: str, reload_interval_seconds: float = 5.0):
+        self.rules_path = rules_path
+        self.reload_interval_seconds = reload_interval_seconds
+        self.min_detail_chars = 0
+        self._global_rules: List[_Rule] = []
+        self._tenant_rules: Dict[str, List[_Rule]] = {}
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+
+    def evaluate(self, details: str, tenant_id: Optional[str] = None, extraction_failed: bool = False) -> Optional[dict]:
+        """Decision of the first matching rule, or None when the case needs the model."""
+        self._maybe_reload()
+        started = time.perf_counter()
+        try:
+            rule_id, result = self._match(details or "", tenant_id, extraction_failed)
+        finally:
+            metrics.observe("prescreen_eval_seconds", time.perf_counter() - started)
+        if result is None:
+            return None
+        metrics.incr("prescreen_matches_total", rule=rule_id)
+        return {**result, "flags": list(result["flags"])}
+
+
+    def _match(self, details: str, tenant_id: Optional[str], extraction_failed: bool):
+        stripped = details.strip()
+        if not stripped:
+            return "EMPTY_DETAILS", self._builtin("EMPTY_DETAILS", _EMPTY_DETAILS_REASONING)
+        # the rest of the details (e.g. a manual narrative) can still be analyzed without the failed documents
+        if extraction_failed and self._near_empty(stripped, max(self.min_detail_chars, _EXTRACTION_FAILED_MIN_CHARS)):
+            return "EXTRACTION_FAILED", self._builtin("EXTRACTION_FAILED", _EXTRACTION_FAILED_REASONING)
+        if self._near_empty(stripped, self.min_detail_chars):
+            return "NEAR_EMPTY_DETAILS", self._builtin("NEAR_EMPTY_DETAILS", _EMPTY_DETAILS_REASONING)
+
+        for rule in self._tenant_rules.get(tenant_id, []) + self._global_rules:
+            if rule.pattern.search(details):
+                return rule.id, rule.result
+        return None, None
+
+
+    def _near_empty(self, stripped: str, min_chars: int) -> bool:
+        # only short texts can be near-empty; long ones are never scanned character by character
+        return len(stripped) < min_chars * 4 and sum(ch.isalnum() for ch in stripped) < min_chars
+
+
+    def _builtin(self, rule_id: str, reasoning: str) -> dict:
+        return {
+            "decision": "REVIEW_REQUIRED",
+            "reasoning": reasoning,
+            "confidence": 50,
+            "riskScore": "HIGH",
+            "flags": ["MANUAL_REVIEW_REQUIRED", f"RULE_{rule_id}"],
+        }
+
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.reload_interval_seconds
+            try:
+                mtime = os.stat(self.rules_path).st_mtime
+            except OSError:
+                return
+            if mtime == self._mtime:
+                return
+            try:
+                self._load()
+                self._mtime = mtime
+            except Exception as e:
+                # keep serving the previous rule set until the file is fixed
+                logger.error("Failed to load pre-screen rules from %s: %s", self.rules_path, str(e))
+
+
+    def _load(self) -> None:
+        with open(self.rules_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+
+        global_rules: List[_Rule] = []
+        tenant_rules: Dict[str, List[_Rule]] = {}
+        for rule_config in config.get("rules", []):
+            if not rule_config.get("enabled", True):
+                continue
+            rule = _Rule(rule_config)
+            if rule.tenants:
+                for tenant in rule.tenants:
+                    tenant_rules.setdefault(tenant, []).append(rule)
+            else:
+                global_rules.append(rule)
+
+        self.min_detail_chars = int(config.get("min_detail_chars", 0))
+        self._global_rules = global_rules
+        self._tenant_rules = tenant_rules
+        logger.info("Loaded %d pre-screen rules from %s", len(global_rules) + sum(map(len, tenant_rules.values())), self.rules_path)
+
+
+_ENGINE: Optional[RulesEngine] = None
+
+
+def get_rules_engine() -> RulesEngine:
+    global _ENGINE
+    if _ENGINE is None:
+        prescreen_setting = get_settings().prescreen
+        _ENGINE = RulesEngine(prescreen_setting.rules_path, prescreen_setting.reload_interval_seconds)
+    return _ENGINE
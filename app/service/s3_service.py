@@ -1,9 +1,10 @@
 from app.config.settings import get_settings
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from app.service.caching_service import CachingService
 from fastapi import UploadFile
 from zoneinfo import ZoneInfo
 from PyPDF2 import PdfReader
+import asyncio
 import datetime
 import json
 import boto3
@@ -12,6 +13,27 @@ import io
 import uuid
 
 
+# Between pages and between documents, the boundary chunking splits at first
+DOCUMENT_SEPARATOR = "\n\n"
+
+
+def join_documents(texts: List[str]) -> str:
+    """Join page or document texts so each stays recognizable as a unit, skipping empty ones."""
+    return DOCUMENT_SEPARATOR.join(text for text in texts if text)
+
+
+def _reader_text(reader: PdfReader) -> str:
+    return join_documents([page.extract_text() or "" for page in reader.pages])
+
+
+def pdf_text_from_bytes(content: bytes) -> str:
+    """Text of a PDF, "" when it cannot be read. A plain function so it can run in a process pool."""
+    try:
+        return _reader_text(PdfReader(io.BytesIO(content)))
+    except Exception:
+        return ""
+
+
 class FileService:
     def __init__(self):
         setting = get_settings()
@@ -35,12 +57,8 @@ class FileService:
             file_texts = []
             for file_info in file_contents:
                 content = file_info["content"]
-                reader = PdfReader(io.BytesIO(content))
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() or ""
-                file_texts.append(text)
-            return "".join(file_texts)
+                file_texts.append(_reader_text(PdfReader(io.BytesIO(content))))
+            return join_documents(file_texts)
         except Exception as e:
             return f"Error extracting text: {e}"
 
@@ -114,16 +132,29 @@ class FileService:
 
     async def extract_content(self, s3_key: str) -> Any:
         try:
-            s3_obj = self.s3_client.get_object(
-                Bucket=self.aws_bucket_name,
-                Key=s3_key
-            )
-            content = s3_obj["Body"].read().decode("utf-8")
+            content = (await asyncio.to_thread(self.read_object, s3_key)).decode("utf-8")
             return json.loads(content)
         except Exception as e:
             return {"error": str(e)}
 
 
+    async def get_etags(self, s3_keys: List[str]) -> Dict[str, str]:
+        """
+        ETag of each of the given objects, one HEAD per key run concurrently in threads (boto3 blocks).
+        Missing or unreadable objects are left out.
+        """
+        def head_etag(s3_key: str) -> Optional[str]:
+            try:
+                return self.s3_client.head_object(Bucket=self.aws_bucket_name, Key=s3_key).get("ETag", "").strip('"')
+            except Exception as e:
+                print(f"Error in get_etags for {s3_key}: {e}")
+                return None
+
+        keys = list(dict.fromkeys(key for key in s3_keys if key))
+        etags = await asyncio.gather(*[asyncio.to_thread(head_etag, key) for key in keys])
+        return {key: etag for key, etag in zip(keys, etags) if etag is not None}
+
+
     async def extract_pdf_text_cached_from_s3(self, s3_key: str, ttl_seconds: int = 86400) -> str:
         try:
             cache_key = f"pdf:text:{s3_key}"
@@ -142,6 +173,38 @@ class FileService:
             return ""
 
 
+    async def get_cached_pdf_text(self, s3_key: str) -> Optional[str]:
+        """Cached text of a stored PDF, None on a miss."""
+        try:
+            cached = await self.caching_service.get_str(f"pdf:text:{s3_key}")
+            return cached if isinstance(cached, str) and cached else None
+        except Exception:
+            return None
+
+
+    async def cache_pdf_text(self, s3_key: str, text: str, ttl_seconds: int = 86400) -> None:
+        try:
+            await self.caching_service.set_str(f"pdf:text:{s3_key}", text, ttl_seconds=ttl_seconds)
+        except Exception as e:
+            print(f"Error in cache_pdf_text: {e}")
+
+
+    async def download_bytes(self, s3_key: str) -> Optional[bytes]:
+        """Raw content of an S3 object, None when it cannot be downloaded."""
+        try:
+            buffer = io.BytesIO()
+            await asyncio.to_thread(self.s3_client.download_fileobj, self.aws_bucket_name, s3_key, buffer)
+            return buffer.getvalue()
+        except Exception:
+            return None
+
+
+    def read_object(self, s3_key: str) -> bytes:
+        """Blocking read of a whole S3 object; run it in a thread from async code."""
+        s3_obj = self.s3_client.get_object(Bucket=self.aws_bucket_name, Key=s3_key)
+        return s3_obj["Body"].read()
+
+
     async def save_files_from_bytes(self, items: List[Dict[str, Any]], case_id: str) -> Dict[str, Any]:
         try:
             if not items:
@@ -213,11 +276,7 @@ class FileService:
             if not s3_key.lower().endswith('.pdf'):
                 return
 
-            reader = PdfReader(io.BytesIO(content))
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() or ""
-            
+            text = _reader_text(PdfReader(io.BytesIO(content)))
             if text:
                 await self.caching_service.set_str(f"pdf:text:{s3_key}", text, ttl_seconds=86400)
         except Exception as e:
@@ -227,15 +286,5 @@ class FileService:
 
     async def _extract_pdf_text_from_s3(self, s3_key: str) -> str:
         """Extract text from PDF stored in S3."""
-        try:
-            pdf_bytes = io.BytesIO()
-            self.s3_client.download_fileobj(self.aws_bucket_name, s3_key, pdf_bytes)
-            pdf_bytes.seek(0)
-
-            reader = PdfReader(pdf_bytes)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() or ""
-            return text
-        except Exception:
-            return ""
\ No newline at end of file
+        content = await self.download_bytes(s3_key)
+        return pdf_text_from_bytes(content) if content else ""
\ No newline at end of file
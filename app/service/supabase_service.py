@@ -1,6 +1,6 @@
 from app.config.settings import get_settings
 from supabase import Client, create_client
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, AsyncIterator
 
 
 class SupabaseService():
@@ -60,7 +60,23 @@ class SupabaseService():
         except Exception as e:
             return {"error": str(e)}
 
-    
+
+    async def update_bulk(self, table_name: str, ids: List[str], objects: Dict[str, Any]):
+        try:
+            if not ids:
+                return []
+
+            response = (
+                self.sp_client.table(table_name)
+                .update(objects)
+                .in_("id", ids)
+                .execute()
+            )
+            return response.data if response.data else []
+        except Exception as e:
+            return {"error": str(e)}
+
+
     async def get_all_name_id(self, table_name: str):
         try:
             response = (
@@ -80,7 +96,7 @@ class SupabaseService():
         try:
             response = (
                 self.sp_client.table("files")
-                .select("id, s3_link, case_name, is_active")
+                .select("id, s3_link, case_name, is_active, tenant_id")
                 .eq("case_id", case_id)
                 .eq("is_active", True)
                 .execute()
@@ -98,6 +114,33 @@ class SupabaseService():
             return []
 
 
+    async def get_files_by_case_ids(self, case_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Active files for many cases in one in-filtered query, grouped by case_id and deduplicated by s3_link."""
+        try:
+            if not case_ids:
+                return {}
+
+            response = (
+                self.sp_client.table("files")
+                .select("id, case_id, s3_link, case_name, is_active, tenant_id")
+                .in_("case_id", case_ids)
+                .eq("is_active", True)
+                .execute()
+            )
+            grouped: Dict[str, List[Dict[str, Any]]] = {case_id: [] for case_id in case_ids}
+            seen = set()
+            for row in response.data if response.data else []:
+                s3_link = row.get("s3_link")
+                key = (row.get("case_id"), s3_link)
+                if s3_link and key not in seen:
+                    seen.add(key)
+                    grouped.setdefault(row.get("case_id"), []).append(row)
+            return grouped
+        except Exception as e:
+            print("Supabase Service Error - get_files_by_case_ids", e)
+            return {}
+
+
     async def get_responses_by_case_id(self, case_id: str):
         try:
             response = (
@@ -132,6 +175,34 @@ class SupabaseService():
             return {"error": str(e)}
 
 
+    async def get_latest_responses_by_case_ids(self, case_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Newest active fingerprinted response per case, for many cases in one query."""
+        try:
+            if not case_ids:
+                return {}
+
+            # one case row each with only its newest response embedded, so the result never grows
+            # with a case's history (nor hits the max-rows cap)
+            response = (
+                self.sp_client.table("case")
+                .select("id, response(id, case_id, s3_link, created_at, input_fingerprint)")
+                .in_("id", case_ids)
+                .eq("response.is_active", True)
+                .not_.is_("response.input_fingerprint", "null")
+                .order("created_at", desc=True, foreign_table="response")
+                .limit(1, foreign_table="response")
+                .execute()
+            )
+            latest: Dict[str, Dict[str, Any]] = {}
+            for row in response.data if response.data else []:
+                if row.get("response"):
+                    latest[row["id"]] = row["response"][0]
+            return latest
+        except Exception as e:
+            print("Supabase Service Error - get_latest_responses_by_case_ids", e)
+            return {}
+
+
     async def get_all_files(self, table_name: str, case_id: str, tenant_id: str, columns: str):
         try:
             response = (
@@ -181,4 +252,119 @@ class SupabaseService():
         except Exception as e:
             print("Supabase Service Error - get_all", e)
             return None
-    
+
+
+    async def get_case_snapshot(
+        self,
+        table_name: str,
+        case_id: str,
+        case_columns: str,
+        file_columns: str,
+        response_columns: Optional[str] = None,
+        response_limit: Optional[int] = 1
+    ):
+        """
+        Fetch a case row with its active files and (optionally) its newest responses
+        embedded, in a single PostgREST round trip.
+        response_limit=None embeds every active response, newest first.
+        """
+        try:
+            select = f"{case_columns}, files({file_columns})"
+            if response_columns:
+                select += f", response({response_columns})"
+
+            query = (
+                self.sp_client.table(table_name)
+                .select(select)
+                .eq("id", case_id)
+                .eq("files.is_active", True)
+                .is_("files.deleted_at", "null")
+            )
+            if response_columns:
+                query = (
+                    query
+                    .eq("response.is_active", True)
+                    .order("created_at", desc=True, foreign_table="response")
+                )
+                if response_limit:
+                    query = query.limit(response_limit, foreign_table="response")
+
+            response = query.execute()
+            if response.data and len(response.data) > 0:
+                return response.data[0]
+
+            return None
+
+        except Exception as e:
+            print("Supabase Service Error - get_case_snapshot", e)
+            return None
+
+
+    async def get_page(
+        self,
+        table_name: str,
+        columns: str,
+        limit: int,
+        after_id: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Keyset pagination ordered by id. Fetches limit + 1 rows so the caller knows
+        whether another page exists without an extra count query.
+        Returns (rows, has_more).
+        """
+        try:
+            query = (
+                self.sp_client.table(table_name)
+                .select(columns)
+            )
+            for column, value in (filters or {}).items():
+                query = query.eq(column, value)
+            if after_id:
+                query = query.gt("id", after_id)
+
+            response = (
+                query
+                .order("id")
+                .limit(limit + 1)
+                .execute()
+            )
+            rows = response.data if response.data else []
+            return rows[:limit], len(rows) > limit
+
+        except Exception as e:
+            print("Supabase Service Error - get_page", e)
+            return None, False
+
+
+    async def stream_all(
+        self,
+        table_name: str,
+        columns: str,
+        page_size: int = 500,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield every row page by page so exports never hold the whole table in memory.
+        Raises RuntimeError when a page cannot be read, so a partial export is never taken for a complete one.
+        """
+        after_id = None
+        while True:
+            rows, has_more = await self.get_page(
+                table_name=table_name,
+                columns=columns,
+                limit=page_size,
+                after_id=after_id,
+                filters=filters
+            )
+            if rows is None:
+                raise RuntimeError(f"Failed to read {table_name} rows after id {after_id}")
+            if not rows:
+                return
+
+            for row in rows:
+                yield row
+
+            if not has_more:
+                return
+            after_id = rows[-1]["id"]
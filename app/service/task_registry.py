@@ -0,0 +1,256 @@
+from app.service.caching_service import CachingService
+from app.config.settings import get_settings
+from typing import Any, Dict, List, Optional, Tuple
+import redis.asyncio as aioredis
+import asyncio
+import json
+
+# DEFERRED: the model was unavailable and the case was handed to a later (Celery) run
+TERMINAL_STATES = ("SUCCESS", "FAILURE", "DEFERRED")
+
+# Fields stored JSON-encoded in the task hash
+_JSON_FIELDS = ("meta", "result")
+
+# Update a task hash unless it is missing (expired) or already finished, refresh its TTL and
+# publish the change. For a task of a bulk job, a state change also moves the job's counters,
+# records failures in the job's failure list and is published on the job's channel.
+# KEYS[1] task hash, KEYS[2] events channel; ARGV: ttl_seconds, event, new state or '', field, value, ...
+# Returns 1 when applied, 0 otherwise. The job keys are derived from the task's job_id (single Redis, no cluster).
+_UPDATE_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state')
+if not state or state == 'SUCCESS' or state == 'FAILURE' or state == 'DEFERRED' then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 4))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('PUBLISH', KEYS[2], ARGV[2])
+
+local new_state = ARGV[3]
+local job_id = redis.call('HGET', KEYS[1], 'job_id')
+if job_id and new_state ~= '' and new_state ~= state then
+    local counters = {PENDING = 'pending', RUNNING = 'running', SUCCESS = 'succeeded', FAILURE = 'failed', DEFERRED = 'deferred'}
+    local job = 'job:' .. job_id
+    local now = redis.call('TIME')[1]
+    redis.call('HINCRBY', job, counters[state], -1)
+    redis.call('HINCRBY', job, counters[new_state], 1)
+    if new_state == 'RUNNING' then
+        redis.call('HSETNX', job, 'started_at', now)
+    elseif new_state == 'FAILURE' then
+        local task = redis.call('HMGET', KEYS[1], 'id', 'case_id', 'error')
+        redis.call('RPUSH', job .. ':failures', cjson.encode({task_id = task[1], case_id = task[2] or '', error = task[3] or ''}))
+        redis.call('EXPIRE', job .. ':failures', ARGV[1])
+    end
+    local done = redis.call('HMGET', job, 'succeeded', 'failed', 'deferred', 'total')
+    if tonumber(done[1] or 0) + tonumber(done[2] or 0) + tonumber(done[3] or 0) >= tonumber(done[4] or 0) then
+        redis.call('HSETNX', job, 'finished_at', now)
+    end
+    redis.call('EXPIRE', job, ARGV[1])
+    redis.call('PUBLISH', 'job:events:' .. job_id, ARGV[2])
+end
+return 1
+"""
+
+# Integer fields of a job hash
+_JOB_COUNTERS = ("total", "pending", "running", "succeeded", "failed", "deferred")
+
+
+def events_channel(task_id: str) -> str:
+    """Pub/sub channel carrying every applied update of one task."""
+    return f"task:events:{task_id}"
+
+
+def job_events_channel(job_id: str) -> str:
+    """Pub/sub channel carrying the updates of every task of a bulk job."""
+    return f"job:events:{job_id}"
+
+
+class TaskEventSubscription():
+    """Live task updates from Redis pub/sub, on its own asyncio connection."""
+    def __init__(self, client: aioredis.Redis, pubsub: Any):
+        self.client = client
+        self.pubsub = pubsub
+
+
+    async def next_event(self, timeout_seconds: float) -> Optional[Dict[str, Any]]:
+        """The next update ({"id": ..., plus the changed fields}), or None when nothing arrived in time."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_seconds
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is not None and message.get("type") == "message":
+                return json.loads(message["data"])
+
+
+    async def close(self) -> None:
+        try:
+            await self.pubsub.aclose()
+        finally:
+            await self.client.aclose()
+
+
+class TaskRegistry():
+    """
+    Background task records shared by every API worker, one Redis hash per task:
+      task:{task_id}         id, state, meta, enqueued_at, started_at, ended_at, result, error, case_id, job_id
+    Bulk jobs group tasks and keep aggregate progress that is O(1) to read:
+      job:{job_id}           id, total, pending, running, succeeded, failed, deferred, created_at, started_at, finished_at
+      job:{job_id}:failures  LIST of {"task_id", "case_id", "error"} in failure order
+    Records expire ttl_seconds after their last update. Updates are atomic, never overwrite a
+    finished (SUCCESS/FAILURE/DEFERRED) task and are published on the task's events channel;
+    lookups of many tasks take one pipelined round trip.
+    """
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.caching_service = CachingService()
+        self._update_script = self.caching_service.redis.register_script(_UPDATE_SCRIPT)
+
+
+    def create(
+        self,
+        task_ids: List[str],
+        enqueued_at: str,
+        meta: Optional[Dict[str, Any]] = None,
+        case_ids: Optional[List[str]] = None,
+        job_id: Optional[str] = None
+    ) -> None:
+        """Register new PENDING tasks, optionally for case_ids (same order) and as the bulk job job_id."""
+        pipe = self.caching_service.redis.pipeline(transaction=False)
+        if job_id is not None:
+            job_key = self._job_key(job_id)
+            pipe.hset(job_key, mapping={
+                "id": job_id, "total": len(task_ids), "pending": len(task_ids),
+                "running": 0, "succeeded": 0, "failed": 0, "deferred": 0, "created_at": enqueued_at,
+            })
+            pipe.expire(job_key, self.ttl_seconds)
+        for i, task_id in enumerate(task_ids):
+            key = self._key(task_id)
+            pipe.hset(key, mapping=self._encode({
+                "id": task_id, "state": "PENDING", "meta": meta, "enqueued_at": enqueued_at,
+                "case_id": case_ids[i] if case_ids else None, "job_id": job_id,
+            }))
+            pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+
+    def update(self, task_id: str, **fields: Any) -> bool:
+        """Set fields (state, meta, result, ...) of an unfinished task. Returns False when it is finished or unknown."""
+        return bool(self._update_script(keys=self._update_keys(task_id), args=self._update_args(task_id, fields)))
+
+
+    def update_many(self, updates: List[Tuple[str, Dict[str, Any]]]) -> List[bool]:
+        """update() for several tasks in one round trip."""
+        if not updates:
+            return []
+        pipe = self.caching_service.redis.pipeline(transaction=False)
+        for task_id, fields in updates:
+            self._update_script(keys=self._update_keys(task_id), args=self._update_args(task_id, fields), client=pipe)
+        return [bool(applied) for applied in pipe.execute()]
+
+
+    def get_many(self, task_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Task records in the order of task_ids, None for unknown or expired ones."""
+        if not task_ids:
+            return []
+        pipe = self.caching_service.redis.pipeline(transaction=False)
+        for task_id in task_ids:
+            pipe.hgetall(self._key(task_id))
+        return [self._decode(raw) if raw else None for raw in pipe.execute()]
+
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([task_id])[0]
+
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Counters and timestamps of a bulk job, None when unknown or expired."""
+        raw = self.caching_service.redis.hgetall(self._job_key(job_id))
+        if not raw:
+            return None
+        job: Dict[str, Any] = dict(raw)
+        for field in _JOB_COUNTERS:
+            job[field] = int(job.get(field) or 0)
+        for field in ("started_at", "finished_at"):
+            if field in job:
+                job[field] = float(job[field])
+        return job
+
+
+    def get_job_failures(self, job_id: str, offset: int, limit: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Failed tasks of a job from position offset, and the total number of failures."""
+        key = f"{self._job_key(job_id)}:failures"
+        pipe = self.caching_service.redis.pipeline(transaction=False)
+        pipe.lrange(key, offset, offset + limit - 1)
+        pipe.llen(key)
+        items, total = pipe.execute()
+        return [json.loads(item) for item in items], int(total)
+
+
+    async def subscribe(self, channels: List[str]) -> TaskEventSubscription:
+        """
+        Start receiving updates from channels (events_channel / job_events_channel).
+        Subscribe before reading the current state so no update is missed.
+        """
+        redis_setting = get_settings().redis
+        client = aioredis.Redis(
+            host=redis_setting.host,
+            port=int(redis_setting.port),
+            password=redis_setting.password,
+            decode_responses=True,
+            username="default",
+        )
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(*channels)
+        except Exception:
+            await pubsub.aclose()
+            await client.aclose()
+            raise
+        return TaskEventSubscription(client, pubsub)
+
+
+    def _update_keys(self, task_id: str) -> List[str]:
+        return [self._key(task_id), events_channel(task_id)]
+
+
+    def _update_args(self, task_id: str, fields: Dict[str, Any]) -> List[Any]:
+        event = {"id": task_id, **{field: value for field, value in fields.items() if value is not None}}
+        args: List[Any] = [self.ttl_seconds, json.dumps(event, default=str), fields.get("state") or ""]
+        for field, value in self._encode(fields).items():
+            args.extend([field, value])
+        return args
+
+
+    def _encode(self, fields: Dict[str, Any]) -> Dict[str, str]:
+        return {
+            field: json.dumps(value) if field in _JSON_FIELDS else str(value)
+            for field, value in fields.items()
+            if value is not None
+        }
+
+
+    def _decode(self, raw: Dict[str, str]) -> Dict[str, Any]:
+        task: Dict[str, Any] = dict(raw)
+        for field in _JSON_FIELDS:
+            if field in task:
+                task[field] = json.loads(task[field])
+        return task
+
+
+    def _key(self, task_id: str) -> str:
+        return f"task:{task_id}"
+
+    def _job_key(self, job_id: str) -> str:
+        return f"job:{job_id}"
+
+
+_REGISTRY: Optional[TaskRegistry] = None
+
+
+def get_task_registry() -> TaskRegistry:
+    global _REGISTRY
+    if _REGISTRY is None:
+        _REGISTRY = TaskRegistry(get_settings().tasks.registry_ttl_seconds)
+    return _REGISTRY
@@ -0,0 +1,225 @@
+from app.config.settings import get_settings
+from app.utils.metrics import metrics
+from app.utils.aimd import AIMDController
+from contextlib import asynccontextmanager
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+import asyncio
+import itertools
+import time
+
+# Strict order between classes: interactive re-analyses, then regular work, then bulk jobs
+PRIORITIES = ("high", "normal", "bulk")
+_PRIORITY_RANK = {p: i for i, p in enumerate(PRIORITIES)}
+
+# Queue key for work whose tenant is not known
+DEFAULT_TENANT = "default"
+
+
+class _Waiter():
+    __slots__ = ("tenant", "priority", "tag", "seq", "future", "enqueued_at")
+
+    def __init__(self, tenant: str, priority: str, tag: float, seq: int, future: asyncio.Future):
+        self.tenant = tenant
+        self.priority = priority
+        self.tag = tag
+        self.seq = seq
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class FairScheduler():
+    """
+    Concurrency slots for the in-process task runner.
+    Waiters are served by priority class first; within a class tenants share slots by weighted fair
+    queuing (a tenant's start tags advance by 1/weight per queued task, so a deep backlog of one
+    tenant cannot push others back), FIFO within a tenant. A tenant never holds more than its cap of slots.
+    Queue depth, running tasks and wait time are reported per tenant and priority.
+    """
+    def __init__(
+        self,
+        limit: int,
+        tenant_weights: Optional[Dict[str, float]] = None,
+        tenant_max_concurrency: int = 0,
+        tenant_caps: Optional[Dict[str, int]] = None
+    ):
+        self.limit = max(1, int(limit))
+        self.tenant_weights = dict(tenant_weights or {})
+        self.tenant_max_concurrency = tenant_max_concurrency
+        self.tenant_caps = dict(tenant_caps or {})
+        self._queues: Dict[Tuple[str, str], Deque[_Waiter]] = {}
+        self._running: Dict[str, int] = {}
+        self._in_use = 0
+        self._virtual_time = 0.0
+        self._last_finish: Dict[Tuple[str, str], float] = {}
+        self._seq = itertools.count()
+
+
+    def set_limit(self, limit: int) -> None:
+        self.limit = max(1, int(limit))
+        self._dispatch()
+
+
+    @asynccontextmanager
+    async def slot(self, tenant_id: Optional[str] = None, priority: str = "normal") -> AsyncIterator[None]:
+        """Hold one slot for the duration of the block."""
+        if priority not in _PRIORITY_RANK:
+            raise ValueError(f"Unknown priority: {priority}")
+        waiter = self._enqueue(tenant_id or DEFAULT_TENANT, priority)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # granted just before the cancellation arrived
+                self._release(waiter.tenant)
+            else:
+                self._remove(waiter)
+            raise
+
+        metrics.observe("task_queue_wait_seconds", time.perf_counter() - waiter.enqueued_at, tenant=waiter.tenant, priority=priority)
+        try:
+            yield
+        finally:
+            self._release(waiter.tenant)
+
+
+    def stats(self) -> Dict[str, Any]:
+        """Queued and running tasks per tenant, queued per priority."""
+        tenants: Dict[str, Dict[str, Any]] = {}
+        for (priority, tenant), queue in self._queues.items():
+            entry = tenants.setdefault(tenant, {"queued": {}, "running": self._running.get(tenant, 0)})
+            entry["queued"][priority] = len(queue)
+        for tenant, running in self._running.items():
+            tenants.setdefault(tenant, {"queued": {}, "running": running})
+        return {"limit": self.limit, "in_use": self._in_use, "tenants": tenants}
+
+
+    def _enqueue(self, tenant: str, priority: str) -> _Waiter:
+        # start-time fair queuing: a task starts (virtually) when its tenant's previous one in the class finishes
+        weight = max(self.tenant_weights.get(tenant, 1.0), 0.01)
+        tag = max(self._virtual_time, self._last_finish.get((priority, tenant), 0.0))
+        self._last_finish[(priority, tenant)] = tag + 1.0 / weight
+        waiter = _Waiter(tenant, priority, tag, next(self._seq), asyncio.get_running_loop().create_future())
+        self._queues.setdefault((priority, tenant), deque()).append(waiter)
+        self._report_depth(priority, tenant)
+        self._dispatch()
+        return waiter
+
+
+    def _dispatch(self) -> None:
+        while self._in_use < self.limit:
+            best_key, best = None, None
+            for key, queue in self._queues.items():
+                head = queue[0]
+                if not self._under_cap(head.tenant):
+                    continue
+                if best is None or (_PRIORITY_RANK[head.priority], head.tag, head.seq) < (_PRIORITY_RANK[best.priority], best.tag, best.seq):
+                    best_key, best = key, head
+            if best is None:
+                return
+
+            queue = self._queues[best_key]
+            queue.popleft()
+            if not queue:
+                del self._queues[best_key]
+            self._report_depth(best.priority, best.tenant)
+            self._virtual_time = max(self._virtual_time, best.tag)
+            self._in_use += 1
+            self._running[best.tenant] = self._running.get(best.tenant, 0) + 1
+            metrics.set_gauge("task_running", self._running[best.tenant], tenant=best.tenant)
+            best.future.set_result(None)
+
+
+    def _under_cap(self, tenant: str) -> bool:
+        cap = self.tenant_caps.get(tenant, self.tenant_max_concurrency)
+        return not cap or self._running.get(tenant, 0) < cap
+
+
+    def _release(self, tenant: str) -> None:
+        self._in_use -= 1
+        self._running[tenant] -= 1
+        metrics.set_gauge("task_running", self._running[tenant], tenant=tenant)
+        if not self._running[tenant]:
+            del self._running[tenant]
+        self._dispatch()
+
+
+    def _remove(self, waiter: _Waiter) -> None:
+        key = (waiter.priority, waiter.tenant)
+        queue = self._queues.get(key)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[key]
+            self._report_depth(waiter.priority, waiter.tenant)
+
+
+    def _report_depth(self, priority: str, tenant: str) -> None:
+        queue = self._queues.get((priority, tenant))
+        metrics.set_gauge("task_queue_depth", len(queue) if queue else 0, tenant=tenant, priority=priority)
+
+
+class AdaptiveConcurrency():
+    """
+    Tunes a FairScheduler's slot limit between floor and ceiling with AIMD, from per-stage
+    outcomes of the work it runs: a stage slower than its latency target, or failing, halves the
+    limit (once per cooldown); every other completed stage adds about one slot per limit's worth
+    of completions. Stage latencies, errors and the current limit are exported as metrics.
+    """
+    def __init__(self, scheduler: FairScheduler, floor: int, ceiling: int, stage_targets: Optional[Dict[str, float]] = None):
+        self.scheduler = scheduler
+        self.floor = max(1, int(floor))
+        self.ceiling = max(self.floor, int(ceiling))
+        self.stage_targets = dict(stage_targets or {})
+        self.reset(scheduler.limit)
+
+
+    def reset(self, limit: int) -> None:
+        """Restart the controller from limit, e.g. after an operator override."""
+        self.controller = AIMDController(initial=limit, minimum=self.floor, maximum=self.ceiling, cooldown_seconds=5.0)
+        self._apply()
+
+
+    def record(self, stage: str, latency_seconds: float, error: bool = False) -> None:
+        metrics.observe("task_stage_seconds", latency_seconds, stage=stage)
+        target = self.stage_targets.get(stage)
+        if error:
+            metrics.incr("task_stage_errors_total", stage=stage)
+            self.controller.on_overload(time.monotonic())
+        elif target and latency_seconds > target:
+            metrics.incr("task_stage_slow_total", stage=stage)
+            self.controller.on_overload(time.monotonic())
+        else:
+            self.controller.increase = 1 / self.scheduler.limit
+            self.controller.on_success(latency_seconds, time.monotonic())
+        self._apply()
+
+
+    def _apply(self) -> None:
+        limit = max(1, int(self.controller.value))
+        if limit != self.scheduler.limit:
+            self.scheduler.set_limit(limit)
+        metrics.set_gauge("task_runner_concurrency_limit", limit)
+
+
+def create_task_scheduler() -> FairScheduler:
+    task_setting = get_settings().tasks
+    return FairScheduler(
+        limit=task_setting.concurrency,
+        tenant_weights=task_setting.tenant_weights,
+        tenant_max_concurrency=task_setting.tenant_max_concurrency,
+        tenant_caps=task_setting.tenant_caps
+    )
+
+
+def create_adaptive_concurrency(scheduler: FairScheduler) -> Optional[AdaptiveConcurrency]:
+    """Controller for scheduler configured from settings, or None when the limit is static."""
+    task_setting = get_settings().tasks
+    if not task_setting.adaptive_concurrency:
+        return None
+    return AdaptiveConcurrency(
+        scheduler,
+        floor=task_setting.concurrency_min,
+        ceiling=task_setting.concurrency_max,
+        stage_targets=task_setting.stage_latency_targets
+    )
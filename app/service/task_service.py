@@ -1,69 +1,514 @@
 import asyncio
 import uuid
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime, timezone
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.config.settings import get_settings
 from app.service.case_service import CaseService
+from app.service.model_service import note_extraction_failure
+from app.service.model_batcher import ModelRequestBatcher, create_model_batcher
+from app.utils.call_recorder import record_model_calls, use_recorder
+from app.utils.metrics import metrics
+from app.service.circuit_breaker import is_deferred, is_model_unavailable
+from app.service.task_registry import TERMINAL_STATES, events_channel, get_task_registry, job_events_channel
+from app.utils.pipeline import Stage, StagePipeline
+from app.service.task_scheduler import PRIORITIES, AdaptiveConcurrency, FairScheduler, create_adaptive_concurrency, create_task_scheduler
+import multiprocessing
+import time
 
-# Task registry (in-memory)
-_TASKS: Dict[str, Dict[str, Any]] = {}
+# Bounded concurrency shared fairly between tenants, by priority class (TASK_CONCURRENCY, default 3)
+_SCHEDULER: FairScheduler = create_task_scheduler()
 
-# Bounded concurrency (default 3). Tune as needed.
-_GLOBAL_SEMAPHORE: asyncio.Semaphore = asyncio.Semaphore(3)
+# Moves the slot limit between TASK_CONCURRENCY_MIN and TASK_CONCURRENCY_MAX from stage latencies and errors
+_ADAPTIVE: Optional[AdaptiveConcurrency] = create_adaptive_concurrency(_SCHEDULER)
+
+# Bulk history: case ids per in-filtered files query, and results per DB flush
+_BULK_FETCH_CHUNK = 100
+_BULK_FLUSH_SIZE = 25
+
+# PDF parsing for bulk history runs, started on first use
+_EXTRACTION_POOL: Optional[ProcessPoolExecutor] = None
 
 def set_concurrency(n: int) -> None:
-    global _GLOBAL_SEMAPHORE
-    _GLOBAL_SEMAPHORE = asyncio.Semaphore(max(1, int(n)))
+    """Set the slot limit; with adaptive concurrency the controller continues from n."""
+    if _ADAPTIVE is not None:
+        _ADAPTIVE.reset(n)
+    else:
+        _SCHEDULER.set_limit(n)
+
+def _record_stage(stage: str, started: float, error: bool = False) -> None:
+    """Feed one stage's latency (since started, perf_counter) and outcome to the adaptive limit."""
+    if _ADAPTIVE is not None:
+        _ADAPTIVE.record(stage, time.perf_counter() - started, error)
+
+def _observe_stage(stage: str, started: float) -> None:
+    # stages with fixed pools are only measured, the adaptive limit sizes the model stage
+    metrics.observe("task_stage_seconds", time.perf_counter() - started, stage=stage)
+
+def _extraction_executor() -> Optional[Executor]:
+    """Process pool for PDF parsing (TASK_PIPELINE_EXTRACT_WORKERS), None for the loop's default thread pool."""
+    global _EXTRACTION_POOL
+    workers = get_settings().tasks.pipeline_extract_workers
+    if workers <= 0:
+        return None
+    if _EXTRACTION_POOL is None:
+        # spawn, not fork: a forked child could inherit locks held by this process's S3 threads
+        _EXTRACTION_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _EXTRACTION_POOL
+
+def _discard_extraction_pool(pool: Executor) -> None:
+    """Drop a broken pool (a child died, e.g. OOM-killed on a large PDF) so the next use starts a new one."""
+    global _EXTRACTION_POOL
+    if _EXTRACTION_POOL is pool:
+        _EXTRACTION_POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _is_model_error(response: Any) -> bool:
+    # timeouts, blocked/unparseable output and breaker answers all mean the model is struggling
+    return not isinstance(response, dict) or "error" in response or is_model_unavailable(response)
+
+def _check_priority(priority: str) -> None:
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+
+def get_scheduler_stats() -> Dict[str, Any]:
+    """Slots in use and queued/running tasks per tenant of the in-process runner."""
+    return _SCHEDULER.stats()
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
-def get_task_status(task_id: str) -> Dict[str, Any]:
-    t = _TASKS.get(task_id)
+def _status(task_id: str, t: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     if not t:
         return {"id": task_id, "state": "NOT_FOUND", "meta": None, "ready": False, "result": None, "error": None}
     return {
         "id": task_id,
         "state": t["state"],
         "meta": t.get("meta"),
-        "ready": t["state"] in ("SUCCESS", "FAILURE"),
-        "result": t.get("result") if t["state"] == "SUCCESS" else None,
+        "ready": t["state"] in TERMINAL_STATES,
+        "result": t.get("result") if t["state"] in ("SUCCESS", "DEFERRED") else None,
         "error": t.get("error") if t["state"] == "FAILURE" else None,
     }
 
+def get_task_status(task_id: str) -> Dict[str, Any]:
+    return _status(task_id, get_task_registry().get(task_id))
+
 def get_tasks_status(task_ids: List[str]) -> List[Dict[str, Any]]:
-    return [get_task_status(tid) for tid in task_ids]
+    """Status of every task with one pipelined Redis round trip."""
+    return [_status(tid, t) for tid, t in zip(task_ids, get_task_registry().get_many(task_ids))]
 
-async def _run_case_history(task_id: str, case_id: str, sem: asyncio.Semaphore) -> None:
-    svc = CaseService()
+async def watch_tasks(
+    task_ids: List[str],
+    heartbeat_seconds: float = 15.0,
+    max_seconds: float = 3600.0
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Live progress of task_ids across all workers: ("task", status) for the current state of every task,
+    then ("update", {"id": ..., changed fields}) for each transition as it happens, ("ping", None) after
+    heartbeat_seconds without updates, and ("end", None) once every task is finished or unknown, or
+    after max_seconds at the latest.
+    Each heartbeat re-reads the pending tasks, so a missed event or an expired task cannot keep the
+    stream open: tasks found finished are sent again as ("task", status), expired ones are dropped.
+    """
+    deadline = time.monotonic() + max_seconds
+    registry = get_task_registry()
+    subscription = await registry.subscribe([events_channel(task_id) for task_id in task_ids])
+    try:
+        # read after subscribing, so a transition in between is delivered as an update
+        pending = set()
+        for status in get_tasks_status(task_ids):
+            yield "task", status
+            if status["state"] not in TERMINAL_STATES and status["state"] != "NOT_FOUND":
+                pending.add(status["id"])
+
+        while pending and time.monotonic() < deadline:
+            event = await subscription.next_event(heartbeat_seconds)
+            if event is None:
+                yield "ping", None
+                for status in get_tasks_status(sorted(pending)):
+                    if status["state"] == "NOT_FOUND":
+                        pending.discard(status["id"])
+                    elif status["state"] in TERMINAL_STATES:
+                        pending.discard(status["id"])
+                        yield "task", status
+                continue
+            yield "update", event
+            if event.get("state") in TERMINAL_STATES:
+                pending.discard(event["id"])
+        yield "end", None
+    finally:
+        await subscription.close()
+
+def _job_status(job_id: str, job: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not job:
+        return {"id": job_id, "state": "NOT_FOUND"}
+    # deferred cases are handed to a later run, not analyzed: counted apart from succeeded
+    done = job["succeeded"] + job["failed"] + job["deferred"]
+    finished = done >= job["total"]
+    started_at = job.get("started_at")
+    elapsed = (job.get("finished_at") or time.time()) - started_at if started_at else None
+
+    # ETA from the throughput observed since the first case started
+    throughput = done / elapsed if done and elapsed and elapsed > 0 else None
+    eta_seconds = 0.0 if finished else (round((job["total"] - done) / throughput, 1) if throughput else None)
+    return {
+        "id": job_id,
+        "state": "FINISHED" if finished else ("RUNNING" if started_at else "PENDING"),
+        "ready": finished,
+        "total": job["total"],
+        "pending": job["pending"],
+        "running": job["running"],
+        "succeeded": job["succeeded"],
+        "failed": job["failed"],
+        "deferred": job["deferred"],
+        "created_at": job.get("created_at"),
+        "started_at": _iso(started_at),
+        "finished_at": _iso(job.get("finished_at")),
+        "throughput_per_minute": round(throughput * 60, 2) if throughput else None,
+        "eta_seconds": eta_seconds,
+    }
+
+def _iso(epoch: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat() if epoch else None
+
+def get_job_status(job_id: str) -> Dict[str, Any]:
+    """Aggregate progress of a bulk job: one Redis read however many cases it has."""
+    return _job_status(job_id, get_task_registry().get_job(job_id))
+
+def get_job_failures(job_id: str, offset: int, limit: int) -> Dict[str, Any]:
+    """One page of a job's failed cases, in failure order. next_offset is None on the last page."""
+    items, total = get_task_registry().get_job_failures(job_id, offset, limit)
+    next_offset = offset + len(items)
+    return {"items": items, "total": total, "next_offset": next_offset if next_offset < total else None}
+
+async def watch_job(job_id: str, heartbeat_seconds: float = 15.0, status_interval_seconds: float = 1.0) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Live progress of a bulk job: ("job", status) first and then at most every status_interval_seconds
+    while its tasks change, ("update", {"id": ..., changed fields}) per task transition,
+    ("ping", None) after heartbeat_seconds without updates, and ("end", status) once it is finished.
+    """
+    registry = get_task_registry()
+    subscription = await registry.subscribe([job_events_channel(job_id)])
     try:
-        async with sem:
-            _TASKS[task_id]["state"] = "RUNNING"
-            _TASKS[task_id]["started_at"] = _now_iso()
-            _TASKS[task_id]["meta"] = {"step": "fetch_files"}
+        status = get_job_status(job_id)
+        yield "job", status
+        status_at = time.monotonic()
+        while status["state"] not in ("FINISHED", "NOT_FOUND"):
+            event = await subscription.next_event(heartbeat_seconds)
+            if event is None:
+                yield "ping", None
+            else:
+                yield "update", event
+            if event is None or event.get("state") in TERMINAL_STATES or time.monotonic() - status_at >= status_interval_seconds:
+                status = get_job_status(job_id)
+                status_at = time.monotonic()
+                yield "job", status
+        yield "end", status
+    finally:
+        await subscription.close()
+
+def _mark_running(task_id: str, step: str) -> None:
+    get_task_registry().update(task_id, state="RUNNING", started_at=_now_iso(), meta={"step": step})
+
+def _mark_success(task_id: str, result: Dict[str, Any]) -> None:
+    get_task_registry().update(task_id, state="SUCCESS", ended_at=_now_iso(), result=result)
 
-            # Execute the existing history flow (uses Redis PDF cache)
-            await svc.proceed_with_model_history_files(case_id)
+def _mark_deferred(task_id: str, result: Dict[str, Any]) -> None:
+    get_task_registry().update(task_id, state="DEFERRED", ended_at=_now_iso(), result=result)
 
-            _TASKS[task_id]["state"] = "SUCCESS"
-            _TASKS[task_id]["ended_at"] = _now_iso()
-            _TASKS[task_id]["result"] = {"case_id": case_id, "success": True}
+def _mark_failure(task_id: str, error: str) -> None:
+    get_task_registry().update(task_id, state="FAILURE", ended_at=_now_iso(), error=error)
+
+async def _run_case_history(
+    task_id: str,
+    case_id: str,
+    scheduler: FairScheduler,
+    force: bool = False,
+    tenant_id: Optional[str] = None,
+    priority: str = "high"
+) -> None:
+    svc = CaseService()
+    try:
+        async with scheduler.slot(tenant_id, priority):
+            _mark_running(task_id, "fetch_files")
+            started = time.perf_counter()
+            try:
+                # Execute the existing history flow (uses Redis PDF cache)
+                result = await svc.proceed_with_model_history_files(case_id, force=force)
+            except Exception:
+                _record_stage("case", started, error=True)
+                raise
+            # a deferral means the model circuit is open: an error for the adaptive limit
+            deferred = is_deferred(result)
+            _record_stage("case", started, error=deferred)
+
+            if deferred:
+                _mark_deferred(task_id, {
+                    "case_id": case_id, "success": False, "deferred": True, "deferred_task_id": result.get("deferred_task_id")
+                })
+            else:
+                _mark_success(task_id, {"case_id": case_id, "success": True})
     except Exception as e:
-        _TASKS[task_id]["state"] = "FAILURE"
-        _TASKS[task_id]["ended_at"] = _now_iso()
-        _TASKS[task_id]["error"] = str(e)
+        _mark_failure(task_id, str(e))
 
-def submit_case_history(case_id: str) -> str:
+def submit_case_history(case_id: str, force: bool = False, tenant_id: Optional[str] = None, priority: str = "high") -> str:
     """
-    Enqueue a background task (in-process) to process a case by history files.
+    Enqueue a background task (in-process, tracked in the Redis task registry) to process a case by history files.
+    force re-analyzes even when the case's files are unchanged since the latest response.
+    Single re-analyses are interactive, so they run ahead of bulk jobs by default.
     Returns a task_id for frontend polling.
     """
+    _check_priority(priority)
     task_id = str(uuid.uuid4())
-    _TASKS[task_id] = {
-        "id": task_id,
-        "state": "PENDING",
-        "meta": {"step": "queued"},
-        "enqueued_at": _now_iso(),
-    }
+    get_task_registry().create([task_id], enqueued_at=_now_iso(), meta={"step": "queued"}, case_ids=[case_id])
     loop = asyncio.get_running_loop()
-    loop.create_task(_run_case_history(task_id, case_id, _GLOBAL_SEMAPHORE))
+    loop.create_task(_run_case_history(task_id, case_id, _SCHEDULER, force, tenant_id, priority))
     return task_id
+
+
+class _HistoryResultWriter:
+    """
+    Buffers finished history results and persists them in groups:
+    one response insert_bulk and one relink per response for every flush.
+    Tasks only turn SUCCESS once their rows are written.
+    """
+    def __init__(self, svc: CaseService, flush_size: int):
+        self.svc = svc
+        self.flush_size = flush_size
+        self.buffer: List[Dict[str, Any]] = []
+        self.lock = asyncio.Lock()
+
+    async def add(
+        self,
+        task_id: str,
+        case_id: str,
+        response: Any,
+        files_metadata: List[Dict],
+        input_fingerprint: Optional[str] = None,
+        model_metrics: Optional[Dict[str, Any]] = None
+    ) -> None:
+        self.buffer.append({
+            "task_id": task_id,
+            "case_id": case_id,
+            "response": response,
+            "files_metadata": files_metadata,
+            "input_fingerprint": input_fingerprint,
+            "model_metrics": model_metrics,
+        })
+        if len(self.buffer) >= self.flush_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self.lock:
+            items, self.buffer = self.buffer, []
+            if not items:
+                return
+            registry = get_task_registry()
+            registry.update_many([(item["task_id"], {"meta": {"step": "saving"}}) for item in items])
+            started = time.perf_counter()
+            try:
+                saved = await self.svc.save_model_responses_bulk(items)
+            except Exception as e:
+                saved = [None] * len(items)
+                error = str(e)
+            else:
+                error = "Failed to save response"
+            _record_stage("save", started, error=not all(saved))
+
+            ended_at = _now_iso()
+            registry.update_many([
+                (item["task_id"], {"state": "SUCCESS", "ended_at": ended_at, "result": {"case_id": item["case_id"], "success": True}})
+                if response_id else
+                (item["task_id"], {"state": "FAILURE", "ended_at": ended_at, "error": error})
+                for item, response_id in zip(items, saved)
+            ])
+
+
+async def _load_batch_context(svc: CaseService, case_ids: List[str], force: bool) -> Dict[str, Dict[str, Any]]:
+    """Files and latest fingerprinted response for every case, one query of each per chunk of cases."""
+    files_by_case: Dict[str, List[Dict]] = {}
+    latest_by_case: Dict[str, Dict[str, Any]] = {}
+    for i in range(0, len(case_ids), _BULK_FETCH_CHUNK):
+        chunk = case_ids[i:i + _BULK_FETCH_CHUNK]
+        files_by_case.update(await svc.sp_service.get_files_by_case_ids(chunk))
+        if not force:
+            latest_by_case.update(await svc.sp_service.get_latest_responses_by_case_ids(chunk))
+    return {"files": files_by_case, "latest": latest_by_case}
+
+
+class _HistoryPipelineStages:
+    """
+    Stage handlers of the bulk history pipeline, one work dict per case:
+      fetch    file listing fallback, change detection, manual input and PDF download (I/O, S3 in threads)
+      extract  PDF parsing on the extraction executor (CPU)
+      model    pre-screen and model call in a scheduler slot (fair per tenant, adaptive limit);
+               packed calls through the batcher are awaited after leaving the slot
+      persist  grouped writes through the result writer
+    """
+    def __init__(
+        self,
+        svc: CaseService,
+        context: Dict[str, Dict[str, Any]],
+        writer: _HistoryResultWriter,
+        scheduler: FairScheduler,
+        batcher: Optional[ModelRequestBatcher] = None,
+        priority: str = "bulk",
+        executor: Optional[Executor] = None
+    ):
+        self.svc = svc
+        self.context = context
+        self.writer = writer
+        self.scheduler = scheduler
+        self.batcher = batcher
+        self.priority = priority
+        self.executor = executor
+
+
+    async def fetch(self, work: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        task_id, case_id = work["task_id"], work["case_id"]
+        _mark_running(task_id, "fetch")
+        started = time.perf_counter()
+
+        files_metadata = self.context["files"].get(case_id)
+        if files_metadata is None:
+            # bulk query failed for this chunk, fall back to the single-case listing
+            files_metadata = await self.svc.sp_service.get_files_by_case_id(case_id)
+
+        input_fingerprint = await self.svc.compute_input_fingerprint(case_id, files_metadata)
+        unchanged = await self.svc.get_unchanged_response(self.context["latest"].get(case_id), input_fingerprint)
+        if unchanged is not None:
+            _mark_success(task_id, {"case_id": case_id, "success": True, "unchanged": True})
+            return None
+
+        work["files_metadata"] = files_metadata
+        work["input_fingerprint"] = input_fingerprint
+        work["inputs"] = await self.svc.fetch_history_inputs(files_metadata)
+        _observe_stage("fetch", started)
+        return work
+
+
+    async def extract(self, work: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        inputs = work.pop("inputs")
+        for _ in range(2):
+            executor = self.executor
+            try:
+                work["details"], work["extraction_failed"] = await self.svc.extract_history_inputs(inputs, executor)
+                break
+            except BrokenProcessPool:
+                metrics.incr("extraction_pool_broken_total")
+                _discard_extraction_pool(executor)
+                if self.executor is executor:
+                    self.executor = _extraction_executor()
+        else:
+            # the new pool broke as well: parse this case on the loop's thread pool
+            work["details"], work["extraction_failed"] = await self.svc.extract_history_inputs(inputs, None)
+        _observe_stage("extract", started)
+        return work
+
+
+    async def model(self, work: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        task_id, case_id, files_metadata = work["task_id"], work["case_id"], work["files_metadata"]
+        details, extraction_failed = work.pop("details"), work["extraction_failed"]
+        tenant_id = self.svc.history_tenant_id(files_metadata)
+
+        started = None
+        try:
+            async with self.scheduler.slot(tenant_id, self.priority):
+                get_task_registry().update(task_id, meta={"step": "analyze"})
+                started = time.perf_counter()
+                with record_model_calls(case_id=case_id, tenant_id=tenant_id) as recorder:
+                    if self.batcher is None:
+                        response = await self.svc.analyze_history_details(files_metadata, details, extraction_failed)
+                    else:
+                        response = self.svc.model_service.prescreen(details, tenant_id=tenant_id, extraction_failed=extraction_failed)
+
+            if response is None:
+                # outside the case slot, so small cases waiting on the model can share one packed request
+                with use_recorder(recorder):
+                    response = await self.batcher.submit(note_extraction_failure(details, extraction_failed))
+        except Exception:
+            if started is not None:
+                _record_stage("model", started, error=True)
+            raise
+        _record_stage("model", started, error=_is_model_error(response))
+
+        if is_deferred(response):
+            deferred_task_id = self.svc.defer_history_run(case_id, response["retry_after_seconds"])
+            _mark_deferred(task_id, {"case_id": case_id, "success": False, "deferred": True, "deferred_task_id": deferred_task_id})
+            return None
+
+        work["response"] = response
+        work["model_metrics"] = recorder.summary() if recorder.calls else None
+        return work
+
+
+    async def persist(self, work: Dict[str, Any]) -> None:
+        await self.writer.add(
+            work["task_id"], work["case_id"], work["response"], work["files_metadata"],
+            work["input_fingerprint"], work["model_metrics"]
+        )
+
+
+    def fail(self, stage: str, work: Dict[str, Any], error: Exception) -> None:
+        _mark_failure(work["task_id"], str(error))
+
+
+async def _run_history_batch(
+    tasks: List[Dict[str, str]],
+    scheduler: FairScheduler,
+    force: bool = False,
+    priority: str = "bulk"
+) -> None:
+    svc = CaseService()
+    writer = _HistoryResultWriter(svc, _BULK_FLUSH_SIZE)
+    batcher = create_model_batcher(svc.model_service)
+    try:
+        context = await _load_batch_context(svc, [t["case_id"] for t in tasks], force)
+        stages = _HistoryPipelineStages(svc, context, writer, scheduler, batcher, priority, _extraction_executor())
+        task_setting = get_settings().tasks
+        queue_size = task_setting.pipeline_queue_size
+        pipeline = StagePipeline("case_history", [
+            Stage("fetch", stages.fetch, task_setting.pipeline_fetch_concurrency, queue_size),
+            Stage("extract", stages.extract, task_setting.pipeline_extract_workers, queue_size),
+            # enough workers for the scheduler's largest limit; the slots decide how many call the model
+            Stage("model", stages.model, max(task_setting.concurrency_max, scheduler.limit), queue_size),
+            Stage("persist", stages.persist, task_setting.pipeline_persist_concurrency, queue_size),
+        ], on_error=stages.fail)
+        await pipeline.run(dict(t) for t in tasks)
+    finally:
+        await writer.flush()
+        # finished tasks are left as they are, only ones the batch never got to are failed
+        ended_at = _now_iso()
+        get_task_registry().update_many([
+            (t["task_id"], {"state": "FAILURE", "ended_at": ended_at, "error": "Batch aborted"}) for t in tasks
+        ])
+
+
+def submit_case_history_bulk(case_ids: List[str], force: bool = False, priority: str = "bulk") -> Dict[str, Any]:
+    """
+    Enqueue many cases as one batch-aware background job (in-process).
+    File metadata is loaded with one query per chunk of cases and results are persisted in groups.
+    Cases flow through a staged pipeline (fetch, extract, model, persist) with bounded queues and
+    workers per stage, so cases waiting on the model never hold back downloads or PDF parsing.
+    Cases whose files are unchanged since their latest response are skipped unless force is set.
+    Cases queue per tenant in the priority class (bulk by default), so one tenant's large job
+    shares the runner fairly with other tenants' work.
+    Returns {"job_id": ..., "accepted": [{"case_id": ..., "task_id": ...}]}; the job aggregates
+    the progress of all its tasks (get_job_status), so clients need not poll every task.
+    """
+    _check_priority(priority)
+    job_id = str(uuid.uuid4())
+    accepted = [{"case_id": case_id, "task_id": str(uuid.uuid4())} for case_id in case_ids]
+    get_task_registry().create(
+        [a["task_id"] for a in accepted],
+        enqueued_at=_now_iso(),
+        meta={"step": "queued"},
+        case_ids=case_ids,
+        job_id=job_id
+    )
+
+    loop = asyncio.get_running_loop()
+    loop.create_task(_run_history_batch(accepted, _SCHEDULER, force, priority))
+    return {"job_id": job_id, "accepted": accepted}
@@ -1,12 +1,18 @@
 import logging
 from app.service.supabase_service import SupabaseService
-from typing import Dict, Any, List
+from app.service.metadata_cache_service import MetadataCacheService
+from app.utils.pagination import encode_cursor
+from typing import Dict, Any, List, Optional, AsyncIterator
 
 logger = logging.getLogger(__name__)
 
+TENANT_COLUMNS = ("id", "name")
+DEFAULT_TENANT_COLUMNS = "id, name"
+
 class TenantService():
     def __init__(self):
         self.sp_service = SupabaseService()
+        self.metadata_cache = MetadataCacheService()
         self.table_name = "tenants"
 
     async def insert_new_tenant(self, name: str) -> bool:
@@ -22,6 +28,7 @@ class TenantService():
                 logger.warning("Failed to insert tenant with name: %s", name)
                 return False
 
+            await self.metadata_cache.invalidate(self.table_name, MetadataCacheService.LIST_SCOPE)
             logger.info("Successfully created tenant with name: %s", name)
             return True
 
@@ -29,31 +36,59 @@ class TenantService():
             logger.error("Tenant Service Error - insert_new_tenant for name: %s - %s", name, str(e), exc_info=True)
             return False
         
-    async def get_all_tenants(self) -> List[Dict[str, Any]]:
-        try:
-            res = await self.sp_service.get_all(
+    async def get_all_tenants(
+        self,
+        limit: int,
+        after_id: Optional[str] = None,
+        columns: str = DEFAULT_TENANT_COLUMNS
+    ) -> Dict[str, Any]:
+        async def load_page() -> Dict[str, Any]:
+            rows, has_more = await self.sp_service.get_page(
                 table_name=self.table_name,
-                columns="id, name"
+                columns=columns,
+                limit=limit,
+                after_id=after_id
             )
+            if not rows:
+                return {"items": [], "next_cursor": None}
 
-            if not res:
+            next_cursor = encode_cursor(rows[-1]["id"]) if has_more else None
+            return {"items": rows, "next_cursor": next_cursor}
+
+        try:
+            page = await self.metadata_cache.read_through(
+                entity=self.table_name,
+                key=f"list:{limit}:{after_id or ''}:{columns}",
+                producer=load_page,
+                scope=MetadataCacheService.LIST_SCOPE
+            )
+
+            if not page["items"]:
                 logger.info("No tenants found")
-                return []
+                return page
 
-            logger.info("Retrieved %d tenants", len(res))
-            return res
+            logger.info("Retrieved %d tenants", len(page["items"]))
+            return page
 
         except Exception as e:
             logger.error("Tenant Service Error - get_all_tenants - %s", str(e), exc_info=True)
-            return []
+            return {"items": [], "next_cursor": None}
+
+
+    def export_tenants(self, columns: str = DEFAULT_TENANT_COLUMNS) -> AsyncIterator[Dict[str, Any]]:
+        return self.sp_service.stream_all(table_name=self.table_name, columns=columns)
         
     
     async def get_tenant(self, id: str) -> Dict[str, Any]:
         try:
-            res = await self.sp_service.get_row_by_id(
-                id=id,
-                table_name=self.table_name,
-                columns="name"
+            res = await self.metadata_cache.read_through(
+                entity=self.table_name,
+                key=id,
+                producer=lambda: self.sp_service.get_row_by_id(
+                    id=id,
+                    table_name=self.table_name,
+                    columns="name"
+                )
             )
 
             if not res:
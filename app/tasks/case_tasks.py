@@ -1,28 +1,53 @@
 from app.celery_app import celery_app
 from app.service.case_service import CaseService
+from app.service.task_registry import get_task_registry
+from app.service.circuit_breaker import is_deferred
+from datetime import datetime, timezone
 import asyncio
 from typing import Dict, Any
 
 
 @celery_app.task(bind=True, name="case.process_history")
-def process_case_history(self, case_id: str):
+def process_case_history(self, case_id: str, force: bool = False, deferral: int = 0):
     """
     Celery task: process one case by reusing history files.
-    Returns a small dict; progress reported via task state/meta.
+    Skips the model when the files are unchanged since the latest response, unless force.
+    deferral > 0 for re-runs queued while the model was unavailable; a run that is deferred
+    again ends DEFERRED with the next run's task id.
+    Returns a small dict; progress reported via task state/meta, and mirrored to the
+    Redis task registry (and its events channel) under the Celery task id.
     """
+    registry = get_task_registry()
+    task_id = self.request.id
+
+    def _now_iso() -> str:
+        return datetime.now(timezone.utc).isoformat()
+
     async def _run() -> Dict[str, Any]:
         svc = CaseService()
         try:
             self.update_state(state="STARTED", meta={"step": "fetch_files"})
-            result = await svc.proceed_with_model_history_files(case_id)
-        
+            registry.update(task_id, state="RUNNING", started_at=_now_iso(), meta={"step": "fetch_files"})
+            result = await svc.proceed_with_model_history_files(case_id, force=force, deferral=deferral)
+            if is_deferred(result):
+                return {"case_id": case_id, "success": False, "deferred": True, "deferred_task_id": result.get("deferred_task_id")}
+
             return {"case_id": case_id, "success": True}
         
         except Exception as e:
             return {"case_id": case_id, "success": False, "error": str(e)}
 
+    if registry.get(task_id) is None:
+        # enqueued without a registry record (defer_history_run creates one up front)
+        registry.create([task_id], enqueued_at=_now_iso())
     self.update_state(state="PROGRESS", meta={"step": "running"})
     out = asyncio.run(_run())
+    if out.get("deferred"):
+        registry.update(task_id, state="DEFERRED", ended_at=_now_iso(), result=out)
+    elif out["success"]:
+        registry.update(task_id, state="SUCCESS", ended_at=_now_iso(), result=out)
+    else:
+        registry.update(task_id, state="FAILURE", ended_at=_now_iso(), error=out["error"])
     
     # final state is "SUCCESS" automatically when returning
     return out
\ No newline at end of file
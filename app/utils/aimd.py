@@ -0,0 +1,48 @@
+import threading
+
+
+class AIMDController():
+    """
+    Additive-increase / multiplicative-decrease controller for a concurrency limit or a rate.
+    Successes under the latency target grow the value by `increase`; overload signals
+    (429s, timeouts, latency above target) multiply it by `decrease_factor`, at most once per
+    `cooldown_seconds` so a burst of failures from one episode only counts once.
+    """
+    def __init__(
+        self,
+        initial: float,
+        minimum: float,
+        maximum: float,
+        increase: float = 1,
+        decrease_factor: float = 0.5,
+        latency_target_seconds: float = None,
+        cooldown_seconds: float = 1.0
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_target_seconds = latency_target_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self._value = min(maximum, max(minimum, initial))
+        self._last_decrease_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def on_success(self, latency_seconds: float, now: float) -> float:
+        if self.latency_target_seconds is not None and latency_seconds > self.latency_target_seconds:
+            return self.on_overload(now)
+        with self._lock:
+            self._value = min(self.maximum, self._value + self.increase)
+            return self._value
+
+    def on_overload(self, now: float) -> float:
+        with self._lock:
+            if self._last_decrease_at is not None and now - self._last_decrease_at < self.cooldown_seconds:
+                return self._value
+            self._last_decrease_at = now
+            self._value = max(self.minimum, self._value * self.decrease_factor)
+            return self._value
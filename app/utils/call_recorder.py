@@ -0,0 +1,64 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class ModelCallRecorder():
+    """Model calls made on behalf of one case, collected for persistence with its response."""
+    def __init__(self, case_id: Optional[str] = None, tenant_id: Optional[str] = None):
+        self.case_id = case_id
+        self.tenant_id = tenant_id
+        self.calls: List[Dict[str, Any]] = []
+
+    def add(self, call: Dict[str, Any]) -> None:
+        self.calls.append(call)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Totals for the case. A call made for several cases at once (marked "shared_by") counts
+        with its per-case share of tokens and latency, so summing cases never overstates cost.
+        """
+        claim_calls = [c for c in self.calls if c["kind"] in ("claim", "stream", "batch")]
+        return {
+            "calls": len(self.calls),
+            "shared_calls": sum(1 for c in self.calls if c.get("shared_by", 1) > 1),
+            "attempts": max((c["attempt"] for c in claim_calls), default=0),
+            "models": sorted({c["model"] for c in self.calls}),
+            "prompt_tokens": self._total("prompt_tokens"),
+            "cached_tokens": self._total("cached_tokens"),
+            "output_tokens": self._total("output_tokens"),
+            "latency_ms": self._total("latency_ms"),
+            "outcome": claim_calls[-1]["outcome"] if claim_calls else None,
+            "details": list(self.calls),
+        }
+
+    def _total(self, field: str) -> float:
+        return round(sum(c[field] / c.get("shared_by", 1) for c in self.calls), 1)
+
+
+_CURRENT: ContextVar[Optional[ModelCallRecorder]] = ContextVar("model_call_recorder", default=None)
+
+
+def current_recorder() -> Optional[ModelCallRecorder]:
+    return _CURRENT.get()
+
+
+@contextmanager
+def record_model_calls(case_id: Optional[str] = None, tenant_id: Optional[str] = None) -> Iterator[ModelCallRecorder]:
+    """Collect every model call made in this context (including tasks it spawns) into a recorder."""
+    with use_recorder(ModelCallRecorder(case_id=case_id, tenant_id=tenant_id)) as recorder:
+        yield recorder
+
+
+@contextmanager
+def use_recorder(recorder: Optional[ModelCallRecorder]) -> Iterator[Optional[ModelCallRecorder]]:
+    """Make an existing recorder current, e.g. for work done on behalf of several cases at once."""
+    token = _CURRENT.set(recorder)
+    try:
+        yield recorder
+    finally:
+        try:
+            _CURRENT.reset(token)
+        except ValueError:
+            # a streaming generator closed from another context (client disconnect)
+            _CURRENT.set(None)
@@ -0,0 +1,50 @@
+from typing import List
+import math
+
+# Rough chars-per-token ratio for English text with Gemini tokenizers
+CHARS_PER_TOKEN = 4
+
+# Preferred split points, coarsest first: blank lines (documents / pages), lines, words
+_SEPARATORS = ("\n\n", "\n", " ")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate, good enough for budgeting prompts."""
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens (estimated), cutting at the coarsest
+    boundary available so documents and pages stay together whenever they fit.
+    """
+    max_chars = max(1, int(max_tokens)) * CHARS_PER_TOKEN
+    if not text:
+        return []
+    return [chunk for chunk in _split(text, max_chars, 0) if chunk.strip()]
+
+
+def _split(text: str, max_chars: int, level: int) -> List[str]:
+    if len(text) <= max_chars:
+        return [text]
+    if level >= len(_SEPARATORS):
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+    separator = _SEPARATORS[level]
+    chunks: List[str] = []
+    current = ""
+    for piece in text.split(separator):
+        candidate = f"{current}{separator}{piece}" if current else piece
+        if len(candidate) <= max_chars:
+            current = candidate
+            continue
+        if current:
+            chunks.append(current)
+        if len(piece) > max_chars:
+            chunks.extend(_split(piece, max_chars, level + 1))
+            current = ""
+        else:
+            current = piece
+    if current:
+        chunks.append(current)
+    return chunks
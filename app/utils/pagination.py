@@ -0,0 +1,69 @@
+from typing import Optional, Iterable, AsyncIterator, Dict, Any
+import base64
+import json
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(last_id: str) -> str:
+    """Encode the last seen row id into an opaque, url-safe cursor."""
+    payload = json.dumps({"id": last_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[str]:
+    """Return the row id stored in a cursor, None for no cursor. Raises ValueError if malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        last_id = data["id"]
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(last_id, str) or not last_id:
+        raise ValueError("Invalid cursor")
+    return last_id
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(int(limit), MAX_PAGE_SIZE)
+
+
+def resolve_columns(requested: Optional[str], allowed: Iterable[str], default: str) -> str:
+    """
+    Validate a comma separated column projection against an allow list.
+    "id" is always included because it is the keyset column. Raises ValueError on unknown columns.
+    """
+    if not requested:
+        return default
+
+    allowed_set = set(allowed)
+    columns = [c.strip() for c in requested.split(",") if c.strip()]
+    unknown = [c for c in columns if c not in allowed_set]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+
+    if "id" not in columns:
+        columns.insert(0, "id")
+    # keep order, drop duplicates
+    return ", ".join(dict.fromkeys(columns))
+
+
+async def to_ndjson(rows: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """
+    Serialize an async row iterator as newline-delimited JSON for StreamingResponse.
+    The status line is long gone when rows fails mid-way, so a last {"error": ...} line is written
+    and the exception re-raised, which aborts the response without a clean end of body.
+    """
+    try:
+        async for row in rows:
+            yield (json.dumps(row, ensure_ascii=False, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+    except Exception as e:
+        yield (json.dumps({"error": f"Export incomplete: {e}"}, ensure_ascii=False) + "\n").encode("utf-8")
+        raise
@@ -0,0 +1,104 @@
+from app.utils.metrics import metrics
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's input, one per worker
+_DONE = object()
+
+
+class Stage():
+    """
+    One step of a StagePipeline: handler(item) runs on `concurrency` workers of its own and returns
+    the item for the next stage, or None when the item is finished (skipped, failed or done).
+    At most queue_size items wait for the stage (default: twice its concurrency).
+    """
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Awaitable[Optional[Any]]],
+        concurrency: int,
+        queue_size: int = 0
+    ):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, int(concurrency))
+        self.queue_size = queue_size or 2 * self.concurrency
+
+
+class StagePipeline():
+    """
+    Runs items through stages connected by bounded queues. A slow stage only fills its own queue
+    (and, once that is full, holds back the stage feeding it) while the other stages keep working,
+    so throughput is set by the bottleneck stage rather than by the sum of all steps.
+    A handler exception finishes the item through on_error(stage_name, item, exception).
+    Queue depths are reported as pipeline_queue_depth{pipeline, stage}.
+    """
+    def __init__(
+        self,
+        name: str,
+        stages: List[Stage],
+        on_error: Optional[Callable[[str, Any, Exception], None]] = None
+    ):
+        self.name = name
+        self.stages = stages
+        self.on_error = on_error
+
+
+    async def run(self, items: Iterable[Any]) -> None:
+        """Feed items and return once every item has left the pipeline."""
+        queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        workers = [
+            [asyncio.create_task(self._work(i, queues)) for _ in range(stage.concurrency)]
+            for i, stage in enumerate(self.stages)
+        ]
+        try:
+            for item in items:
+                await self._put(0, queues, item)
+            # a stage is drained once all its workers exited; only then can the next one be closed
+            for i, stage in enumerate(self.stages):
+                for _ in range(stage.concurrency):
+                    await queues[i].put(_DONE)
+                await asyncio.gather(*workers[i])
+        finally:
+            for task in (task for stage_workers in workers for task in stage_workers):
+                if not task.done():
+                    task.cancel()
+
+
+    async def _work(self, index: int, queues: List[asyncio.Queue]) -> None:
+        stage = self.stages[index]
+        while True:
+            item = await queues[index].get()
+            if item is _DONE:
+                return
+            self._report_depth(index, queues)
+            try:
+                result = await stage.handler(item)
+            except Exception as e:
+                metrics.incr("pipeline_stage_errors_total", pipeline=self.name, stage=stage.name)
+                self._fail(stage, item, e)
+                continue
+            if result is not None and index + 1 < len(self.stages):
+                await self._put(index + 1, queues, result)
+
+
+    async def _put(self, index: int, queues: List[asyncio.Queue], item: Any) -> None:
+        await queues[index].put(item)
+        self._report_depth(index, queues)
+
+
+    def _fail(self, stage: Stage, item: Any, error: Exception) -> None:
+        if self.on_error is None:
+            logger.warning("Pipeline %s: stage %s failed: %s", self.name, stage.name, error)
+            return
+        try:
+            self.on_error(stage.name, item, error)
+        except Exception:
+            logger.exception("Pipeline %s: error handler of stage %s failed", self.name, stage.name)
+
+
+    def _report_depth(self, index: int, queues: List[asyncio.Queue]) -> None:
+        metrics.set_gauge("pipeline_queue_depth", queues[index].qsize(), pipeline=self.name, stage=self.stages[index].name)
@@ -1,19 +1,108 @@
+import ast
 import json
+import re
+from app.config.settings import DECISIONS, RISK_SCORES, KNOWN_FLAGS
+
+# ```json ... ``` or ``` ... ```
+_FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+# ", }" / ", ]"
+_TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+# "85", "85.0", "85 %"
+_NUMBER_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*%?\s*$")
+# "review required", "Review-Required"
+_ENUM_SEPARATOR_PATTERN = re.compile(r"[\s\-]+")
+
 
 class Validator():
     def __init__(self):
         self.gemini_response_expected_keys = {"decision", "reasoning", "confidence", "riskScore", "flags"}
+        self.decisions = frozenset(DECISIONS)
+        self.risk_scores = frozenset(RISK_SCORES)
+        self.known_flags = frozenset(KNOWN_FLAGS)
 
     def validate_gemini_response(self, response_text: str):
         try:
             data = json.loads(response_text)
-            if not isinstance(data, dict):
-                return False, "Not a JSON object"
-            missing = self.gemini_response_expected_keys - data.keys()
-            if missing:
-                return False, f"Missing keys: {missing}"
-            
-            return True, data
+            return self.validate_gemini_data(data)
         except Exception as e:
             return False, str(e)
 
+    def validate_gemini_data(self, data):
+        if not isinstance(data, dict):
+            return False, "Not a JSON object"
+        missing = self.gemini_response_expected_keys - data.keys()
+        if missing:
+            return False, f"Missing keys: {missing}"
+        if data["decision"] not in self.decisions:
+            return False, f"Invalid decision: {data['decision']}"
+        if data["riskScore"] not in self.risk_scores:
+            return False, f"Invalid riskScore: {data['riskScore']}"
+        confidence = data["confidence"]
+        if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or not 0 <= confidence <= 100:
+            return False, f"Invalid confidence: {confidence}"
+        flags = data["flags"]
+        if not isinstance(flags, list) or any(flag not in self.known_flags for flag in flags):
+            return False, f"Invalid flags: {flags}"
+
+        return True, data
+
+    def repair_gemini_response(self, response_text: str):
+        """
+        Deterministic local repair of a rejected response before the model is asked again:
+        strips code fences and prose around the outermost JSON object, fixes trailing commas and
+        Python-style literals, normalizes enum casing and confidence, and drops unknown flags.
+        Returns (is_valid, data or error) like validate_gemini_response.
+        """
+        data = self.extract_json_object(response_text)
+        if data is None:
+            return False, "No JSON object found"
+        return self.validate_gemini_data(self._normalize(data))
+
+    def extract_json_object(self, text: str):
+        """Outermost JSON object in text, tolerating fences, surrounding prose and common syntax slips."""
+        if not isinstance(text, str):
+            return None
+        fenced = _FENCE_PATTERN.search(text)
+        if fenced:
+            text = fenced.group(1)
+        start, end = text.find("{"), text.rfind("}")
+        if start == -1 or end <= start:
+            return None
+        candidate = text[start:end + 1]
+
+        for parse in (json.loads, lambda c: json.loads(_TRAILING_COMMA_PATTERN.sub(r"\1", c)), ast.literal_eval):
+            try:
+                data = parse(candidate)
+            except Exception:
+                continue
+            if isinstance(data, dict):
+                return data
+        return None
+
+    def _normalize(self, data: dict) -> dict:
+        data = dict(data)
+        for key, allowed in (("decision", self.decisions), ("riskScore", self.risk_scores)):
+            if isinstance(data.get(key), str):
+                value = self._enum_value(data[key])
+                if value in allowed:
+                    data[key] = value
+
+        confidence = data.get("confidence")
+        if isinstance(confidence, str):
+            match = _NUMBER_PATTERN.match(confidence)
+            if match:
+                confidence = float(match.group(1))
+        if isinstance(confidence, float) and confidence.is_integer():
+            confidence = int(confidence)
+        data["confidence"] = confidence
+
+        flags = data.get("flags")
+        if isinstance(flags, str):
+            flags = [flags]
+        if isinstance(flags, list):
+            normalized = [self._enum_value(flag) for flag in flags if isinstance(flag, str)]
+            data["flags"] = list(dict.fromkeys(flag for flag in normalized if flag in self.known_flags))
+        return data
+
+    def _enum_value(self, value: str) -> str:
+        return _ENUM_SEPARATOR_PATTERN.sub("_", value.strip()).upper()
@@ -0,0 +1,142 @@
+import pytest
+from unittest.mock import AsyncMock
+from app.service.case_service import CaseService
+from app.service.circuit_breaker import is_model_unavailable
+from app.config.settings import get_settings
+
+
+@pytest.mark.asyncio
+async def test_compute_input_fingerprint_tracks_etags(case_service: CaseService, mocker):
+    # Arrange
+    files = [{"id": "F2", "s3_link": "C1/b.pdf"}, {"id": "F1", "s3_link": "C1/a.pdf"}]
+    mocker.patch.object(case_service, "file_service")
+    case_service.file_service.get_etags = AsyncMock(return_value={"C1/a.pdf": "e1", "C1/b.pdf": "e2"})
+
+    # Act
+    first = await case_service.compute_input_fingerprint("C1", files)
+    reordered = await case_service.compute_input_fingerprint("C1", list(reversed(files)))
+    case_service.file_service.get_etags = AsyncMock(return_value={"C1/a.pdf": "e1", "C1/b.pdf": "changed"})
+    edited = await case_service.compute_input_fingerprint("C1", files)
+
+    # Assert
+    assert first == reordered
+    assert first != edited
+    case_service.file_service.get_etags.assert_awaited_once_with(["C1/b.pdf", "C1/a.pdf"])
+
+
+@pytest.mark.asyncio
+async def test_history_returns_latest_response_when_unchanged(case_service: CaseService, mocker):
+    # Arrange
+    case_service.metadata_cache = AsyncMock()
+    case_service.metadata_cache.read_through = AsyncMock(return_value=[{"id": "F1", "s3_link": "C1/a.pdf"}])
+    mocker.patch.object(case_service, "compute_input_fingerprint", AsyncMock(return_value="FP"))
+    mocker.patch.object(case_service, "sp_service")
+    case_service.sp_service.get_latest_responses_by_case_ids = AsyncMock(
+        return_value={"C1": {"id": "R1", "s3_link": "C1/response_1.json", "input_fingerprint": "FP"}}
+    )
+    mocker.patch.object(case_service, "file_service")
+    case_service.file_service.extract_content = AsyncMock(return_value={"decision": "APPROVED"})
+    mocker.patch.object(case_service, "analyze_history_files", AsyncMock())
+
+    # Act
+    result = await case_service.proceed_with_model_history_files("C1")
+
+    # Assert
+    assert result == {"decision": "APPROVED"}
+    case_service.analyze_history_files.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_history_force_reanalyzes_and_stores_fingerprint(case_service: CaseService, mocker):
+    # Arrange
+    files = [{"id": "F1", "s3_link": "C1/a.pdf"}]
+    case_service.metadata_cache = AsyncMock()
+    case_service.metadata_cache.read_through = AsyncMock(return_value=files)
+    mocker.patch.object(case_service, "compute_input_fingerprint", AsyncMock(return_value="FP"))
+    mocker.patch.object(case_service, "sp_service")
+    case_service.sp_service.get_latest_responses_by_case_ids = AsyncMock()
+    case_service.sp_service.insert = AsyncMock(return_value={"id": "R2"})
+    case_service.sp_service.update_bulk = AsyncMock()
+    mocker.patch.object(case_service, "file_service")
+    case_service.file_service.save_respose_v2 = AsyncMock(return_value={"s3_key": "C1/response_2.json"})
+    mocker.patch.object(case_service, "analyze_history_files", AsyncMock(return_value={"decision": "APPROVED"}))
+
+    # Act
+    await case_service.proceed_with_model_history_files("C1", force=True)
+
+    # Assert
+    case_service.sp_service.get_latest_responses_by_case_ids.assert_not_awaited()
+    case_service.sp_service.insert.assert_awaited_once_with(
+        table_name="response",
+        object={"case_id": "C1", "s3_link": "C1/response_2.json", "input_fingerprint": "FP"}
+    )
+
+
+@pytest.mark.asyncio
+async def test_history_model_unavailable_result_is_saved_without_fingerprint(case_service: CaseService, mocker):
+    # Arrange
+    unavailable = {
+        "decision": "REVIEW_REQUIRED", "reasoning": "r", "confidence": 0, "riskScore": "HIGH",
+        "flags": ["MANUAL_REVIEW_REQUIRED", "MODEL_UNAVAILABLE"]
+    }
+    case_service.metadata_cache = AsyncMock()
+    case_service.metadata_cache.read_through = AsyncMock(return_value=[{"id": "F1", "s3_link": "C1/a.pdf"}])
+    mocker.patch.object(case_service, "compute_input_fingerprint", AsyncMock(return_value="FP"))
+    mocker.patch.object(case_service, "sp_service")
+    case_service.sp_service.insert = AsyncMock(return_value={"id": "R2"})
+    case_service.sp_service.update_bulk = AsyncMock()
+    mocker.patch.object(case_service, "file_service")
+    case_service.file_service.save_respose_v2 = AsyncMock(return_value={"s3_key": "C1/response_2.json"})
+    mocker.patch.object(case_service, "analyze_history_files", AsyncMock(return_value=unavailable))
+
+    # Act
+    await case_service.proceed_with_model_history_files("C1", force=True)
+
+    # Assert
+    case_service.sp_service.insert.assert_awaited_once_with(
+        table_name="response",
+        object={"case_id": "C1", "s3_link": "C1/response_2.json"}
+    )
+
+
+@pytest.mark.asyncio
+async def test_history_deferred_result_is_queued_not_saved(case_service: CaseService, mocker):
+    # Arrange
+    case_service.metadata_cache = AsyncMock()
+    case_service.metadata_cache.read_through = AsyncMock(return_value=[{"id": "F1", "s3_link": "C1/a.pdf"}])
+    mocker.patch.object(case_service, "compute_input_fingerprint", AsyncMock(return_value="FP"))
+    mocker.patch.object(case_service, "sp_service")
+    case_service.sp_service.insert = AsyncMock()
+    deferred = {"error": "Model unavailable, analysis deferred", "deferred": True, "retry_after_seconds": 12.5}
+    mocker.patch.object(case_service, "analyze_history_files", AsyncMock(return_value=deferred))
+    mocker.patch.object(case_service, "defer_history_run", return_value="T2")
+
+    # Act
+    result = await case_service.proceed_with_model_history_files("C1", force=True, deferral=1)
+
+    # Assert
+    assert result == {**deferred, "deferred_task_id": "T2"}
+    case_service.defer_history_run.assert_called_once_with("C1", 12.5, 2)
+    case_service.sp_service.insert.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_history_stops_deferring_after_max_deferrals(case_service: CaseService, mocker):
+    # Arrange
+    case_service.metadata_cache = AsyncMock()
+    case_service.metadata_cache.read_through = AsyncMock(return_value=[{"id": "F1", "s3_link": "C1/a.pdf"}])
+    mocker.patch.object(case_service, "compute_input_fingerprint", AsyncMock(return_value="FP"))
+    deferred = {"error": "Model unavailable, analysis deferred", "deferred": True, "retry_after_seconds": 12.5}
+    mocker.patch.object(case_service, "analyze_history_files", AsyncMock(return_value=deferred))
+    mocker.patch.object(case_service, "defer_history_run")
+    mocker.patch.object(case_service, "_save_model_response", AsyncMock(return_value=None))
+    max_deferrals = get_settings().gemini.circuit_max_deferrals
+
+    # Act
+    result = await case_service.proceed_with_model_history_files("C1", force=True, deferral=max_deferrals)
+
+    # Assert: saved as the review answer instead of being queued again
+    assert result["decision"] == "REVIEW_REQUIRED"
+    assert is_model_unavailable(result)
+    case_service.defer_history_run.assert_not_called()
+    assert case_service._save_model_response.await_args.args[0] == result
@@ -48,24 +48,58 @@ async def test_load_text_from_s3_exception_returns_empty(case_service: CaseServi
 async def test_link_existing_files_to_response(case_service: CaseService, mocker):
     # Arrange
     files_metadata = [
-        {"s3_link": "key1", "case_name": "Test1"},
-        {"s3_link": "key2", "case_name": "Test2"}
+        {"id": "F1", "s3_link": "key1", "case_name": "Test1"},
+        {"id": "F2", "s3_link": "key2", "case_name": "Test2"},
+        {"s3_link": "key3", "case_name": "NoId"}
     ]
     case_id = "C123"
     response_data_id = "R456"
     
     # Mock using AsyncMock for consistency
-    case_service.sp_service.insert_bulk = AsyncMock()
+    case_service.sp_service.update_bulk = AsyncMock()
+    case_service.sp_service.update = AsyncMock()
     
     # Act
     await case_service._link_existing_files_to_response(files_metadata, case_id, response_data_id)
     
-    # Assert
-    expected_files = [
-        {"case_id": "C123", "case_name": "Test1", "s3_link": "key1", "response_id": "R456"},
-        {"case_id": "C123", "case_name": "Test2", "s3_link": "key2", "response_id": "R456"}
-    ]
-    case_service.sp_service.insert_bulk.assert_awaited_once_with(
+    # Assert: one bulk update for every file that has an id, no per-file updates
+    case_service.sp_service.update_bulk.assert_awaited_once_with(
         table_name="files", 
-        objects=expected_files
+        ids=["F1", "F2"],
+        objects={"response_id": "R456"}
     )
+    case_service.sp_service.update.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_link_existing_files_to_response_no_files(case_service: CaseService, mocker):
+    case_service.sp_service.update_bulk = AsyncMock()
+
+    await case_service._link_existing_files_to_response([], "C123", "R456")
+
+    case_service.sp_service.update_bulk.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_fetch_and_extract_history_inputs_match_build_history_details(case_service: CaseService, mocker):
+    # Arrange: one PDF cached, one to download and parse
+    files_metadata = [
+        {"s3_link": "case1/cached.pdf"},
+        {"s3_link": "case1/new.pdf"},
+        {"s3_link": "case1/manual.txt"}
+    ]
+    case_service.file_service.get_cached_pdf_text = AsyncMock(side_effect=lambda key: "Cached " if key == "case1/cached.pdf" else None)
+    case_service.file_service.download_bytes = AsyncMock(return_value=b"%PDF")
+    case_service.file_service.cache_pdf_text = AsyncMock()
+    case_service._load_text_from_s3 = AsyncMock(return_value="Manual ")
+    mocker.patch("app.service.case_service.pdf_text_from_bytes", return_value="Parsed")
+
+    # Act
+    inputs = await case_service.fetch_history_inputs(files_metadata)
+    details, extraction_failed = await case_service.extract_history_inputs(inputs)
+
+    # Assert
+    assert inputs["pdfs"] == [{"s3_key": "case1/cached.pdf", "text": "Cached "}, {"s3_key": "case1/new.pdf", "content": b"%PDF"}]
+    assert (details, extraction_failed) == ("Manual \n\nCached \n\nParsed", False)
+    case_service.file_service.download_bytes.assert_awaited_once_with("case1/new.pdf")
+    case_service.file_service.cache_pdf_text.assert_awaited_once_with("case1/new.pdf", "Parsed")
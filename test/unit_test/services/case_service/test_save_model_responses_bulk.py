@@ -0,0 +1,114 @@
+import pytest
+from unittest.mock import AsyncMock
+from app.service.case_service import CaseService
+
+
+@pytest.mark.asyncio
+async def test_save_model_responses_bulk_one_insert_and_grouped_relinks(case_service: CaseService, mocker):
+    # Arrange
+    items = [
+        {"case_id": "C1", "response": {"decision": "APPROVED"}, "files_metadata": [{"id": "F1"}, {"id": "F2"}]},
+        {"case_id": "C2", "response": {"decision": "REJECTED"}, "files_metadata": [{"id": "F3"}]},
+    ]
+    mocker.patch.object(case_service, "file_service")
+    case_service.file_service.save_respose_v2 = AsyncMock(side_effect=[
+        {"success": True, "s3_key": "C1/response_1.json"},
+        {"success": True, "s3_key": "C2/response_1.json"},
+    ])
+    mocker.patch.object(case_service, "sp_service")
+    case_service.sp_service.insert_bulk = AsyncMock(return_value=[
+        {"id": "R2", "case_id": "C2", "s3_link": "C2/response_1.json"},
+        {"id": "R1", "case_id": "C1", "s3_link": "C1/response_1.json"},
+    ])
+    case_service.sp_service.update_bulk = AsyncMock(return_value=[])
+    case_service.metadata_cache = AsyncMock()
+
+    # Act
+    result = await case_service.save_model_responses_bulk(items)
+
+    # Assert
+    assert result == ["R1", "R2"]
+    case_service.sp_service.insert_bulk.assert_awaited_once_with(
+        table_name="response",
+        objects=[
+            {"case_id": "C1", "s3_link": "C1/response_1.json", "input_fingerprint": None, "model_metrics": None},
+            {"case_id": "C2", "s3_link": "C2/response_1.json", "input_fingerprint": None, "model_metrics": None},
+        ]
+    )
+    relinks = [(c.kwargs["ids"], c.kwargs["objects"]) for c in case_service.sp_service.update_bulk.await_args_list]
+    assert relinks == [(["F1", "F2"], {"response_id": "R1"}), (["F3"], {"response_id": "R2"})]
+
+
+@pytest.mark.asyncio
+async def test_save_model_responses_bulk_insert_error(case_service: CaseService, mocker):
+    mocker.patch.object(case_service, "file_service")
+    case_service.file_service.save_respose_v2 = AsyncMock(return_value={"success": True, "s3_key": "C1/r.json"})
+    mocker.patch.object(case_service, "sp_service")
+    case_service.sp_service.insert_bulk = AsyncMock(return_value={"error": "boom"})
+    case_service.sp_service.update_bulk = AsyncMock(return_value=[])
+    case_service.metadata_cache = AsyncMock()
+
+    result = await case_service.save_model_responses_bulk(
+        [{"case_id": "C1", "response": {}, "files_metadata": [{"id": "F1"}]}]
+    )
+
+    assert result == [None]
+    case_service.sp_service.update_bulk.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_save_model_responses_bulk_keeps_repeated_cases_apart(case_service: CaseService, mocker):
+    # Arrange: the same case twice in one flush
+    items = [
+        {"case_id": "C1", "response": {"decision": "APPROVED"}, "files_metadata": [{"id": "F1"}]},
+        {"case_id": "C1", "response": {"decision": "REJECTED"}, "files_metadata": [{"id": "F1"}]},
+    ]
+    mocker.patch.object(case_service, "file_service")
+    case_service.file_service.save_respose_v2 = AsyncMock(side_effect=[
+        {"success": True, "s3_key": "C1/response_1.json"},
+        {"success": True, "s3_key": "C1/response_2.json"},
+    ])
+    mocker.patch.object(case_service, "sp_service")
+    case_service.sp_service.insert_bulk = AsyncMock(return_value=[
+        {"id": "R1", "case_id": "C1", "s3_link": "C1/response_1.json"},
+        {"id": "R2", "case_id": "C1", "s3_link": "C1/response_2.json"},
+    ])
+    case_service.sp_service.update_bulk = AsyncMock(return_value=[])
+    case_service.metadata_cache = AsyncMock()
+
+    # Act
+    result = await case_service.save_model_responses_bulk(items)
+
+    # Assert
+    assert result == ["R1", "R2"]
+    case_service.sp_service.update_bulk.assert_awaited_once_with(
+        table_name="files", ids=["F1"], objects={"response_id": "R2"}
+    )
+    case_service.metadata_cache.invalidate.assert_awaited_once_with("case", "C1")
+
+
+@pytest.mark.asyncio
+async def test_save_model_responses_bulk_relink_error_fails_the_item(case_service: CaseService, mocker):
+    # Arrange: relinking C2's files fails
+    items = [
+        {"case_id": "C1", "response": {"decision": "APPROVED"}, "files_metadata": [{"id": "F1"}]},
+        {"case_id": "C2", "response": {"decision": "REJECTED"}, "files_metadata": [{"id": "F2"}]},
+    ]
+    mocker.patch.object(case_service, "file_service")
+    case_service.file_service.save_respose_v2 = AsyncMock(side_effect=[
+        {"success": True, "s3_key": "C1/response_1.json"},
+        {"success": True, "s3_key": "C2/response_1.json"},
+    ])
+    mocker.patch.object(case_service, "sp_service")
+    case_service.sp_service.insert_bulk = AsyncMock(return_value=[
+        {"id": "R1", "case_id": "C1", "s3_link": "C1/response_1.json"},
+        {"id": "R2", "case_id": "C2", "s3_link": "C2/response_1.json"},
+    ])
+    case_service.sp_service.update_bulk = AsyncMock(side_effect=[[{"id": "F1"}], {"error": "permission denied"}])
+    case_service.metadata_cache = AsyncMock()
+
+    # Act
+    result = await case_service.save_model_responses_bulk(items)
+
+    # Assert
+    assert result == ["R1", None]
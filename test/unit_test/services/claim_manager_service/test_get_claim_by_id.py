@@ -0,0 +1,45 @@
+import pytest
+from unittest.mock import AsyncMock
+from app.service.claim_manager_service import ClaimManagerService
+
+
+@pytest.fixture
+def claim_manager_service():
+    return ClaimManagerService()
+
+
+@pytest.mark.asyncio
+async def test_get_claim_by_id_uses_single_snapshot(claim_manager_service: ClaimManagerService, mocker):
+    # Arrange
+    snapshot = {
+        "id": "C1",
+        "tenant_id": "T1",
+        "case_name": "Case",
+        "status": "open",
+        "files": [
+            {"id": "F1", "tenant_id": "T1", "name": "a.pdf", "kind": "raw_upload",
+             "s3_bucket": "b", "s3_key": "T1/C1/uploads/F1_a.pdf", "uploaded_at": "2024-01-01"},
+            {"id": "F2", "tenant_id": "OTHER", "name": "b.pdf", "kind": "raw_upload",
+             "s3_bucket": "b", "s3_key": "OTHER/C1/uploads/F2_b.pdf", "uploaded_at": "2024-01-01"},
+        ]
+    }
+    claim_manager_service.sp_service.get_case_snapshot = AsyncMock(return_value=snapshot)
+    claim_manager_service.sp_service.get_all_files = AsyncMock()
+    mocker.patch.object(claim_manager_service.s3_client, "generate_presigned_url", return_value="https://signed")
+
+    # Act
+    result = await claim_manager_service.get_claim_by_id("C1")
+
+    # Assert: files from another tenant are dropped and no second query is made
+    assert result["id"] == "C1"
+    assert [f["id"] for f in result["files"]] == ["F1"]
+    assert result["files"][0]["download_url"] == "https://signed"
+    claim_manager_service.sp_service.get_case_snapshot.assert_awaited_once()
+    claim_manager_service.sp_service.get_all_files.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_claim_by_id_not_found(claim_manager_service: ClaimManagerService):
+    claim_manager_service.sp_service.get_case_snapshot = AsyncMock(return_value=None)
+
+    assert await claim_manager_service.get_claim_by_id("missing") == {}
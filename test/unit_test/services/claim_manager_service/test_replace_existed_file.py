@@ -0,0 +1,35 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from app.service.claim_manager_service import ClaimManagerService
+
+
+@pytest.fixture
+def claim_manager_service():
+    return ClaimManagerService()
+
+
+@pytest.mark.asyncio
+async def test_failed_upload_gives_the_old_name_back(claim_manager_service: ClaimManagerService, mocker):
+    # Arrange
+    claim_manager_service.sp_service.get_row_by_id = AsyncMock(return_value={
+        "id": "F1", "name": "old.pdf", "s3_bucket": "b", "s3_key": "T1/C1/uploads/F1_old.pdf", "tenant_id": "T1", "case_id": "C1"
+    })
+    claim_manager_service.sp_service.update = AsyncMock()
+    claim_manager_service.filename_index = Mock()
+    claim_manager_service.filename_index.reserve = AsyncMock(return_value="new.pdf")
+    claim_manager_service.filename_index.release = AsyncMock()
+    claim_manager_service.filename_index.add = AsyncMock(side_effect=Exception("redis down"))
+    claim_manager_service.metadata_cache = Mock(invalidate=AsyncMock())
+    mocker.patch.object(claim_manager_service.s3_client, "upload_fileobj", side_effect=Exception("S3 error"))
+    delete_object = mocker.patch.object(claim_manager_service.s3_client, "delete_object")
+    new_file = Mock(filename="new.pdf")
+
+    # Act
+    replaced = await claim_manager_service.replace_existed_file("T1", "C1", "F1", new_file)
+
+    # Assert: the reserved name is freed even though restoring the old one failed, nothing was uploaded to remove
+    assert replaced is False
+    assert [c.args for c in claim_manager_service.filename_index.release.await_args_list] == [("C1", "old.pdf"), ("C1", "new.pdf")]
+    claim_manager_service.filename_index.add.assert_awaited_once_with("C1", "old.pdf")
+    claim_manager_service.sp_service.update.assert_not_awaited()
+    delete_object.assert_not_called()
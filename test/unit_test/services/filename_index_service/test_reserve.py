@@ -0,0 +1,164 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+from app.service.filename_index_service import FilenameIndexService, split_filename
+
+
+class _FakeRedis:
+    """Just enough of the redis client for the index: sets, hashes and a marker key."""
+    def __init__(self):
+        self.sets, self.hashes, self.strings = {}, {}, {}
+        self.ttls = {}
+
+    def exists(self, key):
+        return int(key in self.strings or key in self.sets or key in self.hashes)
+
+    def sadd(self, key, *members):
+        s = self.sets.setdefault(key, set())
+        added = len(set(members) - s)
+        s.update(members)
+        return added
+
+    def srem(self, key, *members):
+        s = self.sets.get(key, set())
+        removed = len(s & set(members))
+        s.difference_update(members)
+        return removed
+
+    def hincrby(self, key, field, amount):
+        h = self.hashes.setdefault(key, {})
+        h[field] = int(h.get(field, 0)) + amount
+        return h[field]
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    def expire(self, key, ttl):
+        if not self.exists(key):
+            return False
+        self.ttls[key] = ttl
+        return True
+
+    def delete(self, *keys):
+        for key in keys:
+            for store in (self.sets, self.hashes, self.strings, self.ttls):
+                store.pop(key, None)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = value
+        return True
+
+    def pipeline(self):
+        pipe = Mock()
+        calls = []
+        for name in ("sadd", "hset", "expire", "set", "delete"):
+            setattr(pipe, name, lambda *a, _n=name, **kw: calls.append((_n, a, kw)))
+        pipe.execute = lambda: [getattr(self, n)(*a, **kw) for n, a, kw in calls]
+        return pipe
+
+
+@pytest.fixture
+def filename_index():
+    index = FilenameIndexService()
+    index.caching_service = Mock()
+    index.caching_service.redis = _FakeRedis()
+    return index
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("document.pdf", ("document", ".pdf")),
+    ("archive.tar.gz", ("archive.tar", ".gz")),
+    ("README", ("README", "")),
+])
+def test_split_filename(filename, expected):
+    assert split_filename(filename) == expected
+
+
+@pytest.mark.asyncio
+async def test_reserve_free_name_loads_listing_once(filename_index: FilenameIndexService):
+    load_names = AsyncMock(return_value=["other.pdf"])
+
+    first = await filename_index.reserve("C1", "doc.pdf", load_names)
+    second = await filename_index.reserve("C1", "scan.pdf", load_names)
+
+    assert (first, second) == ("doc.pdf", "scan.pdf")
+    load_names.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_reserve_continues_after_highest_existing_suffix(filename_index: FilenameIndexService):
+    load_names = AsyncMock(return_value=["doc.pdf", "doc (1).pdf", "doc (7).pdf"])
+
+    assert await filename_index.reserve("C1", "doc.pdf", load_names) == "doc (8).pdf"
+    assert await filename_index.reserve("C1", "doc.pdf", load_names) == "doc (9).pdf"
+
+
+@pytest.mark.asyncio
+async def test_reserve_skips_names_taken_explicitly(filename_index: FilenameIndexService):
+    load_names = AsyncMock(return_value=["doc.pdf"])
+    assert await filename_index.reserve("C1", "doc (1).pdf", load_names) == "doc (1).pdf"
+
+    assert await filename_index.reserve("C1", "doc.pdf", load_names) == "doc (2).pdf"
+
+
+@pytest.mark.asyncio
+async def test_release_frees_name(filename_index: FilenameIndexService):
+    load_names = AsyncMock(return_value=["doc.pdf"])
+    await filename_index.release("C1", "doc.pdf")  # index cold: no-op
+    assert await filename_index.reserve("C1", "doc.pdf", load_names) == "doc (1).pdf"
+
+    await filename_index.release("C1", "doc.pdf")
+
+    assert await filename_index.reserve("C1", "doc.pdf", load_names) == "doc.pdf"
+
+
+@pytest.mark.asyncio
+async def test_keys_created_after_the_build_get_a_ttl(filename_index: FilenameIndexService):
+    # Arrange: empty case, so the build creates no names or counters
+    redis = filename_index.caching_service.redis
+    load_names = AsyncMock(return_value=[])
+    await filename_index.reserve("C1", "doc.pdf", load_names)
+
+    # Act
+    await filename_index.reserve("C1", "doc.pdf", load_names)
+
+    # Assert
+    assert redis.ttls["fname:names:C1"] > 0
+    assert redis.ttls["fname:max:C1"] > 0
+
+
+@pytest.mark.asyncio
+async def test_rebuild_drops_names_of_deleted_files(filename_index: FilenameIndexService):
+    # Arrange: doc.pdf was deleted while the index was cold
+    redis = filename_index.caching_service.redis
+    await filename_index.reserve("C1", "doc.pdf", AsyncMock(return_value=[]))
+    redis.delete("fname:ready:C1")
+
+    # Act
+    name = await filename_index.reserve("C1", "doc.pdf", AsyncMock(return_value=[]))
+
+    # Assert
+    assert name == "doc.pdf"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cold_reserves_rebuild_once(filename_index: FilenameIndexService):
+    # Arrange: the database listing is slow, so both uploads find the index cold
+    listed = asyncio.Event()
+
+    async def load_names():
+        await listed.wait()
+        return ["doc.pdf"]
+
+    # Act
+    first = asyncio.create_task(filename_index.reserve("C1", "doc.pdf", load_names))
+    second = asyncio.create_task(filename_index.reserve("C1", "doc.pdf", load_names))
+    await asyncio.sleep(0.01)
+    listed.set()
+    names = await asyncio.gather(first, second)
+
+    # Assert: the waiting upload kept the first one's reservation
+    assert sorted(names) == ["doc (1).pdf", "doc (2).pdf"]
+    assert not filename_index.caching_service.redis.exists("fname:building:C1")
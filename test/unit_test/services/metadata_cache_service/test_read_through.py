@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import AsyncMock
+from app.service.metadata_cache_service import MetadataCacheService
+
+
+@pytest.fixture
+def metadata_cache():
+    cache = MetadataCacheService()
+    cache.ttl_seconds = 300
+    cache.caching_service = AsyncMock()
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_read_through_hit_skips_producer(metadata_cache: MetadataCacheService):
+    metadata_cache.caching_service.get_str = AsyncMock(return_value="3")
+    metadata_cache.caching_service.get_json = AsyncMock(return_value={"id": "C1"})
+    producer = AsyncMock()
+
+    result = await metadata_cache.read_through("cases", "C1", producer)
+
+    assert result == {"id": "C1"}
+    producer.assert_not_awaited()
+    metadata_cache.caching_service.get_str.assert_awaited_once_with("meta:ver:cases:C1")
+    metadata_cache.caching_service.get_json.assert_awaited_once_with("meta:cases:C1:v3")
+
+
+@pytest.mark.asyncio
+async def test_read_through_miss_fills_versioned_key(metadata_cache: MetadataCacheService):
+    metadata_cache.caching_service.get_str = AsyncMock(return_value=None)
+    metadata_cache.caching_service.get_json = AsyncMock(return_value=None)
+    producer = AsyncMock(return_value={"items": [{"id": "C1"}], "next_cursor": None})
+
+    result = await metadata_cache.read_through("case", "list:100::id", producer, scope="list")
+
+    assert result["items"] == [{"id": "C1"}]
+    metadata_cache.caching_service.get_str.assert_awaited_once_with("meta:ver:case:list")
+    metadata_cache.caching_service.set_json.assert_awaited_once_with(
+        "meta:case:list:100::id:v0", result, ttl_seconds=300
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("value", [None, {}, [], {"error": "boom"}, {"items": [], "next_cursor": None}])
+async def test_read_through_does_not_cache_empty_or_error(metadata_cache: MetadataCacheService, value):
+    metadata_cache.caching_service.get_str = AsyncMock(return_value=None)
+    metadata_cache.caching_service.get_json = AsyncMock(return_value=None)
+
+    result = await metadata_cache.read_through("cases", "C1", AsyncMock(return_value=value))
+
+    assert result == value
+    metadata_cache.caching_service.set_json.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_read_through_falls_back_when_redis_down(metadata_cache: MetadataCacheService):
+    metadata_cache.caching_service.get_str = AsyncMock(side_effect=ConnectionError("redis down"))
+
+    result = await metadata_cache.read_through("tenants", "T1", AsyncMock(return_value={"name": "Acme"}))
+
+    assert result == {"name": "Acme"}
+
+
+@pytest.mark.asyncio
+async def test_invalidate_bumps_each_scope(metadata_cache: MetadataCacheService):
+    await metadata_cache.invalidate("case", "C1", None, "list")
+
+    keys = [c.args[0] for c in metadata_cache.caching_service.incr.await_args_list]
+    assert keys == ["meta:ver:case:C1", "meta:ver:case:list"]
@@ -0,0 +1,99 @@
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from app.service.model_service import ModelService
+from app.utils.call_recorder import ModelCallRecorder, current_recorder, record_model_calls
+from app.utils.metrics import metrics
+
+
+VALID = json.dumps({"decision": "APPROVED", "reasoning": "r", "confidence": 90, "riskScore": "LOW", "flags": []})
+
+
+def _response(text, prompt_tokens=120, output_tokens=30):
+    return SimpleNamespace(
+        text=text,
+        usage_metadata=SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            cached_content_token_count=100,
+            candidates_token_count=output_tokens
+        )
+    )
+
+
+@pytest.fixture
+def model_service():
+    metrics.reset()
+    svc = ModelService()
+    svc.model = "strong-model"
+    yield svc
+    metrics.reset()
+
+
+@pytest.mark.asyncio
+async def test_every_attempt_is_recorded_for_the_case(model_service: ModelService):
+    # Arrange
+    model_service._generate_claim = AsyncMock(side_effect=[_response("not json"), _response(VALID)])
+
+    # Act
+    with record_model_calls(case_id="C1", tenant_id="T1") as recorder:
+        result = await model_service._generate_with_retries("claim prompt", "strong-model", 1)
+
+    # Assert
+    assert result["decision"] == "APPROVED"
+    assert [(c["attempt"], c["outcome"]) for c in recorder.calls] == [(1, "invalid"), (2, "valid")]
+    summary = recorder.summary()
+    assert summary["calls"] == 2
+    assert summary["attempts"] == 2
+    assert summary["outcome"] == "valid"
+    assert summary["prompt_tokens"] == 240
+    assert summary["output_tokens"] == 60
+    assert metrics.get("model_calls_total", model="strong-model", kind="claim", outcome="invalid", tenant="T1") == 1
+    assert metrics.get("model_call_tokens_total", model="strong-model", direction="cached", tenant="T1") == 200
+    assert metrics.get("model_call_latency_seconds", model="strong-model", kind="claim")["count"] == 2
+    assert current_recorder() is None
+
+
+@pytest.mark.asyncio
+async def test_prompt_tokens_fall_back_to_estimate_without_usage(model_service: ModelService):
+    # Arrange
+    model_service._generate_claim = AsyncMock(return_value=SimpleNamespace(text=VALID, usage_metadata=None))
+
+    # Act
+    with record_model_calls(case_id="C1") as recorder:
+        await model_service._generate_with_retries("x" * 400, "strong-model", 0)
+
+    # Assert
+    call = recorder.calls[0]
+    assert call["prompt_chars"] == 400
+    assert call["prompt_tokens"] == 100
+    assert call["output_tokens"] == 0
+
+
+@pytest.mark.asyncio
+async def test_calls_outside_a_case_only_feed_metrics(model_service: ModelService):
+    # Arrange
+    model_service._generate_claim = AsyncMock(return_value=_response(VALID))
+
+    # Act
+    await model_service._generate_with_retries("claim prompt", "strong-model", 0)
+
+    # Assert
+    assert metrics.get("model_calls_total", model="strong-model", kind="claim", outcome="valid") == 1
+
+
+def test_summary_counts_the_case_share_of_packed_calls():
+    # Arrange: one call of its own, one packed call made for four cases
+    recorder = ModelCallRecorder(case_id="C1")
+    own = {"kind": "claim", "model": "m", "attempt": 1, "prompt_tokens": 100, "cached_tokens": 0, "output_tokens": 20, "latency_ms": 500.0, "outcome": "valid"}
+    recorder.add(own)
+    recorder.add({**own, "kind": "batch", "prompt_tokens": 400, "output_tokens": 80, "latency_ms": 2000.0, "shared_by": 4})
+
+    # Act
+    summary = recorder.summary()
+
+    # Assert
+    assert summary["calls"] == 2
+    assert summary["shared_calls"] == 1
+    assert (summary["prompt_tokens"], summary["output_tokens"], summary["latency_ms"]) == (200, 40, 1000.0)
+    assert summary["details"][1]["prompt_tokens"] == 400
@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from app.service.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, MODEL_UNAVAILABLE_FLAG
+from app.service.model_limiter import ModelCallLimiter
+from app.service.model_service import ModelService
+from app.utils.metrics import metrics
+
+
+class _Clock():
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _breaker(clock):
+    return CircuitBreaker("test", failure_threshold=2, open_seconds=30, latency_budget_seconds=5, clock=clock)
+
+
+def test_consecutive_failures_open_the_circuit():
+    breaker = _breaker(_Clock())
+
+    breaker.on_failure()
+    breaker.on_success(1.0)
+    breaker.on_failure()
+    assert breaker.state == CLOSED
+
+    breaker.on_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_calls_over_the_latency_budget_count_as_failures():
+    breaker = _breaker(_Clock())
+
+    breaker.on_success(6.0)
+    breaker.on_success(7.0)
+
+    assert breaker.state == OPEN
+
+
+def test_half_open_probe_closes_or_reopens_the_circuit():
+    # Arrange
+    clock = _Clock()
+    breaker = _breaker(clock)
+    breaker.on_failure()
+    breaker.on_failure()
+
+    # Act / Assert: one probe after the open period, others keep failing fast
+    clock.now += 31
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.on_failure()
+    assert breaker.state == OPEN
+    assert breaker.retry_after() == 30
+
+    clock.now += 31
+    assert breaker.allow()
+    breaker.on_success(1.0)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+@pytest.mark.asyncio
+async def test_limiter_reports_timeouts_to_the_breaker():
+    breaker = _breaker(_Clock())
+    limiter = ModelCallLimiter(max_in_flight=2, timeout_seconds=0.01, breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(asyncio.TimeoutError):
+            await limiter.run(lambda: asyncio.sleep(1))
+
+    assert breaker.state == OPEN
+
+
+@pytest.fixture
+def model_service():
+    metrics.reset()
+    svc = ModelService()
+    svc.breaker = _breaker(_Clock())
+    svc.breaker.on_failure()
+    svc.breaker.on_failure()
+    svc._generate_with_retries = AsyncMock()
+    yield svc
+    metrics.reset()
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_answers_review_required_without_calling_the_model(model_service: ModelService):
+    model_service.circuit_open_action = "review"
+
+    result = await model_service._generate("claim details")
+
+    assert result["decision"] == "REVIEW_REQUIRED"
+    assert MODEL_UNAVAILABLE_FLAG in result["flags"]
+    assert not model_service._is_cacheable(result)
+    model_service._generate_with_retries.assert_not_awaited()
+    assert metrics.get("model_circuit_rejections_total", action="review") == 1
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_defers_when_configured(model_service: ModelService):
+    model_service.circuit_open_action = "defer"
+
+    result = await model_service._generate("claim details")
+
+    assert result["deferred"] is True
+    assert result["retry_after_seconds"] == 30
+    model_service._generate_with_retries.assert_not_awaited()
@@ -0,0 +1,112 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from app.service.model_service import ModelService
+
+
+async def _run_directly(call):
+    return await call()
+
+
+async def _chunks(*texts):
+    for text in texts:
+        chunk = Mock()
+        chunk.text = text
+        yield chunk
+
+
+@pytest.fixture
+def model_service():
+    svc = ModelService()
+    svc.caching_service = AsyncMock()
+    svc.caching_service.get_json = AsyncMock(return_value=None)
+    svc.response_cache_ttl = 60
+    svc.context_cache_enabled = False
+    svc.limiter = Mock()
+    svc.limiter.run = _run_directly
+    svc.limiter.timeout_seconds = 5
+    svc.client = Mock()
+    return svc
+
+
+async def _collect(stream):
+    return [event async for event in stream]
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_stages_deltas_and_validated_result(model_service: ModelService):
+    # Arrange
+    model_service.client.aio.models.generate_content_stream = AsyncMock(return_value=_chunks(
+        '{"decision": "APPROVED", "reasoning": "ok", ',
+        '"confidence": 90, "riskScore": "LOW", "flags": []}'
+    ))
+
+    # Act
+    events = await _collect(model_service.generate_stream("A windshield claim for $300 with photos attached."))
+
+    # Assert
+    assert [e for e in events if e[0] == "stage"] == [("stage", "prompting"), ("stage", "generating"), ("stage", "validating")]
+    assert len([e for e in events if e[0] == "delta"]) == 2
+    assert events[-1] == ("result", {"decision": "APPROVED", "reasoning": "ok", "confidence": 90, "riskScore": "LOW", "flags": []})
+    model_service.caching_service.set_json.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_invalid_stream_falls_back_to_regular_generation(model_service: ModelService):
+    model_service.client.aio.models.generate_content_stream = AsyncMock(return_value=_chunks("I am not JSON"))
+    model_service._generate_with_retries = AsyncMock(return_value={"error": "Invalid Gemini response"})
+
+    events = await _collect(model_service.generate_stream("A windshield claim for $300 with photos attached."))
+
+    assert events[-1] == ("result", {"error": "Invalid Gemini response"})
+    model_service._generate_with_retries.assert_awaited_once()
+    model_service.caching_service.set_json.assert_not_awaited()
+
+
+class _ApiError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+@pytest.mark.asyncio
+async def test_stream_failure_yields_error_without_retrying(model_service: ModelService):
+    model_service.client.aio.models.generate_content_stream = AsyncMock(side_effect=_ApiError(429, "Resource exhausted"))
+    model_service._generate_with_retries = AsyncMock()
+
+    events = await _collect(model_service.generate_stream("A windshield claim for $300 with photos attached."))
+
+    assert events[-1] == ("result", {"error": "Resource exhausted"})
+    model_service._generate_with_retries.assert_not_awaited()
+    model_service.caching_service.set_json.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_missing_context_cache_falls_back_to_regular_generation(model_service: ModelService):
+    # Arrange: the stream references a cached instruction that was evicted
+    cached_config = Mock()
+    model_service._get_instruction_config = AsyncMock(return_value=cached_config)
+    model_service._drop_context_cache = AsyncMock()
+    model_service.client.aio.models.generate_content_stream = AsyncMock(
+        side_effect=_ApiError(404, "CachedContent not found")
+    )
+    result = {"decision": "APPROVED", "reasoning": "ok", "confidence": 90, "riskScore": "LOW", "flags": []}
+    model_service._generate_with_retries = AsyncMock(return_value=result)
+
+    # Act
+    events = await _collect(model_service.generate_stream("A windshield claim for $300 with photos attached."))
+
+    # Assert
+    assert events[-1] == ("result", result)
+    model_service._drop_context_cache.assert_awaited_once()
+    model_service._generate_with_retries.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_prescreened_case_only_yields_result(model_service: ModelService):
+    model_service.client.aio.models.generate_content_stream = AsyncMock()
+
+    events = await _collect(model_service.generate_stream(""))
+
+    assert len(events) == 1
+    assert events[0][1]["decision"] == "REVIEW_REQUIRED"
+    model_service.client.aio.models.generate_content_stream.assert_not_awaited()
@@ -0,0 +1,117 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from app.service.model_service import ModelService
+
+
+@pytest.fixture
+def model_service():
+    svc = ModelService()
+    svc.max_prompt_tokens = 50
+    svc.chunk_tokens = 25
+    svc.summary_concurrency = 2
+    svc.chunk_summary_cache_ttl = 60
+    svc.caching_service = AsyncMock()
+    svc.caching_service.get_str = AsyncMock(return_value=None)
+    svc.limiter = Mock()
+    svc.limiter.run = _run_directly
+    return svc
+
+
+async def _run_directly(call):
+    return await call()
+
+
+def _text_response(text):
+    response = Mock()
+    response.text = text
+    return response
+
+
+@pytest.mark.asyncio
+async def test_small_packets_skip_map_reduce(model_service: ModelService):
+    model_service._reduce_details = AsyncMock()
+    model_service.client = Mock()
+    model_service.client.aio.models.generate_content = AsyncMock(
+        return_value=_text_response('{"decision": "APPROVED", "reasoning": "ok", "confidence": 90, "riskScore": "LOW", "flags": []}')
+    )
+
+    await model_service._generate("short claim")
+
+    model_service._reduce_details.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_oversized_packet_is_summarized_per_chunk_and_cached(model_service: ModelService):
+    # Arrange: 3 documents of ~20 tokens each, 2 per chunk would exceed the chunk budget
+    details = "\n\n".join(["a" * 80, "b" * 80, "c" * 80])
+    model_service.client = Mock()
+    model_service.client.aio.models.generate_content = AsyncMock(return_value=_text_response("summary"))
+
+    # Act
+    reduced = await model_service._reduce_details(details)
+
+    # Assert
+    assert model_service.client.aio.models.generate_content.await_count == 3
+    assert reduced.count("summary") == 3
+    assert "[Summary of claim packet part 1 of 3]" in reduced
+    assert model_service.caching_service.set_str.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_cached_chunk_summaries_are_reused(model_service: ModelService):
+    model_service.caching_service.get_str = AsyncMock(return_value="cached summary")
+    model_service.client = Mock()
+    model_service.client.aio.models.generate_content = AsyncMock()
+
+    reduced = await model_service._reduce_details("a" * 80 + "\n\n" + "b" * 80)
+
+    assert reduced.count("cached summary") == 2
+    model_service.client.aio.models.generate_content.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_failed_chunk_summary_returns_error(model_service: ModelService):
+    model_service.client = Mock()
+    model_service.client.aio.models.generate_content = AsyncMock(side_effect=RuntimeError("boom"))
+
+    result = await model_service._generate("a" * 400)
+
+    assert result == {"error": "Failed to summarize oversized claim packet"}
+
+
+@pytest.mark.asyncio
+async def test_repairable_output_is_not_regenerated(model_service: ModelService):
+    model_service.client = Mock()
+    model_service.client.aio.models.generate_content = AsyncMock(return_value=_text_response(
+        '```json\n{"decision": "approved", "reasoning": "ok", "confidence": 90, "riskScore": "LOW", "flags": [],}\n```'
+    ))
+
+    result = await model_service._generate("short claim")
+
+    assert result["decision"] == "APPROVED"
+    model_service.client.aio.models.generate_content.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_chunks_of_extracted_documents_keep_documents_whole(model_service: ModelService, mocker):
+    # Arrange: two uploaded PDFs of two pages each (~80 chars per document, chunks hold ~100)
+    def reader(*pages):
+        return Mock(pages=[Mock(extract_text=Mock(return_value=page)) for page in pages])
+    mocker.patch("app.service.s3_service.PdfReader", side_effect=[
+        reader("ALPHA invoice page one lists the repairs", "ALPHA invoice page two ends with total"),
+        reader("OMEGA report page one names the driver", "OMEGA report page two has the witness"),
+    ])
+    details, failed = await model_service.extract_details([{"content": b"pdf-1"}, {"content": b"pdf-2"}], "")
+    model_service.client = Mock()
+    model_service.client.aio.models.generate_content = AsyncMock(return_value=_text_response("summary"))
+
+    # Act
+    await model_service._reduce_details(details)
+
+    # Assert: one chunk per document, and no word runs into the next document
+    prompts = [c.kwargs["contents"] for c in model_service.client.aio.models.generate_content.await_args_list]
+    assert failed is False
+    assert len(prompts) == 2
+    assert sum("ALPHA invoice page one" in p and "ends with total" in p and "OMEGA" not in p for p in prompts) == 1
+    assert sum("OMEGA report page one" in p and "has the witness" in p and "ALPHA" not in p for p in prompts) == 1
+    assert "totalOMEGA" not in details
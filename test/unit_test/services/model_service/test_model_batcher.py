@@ -0,0 +1,99 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, Mock
+from app.service.model_service import ModelService
+from app.service.model_batcher import ModelRequestBatcher
+from app.utils.call_recorder import current_recorder, record_model_calls
+
+
+def _result(decision):
+    return {"decision": decision, "reasoning": "r", "confidence": 80, "riskScore": "LOW", "flags": []}
+
+
+@pytest.fixture
+def model_service():
+    svc = ModelService()
+    svc.response_cache_ttl = 60
+    svc.caching_service = AsyncMock()
+    svc.caching_service.get_json = AsyncMock(return_value=None)
+    svc.limiter = Mock()
+    svc.limiter.run = _run_directly
+    svc.client = Mock()
+    return svc
+
+
+async def _run_directly(call):
+    return await call()
+
+
+@pytest.mark.asyncio
+async def test_generate_batch_demultiplexes_and_falls_back_per_case(model_service: ModelService):
+    # Arrange: the packed answer is valid for CASE_1 only
+    packed = Mock()
+    packed.text = json.dumps({"CASE_1": _result("APPROVED"), "CASE_2": {"decision": "REJECTED"}})
+    model_service.client.aio.models.generate_content = AsyncMock(return_value=packed)
+    model_service.generate_from_details = AsyncMock(return_value=_result("REJECTED"))
+
+    # Act
+    results = await model_service.generate_batch(["claim one", "claim two"])
+
+    # Assert
+    assert [r["decision"] for r in results] == ["APPROVED", "REJECTED"]
+    model_service.client.aio.models.generate_content.assert_awaited_once()
+    model_service.generate_from_details.assert_awaited_once_with("claim two")
+
+
+@pytest.mark.asyncio
+async def test_generate_batch_skips_cached_cases(model_service: ModelService):
+    model_service.caching_service.get_json = AsyncMock(return_value=_result("APPROVED"))
+    model_service.client.aio.models.generate_content = AsyncMock()
+    model_service.generate_from_details = AsyncMock()
+
+    results = await model_service.generate_batch(["claim one", "claim two"])
+
+    assert [r["decision"] for r in results] == ["APPROVED", "APPROVED"]
+    model_service.client.aio.models.generate_content.assert_not_awaited()
+    model_service.generate_from_details.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_batcher_packs_concurrent_small_cases():
+    # Arrange
+    model_service = Mock()
+    model_service.generate_batch = AsyncMock(side_effect=lambda items: [f"result:{d}" for d in items])
+    model_service.generate_from_details = AsyncMock(return_value="alone")
+    batcher = ModelRequestBatcher(model_service, max_cases=2, max_size=1000, case_max_size=10, linger_seconds=0.01)
+
+    # Act
+    results = await asyncio.gather(
+        batcher.submit("a"), batcher.submit("b"), batcher.submit("c"), batcher.submit("x" * 100)
+    )
+
+    # Assert: a+b fill one pack, c goes after the linger window, the oversized claim alone
+    assert results == ["result:a", "result:b", "result:c", "alone"]
+    assert [c.args[0] for c in model_service.generate_batch.await_args_list] == [["a", "b"], ["c"]]
+    model_service.generate_from_details.assert_awaited_once_with("x" * 100)
+
+
+@pytest.mark.asyncio
+async def test_packed_call_is_recorded_for_every_member():
+    # Arrange
+    async def generate_batch(items):
+        current_recorder().add({"kind": "batch", "model": "m", "attempt": 1})
+        return [f"result:{d}" for d in items]
+
+    model_service = Mock()
+    model_service.generate_batch = AsyncMock(side_effect=generate_batch)
+    batcher = ModelRequestBatcher(model_service, max_cases=2, max_size=1000, case_max_size=10, linger_seconds=0.01)
+
+    async def submit(case_id, details):
+        with record_model_calls(case_id=case_id) as recorder:
+            await batcher.submit(details)
+        return recorder
+
+    # Act
+    recorders = await asyncio.gather(submit("C1", "a"), submit("C2", "b"))
+
+    # Assert
+    assert [r.calls for r in recorders] == [[{"kind": "batch", "model": "m", "attempt": 1, "shared_by": 2}]] * 2
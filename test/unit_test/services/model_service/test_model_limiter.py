@@ -0,0 +1,122 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+from app.service.model_limiter import ModelCallLimiter
+from app.service.rate_limiter import ClusterRateLimiter
+from app.utils.metrics import metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+@pytest.mark.asyncio
+async def test_limiter_caps_in_flight_calls():
+    limiter = ModelCallLimiter(max_in_flight=2, timeout_seconds=5)
+    running, peak = 0, 0
+
+    async def call():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "ok"
+
+    results = await asyncio.gather(*[limiter.run(call) for _ in range(6)])
+
+    assert results == ["ok"] * 6
+    assert peak == 2
+    assert metrics.get("model_limiter_wait_seconds")["count"] == 6
+    assert metrics.get("model_limiter_in_flight") == 0
+    assert metrics.get("model_limiter_waiting") == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_times_out_and_frees_slot():
+    limiter = ModelCallLimiter(max_in_flight=1, timeout_seconds=0.01)
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    async def fast():
+        return "ok"
+
+    with pytest.raises(asyncio.TimeoutError):
+        await limiter.run(slow)
+
+    assert await limiter.run(fast) == "ok"
+    assert metrics.get("model_limiter_timeouts_total") == 1
+
+
+class _Overloaded(Exception):
+    code = 429
+
+
+@pytest.mark.asyncio
+async def test_limiter_shrinks_concurrency_on_429_and_reports_to_cluster():
+    # Arrange
+    rate_limiter = AsyncMock()
+    limiter = ModelCallLimiter(max_in_flight=4, timeout_seconds=5, rate_limiter=rate_limiter)
+
+    async def overloaded():
+        raise _Overloaded("429 RESOURCE_EXHAUSTED")
+
+    async def ok():
+        return "ok"
+
+    # Act
+    with pytest.raises(_Overloaded):
+        await limiter.run(overloaded)
+    await limiter.run(ok)
+
+    # Assert
+    assert limiter.limit == 2
+    assert metrics.get("model_limiter_concurrency_limit") == limiter.limit
+    assert rate_limiter.acquire.await_count == 2
+    rate_limiter.on_overload.assert_awaited_once()
+    rate_limiter.on_success.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_limiter_reports_slow_calls_to_cluster_as_overload():
+    # Arrange: a 5s latency target
+    rate_limiter = AsyncMock()
+    limiter = ModelCallLimiter(max_in_flight=4, timeout_seconds=60, rate_limiter=rate_limiter, latency_target_seconds=5)
+
+    # Act: one slow and one fast successful call
+    await limiter._on_success(10.0)
+    await limiter._on_success(1.0)
+
+    # Assert
+    rate_limiter.on_overload.assert_awaited_once()
+    rate_limiter.on_success.assert_awaited_once()
+    assert limiter.limit < 4
+
+
+@pytest.mark.asyncio
+async def test_cluster_rate_limiter_waits_for_tokens(mocker):
+    # Arrange: the shared bucket is empty once, then hands out a token
+    rate_limiter = ClusterRateLimiter(name="test", max_rps=5, min_rps=1, burst=1)
+    rate_limiter._acquire_script = Mock(side_effect=[[20, "2.5"], [0, "2.5"]])
+    sleep = mocker.patch("app.service.rate_limiter.asyncio.sleep", AsyncMock())
+
+    # Act
+    await rate_limiter.acquire()
+
+    # Assert
+    sleep.assert_awaited_once_with(0.02)
+    assert metrics.get("model_rate_limit_permitted_rps") == 2.5
+
+
+@pytest.mark.asyncio
+async def test_cluster_rate_limiter_fails_open():
+    rate_limiter = ClusterRateLimiter(name="test", max_rps=5, min_rps=1, burst=1)
+    rate_limiter._acquire_script = Mock(side_effect=ConnectionError("redis down"))
+
+    await rate_limiter.acquire()
+
+    assert metrics.get("model_rate_limiter_errors_total") == 1
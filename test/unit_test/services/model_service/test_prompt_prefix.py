@@ -0,0 +1,147 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from app.service import model_service as model_service_module
+from app.service.model_service import ModelService
+from app.config.settings import SYSTEM_INSTRUCTION
+
+
+@pytest.fixture
+def model_service(mocker):
+    # pretend the instruction is large enough to cache
+    mocker.patch.object(model_service_module, "_INSTRUCTION_TOKENS", 10 ** 6)
+    svc = ModelService()
+    svc.context_cache_enabled = True
+    svc.context_cache_ttl = 3600
+    svc.caching_service = AsyncMock()
+    svc.caching_service.get_str = AsyncMock(return_value=None)
+    svc.client = Mock()
+    cached_content = Mock()
+    cached_content.name = "cachedContents/abc"
+    svc.client.aio.caches.create = AsyncMock(return_value=cached_content)
+    return svc
+
+
+@pytest.mark.asyncio
+async def test_instruction_is_uploaded_once_and_reused(model_service: ModelService):
+    # Act
+    first = await model_service._get_instruction_config()
+    second = await model_service._get_instruction_config()
+
+    # Assert
+    assert first.cached_content == "cachedContents/abc"
+    assert second is first
+    model_service.client.aio.caches.create.assert_awaited_once()
+    model_service.caching_service.set_str.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_shared_cache_name_from_redis_skips_creation(model_service: ModelService):
+    model_service.caching_service.get_str = AsyncMock(return_value="cachedContents/shared")
+    model_service.caching_service.ttl = AsyncMock(return_value=1200)
+
+    config = await model_service._get_instruction_config()
+
+    assert config.cached_content == "cachedContents/shared"
+    model_service.client.aio.caches.create.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_cache_creation_failure_sends_instruction_inline(model_service: ModelService):
+    model_service.client.aio.caches.create = AsyncMock(side_effect=RuntimeError("too few tokens"))
+
+    first = await model_service._get_instruction_config()
+    await model_service._get_instruction_config()
+
+    assert first is model_service_module._INLINE_INSTRUCTION_CONFIG
+    assert first.system_instruction == SYSTEM_INSTRUCTION
+    # no new attempt until the retry window passes
+    model_service.client.aio.caches.create.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_creation_failure_is_shared_with_other_workers(model_service: ModelService):
+    # Arrange: the first instance fails to create the cache
+    model_service.client.aio.caches.create = AsyncMock(side_effect=RuntimeError("too few tokens"))
+    await model_service._get_instruction_config()
+    key, value = model_service.caching_service.set_str.await_args.args
+    assert key.startswith("model:context_cache_unavailable:")
+    other = ModelService()
+    other.context_cache_enabled = True
+    other.caching_service = AsyncMock()
+    other.caching_service.get_str = AsyncMock(return_value=None)
+    other.caching_service.ttl = AsyncMock(return_value=250)
+    other.client = Mock()
+    other.client.aio.caches.create = AsyncMock()
+
+    # Act
+    config = await other._get_instruction_config()
+
+    # Assert
+    assert config is model_service_module._INLINE_INSTRUCTION_CONFIG
+    other.client.aio.caches.create.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_instruction_below_the_minimum_size_is_never_cached(model_service: ModelService, mocker):
+    mocker.patch.object(model_service_module, "_INSTRUCTION_TOKENS", 700)
+
+    config = await model_service._get_instruction_config("gemini-2.5-flash")
+
+    assert config is model_service_module._INLINE_INSTRUCTION_CONFIG
+    model_service.client.aio.caches.create.assert_not_awaited()
+    model_service.caching_service.get_str.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_claim_call_sends_only_the_dynamic_section(model_service: ModelService):
+    # Arrange
+    model_service.limiter = Mock()
+    model_service.limiter.run = _run_directly
+    response = Mock()
+    response.text = '{"decision": "APPROVED", "reasoning": "ok", "confidence": 90, "riskScore": "LOW", "flags": []}'
+    model_service.client.aio.models.generate_content = AsyncMock(return_value=response)
+
+    # Act
+    await model_service._generate("claim for $500")
+
+    # Assert
+    kwargs = model_service.client.aio.models.generate_content.await_args.kwargs
+    assert "claim for $500" in kwargs["contents"]
+    assert "ANALYSIS REQUIREMENTS" not in kwargs["contents"]
+    assert kwargs["config"].cached_content == "cachedContents/abc"
+
+
+async def _run_directly(call):
+    return await call()
+
+
+class _ApiError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("error, falls_back", [
+    (_ApiError(404, "CachedContent not found (or permission denied)"), True),
+    (_ApiError(429, "Resource exhausted"), False),
+    (_ApiError(503, "Service unavailable"), False),
+])
+async def test_only_a_missing_cache_falls_back_to_inline(model_service: ModelService, error, falls_back):
+    # Arrange
+    model_service.limiter = Mock()
+    model_service.limiter.run = _run_directly
+    model_service._drop_context_cache = AsyncMock()
+    response = Mock()
+    model_service.client.aio.models.generate_content = AsyncMock(side_effect=[error, response])
+
+    # Act
+    if falls_back:
+        assert await model_service._generate_claim("claim", model_service.model) is response
+    else:
+        with pytest.raises(_ApiError):
+            await model_service._generate_claim("claim", model_service.model)
+
+    # Assert
+    assert model_service._drop_context_cache.await_count == int(falls_back)
+    assert model_service.client.aio.models.generate_content.await_count == 1 + int(falls_back)
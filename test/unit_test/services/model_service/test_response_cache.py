@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from app.service.model_service import ModelService
+
+
+@pytest.fixture
+def model_service():
+    svc = ModelService()
+    svc.response_cache_ttl = 60
+    svc.caching_service = AsyncMock()
+    svc.caching_service.get_json = AsyncMock(return_value=None)
+    return svc
+
+
+def test_fingerprint_ignores_whitespace_but_not_content(model_service: ModelService):
+    a = model_service.prompt_fingerprint("claim  for\n$500 ")
+    b = model_service.prompt_fingerprint("claim for $500")
+    c = model_service.prompt_fingerprint("claim for $600")
+    assert a == b
+    assert a != c
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_skips_model(model_service: ModelService):
+    model_service.caching_service.get_json = AsyncMock(return_value={"decision": "APPROVED"})
+    model_service._generate = AsyncMock()
+
+    result = await model_service.generate_from_details("details")
+
+    assert result == {"decision": "APPROVED"}
+    model_service._generate.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_miss_generates_and_caches_valid_result(model_service: ModelService):
+    model_service._generate = AsyncMock(return_value={"decision": "APPROVED"})
+
+    await model_service.generate_from_details("details")
+
+    key = f"model:response:{model_service.prompt_fingerprint('details')}"
+    model_service.caching_service.set_json.assert_awaited_once_with(key, {"decision": "APPROVED"}, ttl_seconds=60)
+
+
+@pytest.mark.asyncio
+async def test_error_results_are_not_cached(model_service: ModelService):
+    model_service._generate = AsyncMock(return_value={"error": "Invalid Gemini response"})
+
+    await model_service.generate_from_details("details")
+
+    model_service.caching_service.set_json.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_identical_prompts_in_flight_share_one_call(model_service: ModelService):
+    release = asyncio.Event()
+    calls = 0
+
+    async def slow_generate(details):
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"decision": "REJECTED"}
+
+    model_service._generate = slow_generate
+    tasks = [asyncio.create_task(model_service.generate_from_details("same details")) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert calls == 1
+    assert results == [{"decision": "REJECTED"}] * 3
@@ -0,0 +1,64 @@
+import pytest
+from unittest.mock import AsyncMock
+from app.service.model_service import ModelService
+from app.utils.metrics import metrics
+
+
+def _result(confidence):
+    return {"decision": "APPROVED", "reasoning": "r", "confidence": confidence, "riskScore": "LOW", "flags": []}
+
+
+@pytest.fixture
+def model_service():
+    metrics.reset()
+    svc = ModelService()
+    svc.model = "strong-model"
+    svc.fast_model = "fast-model"
+    svc.routing_max_tokens = 100
+    svc.routing_max_lines = 5
+    svc.escalation_confidence = 75
+    svc.max_prompt_tokens = 10000
+    yield svc
+    metrics.reset()
+
+
+@pytest.mark.asyncio
+async def test_confident_fast_tier_result_is_kept(model_service: ModelService):
+    model_service._generate_with_retries = AsyncMock(return_value=_result(90))
+
+    result = await model_service._generate("short claim")
+
+    assert result["confidence"] == 90
+    model_service._generate_with_retries.assert_awaited_once()
+    assert model_service._generate_with_retries.await_args.args[1:] == ("fast-model", 0)
+    assert metrics.get("model_tier_latency_seconds", tier="fast")["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_low_confidence_escalates_to_default_model(model_service: ModelService):
+    model_service._generate_with_retries = AsyncMock(side_effect=[_result(60), _result(85)])
+
+    result = await model_service._generate("short claim")
+
+    assert result["confidence"] == 85
+    assert [c.args[1] for c in model_service._generate_with_retries.await_args_list] == ["fast-model", "strong-model"]
+    assert metrics.get("model_escalations_total", reason="low_confidence") == 1
+
+
+@pytest.mark.asyncio
+async def test_invalid_fast_output_escalates(model_service: ModelService):
+    model_service._generate_with_retries = AsyncMock(side_effect=[{"error": "Invalid Gemini response"}, _result(85)])
+
+    await model_service._generate("short claim")
+
+    assert metrics.get("model_escalations_total", reason="invalid") == 1
+
+
+@pytest.mark.asyncio
+async def test_large_cases_go_straight_to_default_model(model_service: ModelService):
+    model_service._generate_with_retries = AsyncMock(return_value=_result(60))
+
+    await model_service._generate("line\n" * 10)
+
+    assert model_service._generate_with_retries.await_args.args[1:] == ("strong-model", 2)
+    assert metrics.get("model_routing_total", tier="default") == 1
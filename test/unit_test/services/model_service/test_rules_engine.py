@@ -0,0 +1,93 @@
+import json
+import os
+import pytest
+from unittest.mock import AsyncMock
+from app.service.model_service import ModelService
+from app.service.rules_engine import RulesEngine
+
+
+@pytest.fixture
+def rules_file(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({
+        "min_detail_chars": 10,
+        "rules": [
+            {"id": "stolen_vehicle", "pattern": "(?i)stolen vehicle", "decision": "REVIEW_REQUIRED",
+             "riskScore": "HIGH", "confidence": 70, "flags": ["FRAUD_INDICATORS"], "reasoning": "Stolen vehicle claims need review."},
+            {"id": "VIP", "tenants": ["T1"], "pattern": "policy", "decision": "APPROVED",
+             "riskScore": "LOW", "confidence": 90, "flags": [], "reasoning": "Tenant T1 policy."},
+        ]
+    }))
+    return path
+
+
+def test_empty_and_near_empty_details_short_circuit(rules_file):
+    engine = RulesEngine(str(rules_file), reload_interval_seconds=0)
+
+    assert engine.evaluate("   ")["flags"] == ["MANUAL_REVIEW_REQUIRED", "RULE_EMPTY_DETAILS"]
+    assert engine.evaluate("n/a ...")["flags"][-1] == "RULE_NEAR_EMPTY_DETAILS"
+    assert engine.evaluate("policy text", extraction_failed=True)["flags"][-1] == "RULE_EXTRACTION_FAILED"
+    assert engine.evaluate("A routine windshield claim for $300 with photos attached.") is None
+
+
+def test_failed_extraction_with_a_full_narrative_is_left_to_the_model(rules_file):
+    engine = RulesEngine(str(rules_file), reload_interval_seconds=0)
+    narrative = "Rear-ended at a red light on Main Street, bumper and trunk damaged, repair estimate of $2,400."
+
+    assert engine.evaluate(narrative, extraction_failed=True) is None
+
+
+def test_configured_rules_respect_tenants(rules_file):
+    engine = RulesEngine(str(rules_file), reload_interval_seconds=0)
+    details = "Claim under policy 123 for a stolen vehicle reported yesterday."
+
+    assert engine.evaluate(details)["flags"] == ["FRAUD_INDICATORS", "RULE_STOLEN_VEHICLE"]
+    assert engine.evaluate(details, tenant_id="T1")["flags"] == ["RULE_VIP"]
+
+
+def test_rules_are_hot_reloaded_on_change(rules_file):
+    engine = RulesEngine(str(rules_file), reload_interval_seconds=0)
+    details = "Water damage in the basement after heavy rain, estimate attached."
+    assert engine.evaluate(details) is None
+
+    rules_file.write_text(json.dumps({"rules": [{"id": "WATER", "pattern": "(?i)water damage"}]}))
+    os.utime(rules_file, (1, 1))
+
+    assert engine.evaluate(details)["flags"][-1] == "RULE_WATER"
+
+
+def test_invalid_rules_file_keeps_previous_rules(rules_file):
+    engine = RulesEngine(str(rules_file), reload_interval_seconds=0)
+    engine.evaluate("warm up")
+
+    rules_file.write_text("{not json")
+    os.utime(rules_file, (2, 2))
+
+    assert engine.evaluate("A stolen vehicle was reported.")["flags"][-1] == "RULE_STOLEN_VEHICLE"
+
+
+@pytest.mark.asyncio
+async def test_prescreen_match_skips_the_model(rules_file):
+    svc = ModelService()
+    svc.rules_engine = RulesEngine(str(rules_file), reload_interval_seconds=0)
+    svc.generate_from_details = AsyncMock()
+
+    result = await svc.generate_response_v2(file_contents=[], manual_input="")
+
+    assert result["decision"] == "REVIEW_REQUIRED"
+    svc.generate_from_details.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_failed_extraction_reaches_the_model_as_a_note(rules_file):
+    svc = ModelService()
+    svc.rules_engine = RulesEngine(str(rules_file), reload_interval_seconds=0)
+    svc.generate_from_details = AsyncMock(return_value={"decision": "APPROVED"})
+    narrative = "Rear-ended at a red light on Main Street, bumper and trunk damaged, repair estimate of $2,400."
+
+    result = await svc.generate_response_v2(file_contents=[], manual_input=narrative, extraction_failed=True)
+
+    assert result == {"decision": "APPROVED"}
+    details = svc.generate_from_details.await_args.args[0]
+    assert details.startswith(narrative)
+    assert "text could not be extracted" in details
@@ -21,7 +21,8 @@ async def test_extract_text_success(file_service: FileService):
         
         result = await file_service.extract_text(file_contents)
         
-        assert result == "Page 1 text Page 2 textPage 1 text Page 2 text"
+        # pages and documents stay separated by blank lines
+        assert result == "Page 1 text \n\nPage 2 text\n\nPage 1 text \n\nPage 2 text"
 
 @pytest.mark.asyncio
 async def test_extract_text_empty_page(file_service: FileService):
@@ -82,4 +82,20 @@ async def test_generate_file_s3_key_no_extension(file_service: FileService):
 @pytest.mark.asyncio
 async def test_generate_file_s3_key_empty_filename(file_service: FileService):
     result = await file_service._generate_file_s3_key("case123", "", "20240101T120000")
-    assert result == "upload_20240101T120000"
\ No newline at end of file
+    assert result == "upload_20240101T120000"
+
+@pytest.mark.asyncio
+async def test_get_etags_heads_only_the_given_keys(file_service: FileService, mocker):
+    def head_object(Bucket, Key):
+        if Key == "case1/missing.pdf":
+            raise Exception("404")
+        return {"ETag": f'"{Key}-etag"'}
+
+    mocker.patch.object(file_service, "s3_client")
+    file_service.s3_client.head_object.side_effect = head_object
+
+    result = await file_service.get_etags(["case1/a.pdf", "case1/missing.pdf", "case1/a.pdf", ""])
+
+    assert result == {"case1/a.pdf": "case1/a.pdf-etag"}
+    assert file_service.s3_client.head_object.call_count == 2
+    file_service.s3_client.get_paginator.assert_not_called()
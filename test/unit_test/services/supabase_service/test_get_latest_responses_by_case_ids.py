@@ -0,0 +1,25 @@
+import pytest
+from unittest.mock import MagicMock
+from app.service.supabase_service import SupabaseService
+
+
+@pytest.mark.asyncio
+async def test_latest_response_is_limited_per_case():
+    # Arrange
+    sp_service = SupabaseService()
+    sp_service.sp_client = MagicMock()
+    query = sp_service.sp_client.table.return_value.select.return_value.in_.return_value
+    query = query.eq.return_value.not_.is_.return_value.order.return_value.limit.return_value
+    query.execute.return_value.data = [
+        {"id": "C1", "response": [{"id": "R2", "case_id": "C1", "input_fingerprint": "fp"}]},
+        {"id": "C2", "response": []},
+    ]
+
+    # Act
+    latest = await sp_service.get_latest_responses_by_case_ids(["C1", "C2"])
+
+    # Assert
+    assert latest == {"C1": {"id": "R2", "case_id": "C1", "input_fingerprint": "fp"}}
+    sp_service.sp_client.table.assert_called_once_with("case")
+    chain = sp_service.sp_client.table.return_value.select.return_value.in_.return_value.eq.return_value.not_.is_.return_value
+    chain.order.return_value.limit.assert_called_once_with(1, foreign_table="response")
@@ -0,0 +1,43 @@
+import pytest
+from unittest.mock import AsyncMock
+from app.service.supabase_service import SupabaseService
+
+
+@pytest.fixture
+def sp_service():
+    return SupabaseService()
+
+
+@pytest.mark.asyncio
+async def test_stream_all_follows_keyset_pages(sp_service: SupabaseService):
+    sp_service.get_page = AsyncMock(side_effect=[
+        ([{"id": "a"}, {"id": "b"}], True),
+        ([{"id": "c"}], False),
+    ])
+
+    rows = [row async for row in sp_service.stream_all("case", "id", page_size=2)]
+
+    assert rows == [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    assert sp_service.get_page.await_count == 2
+    assert sp_service.get_page.await_args_list[1].kwargs["after_id"] == "b"
+
+
+@pytest.mark.asyncio
+async def test_stream_all_raises_when_a_page_fails(sp_service: SupabaseService):
+    sp_service.get_page = AsyncMock(side_effect=[([{"id": "a"}], True), (None, False)])
+    rows = []
+
+    with pytest.raises(RuntimeError):
+        async for row in sp_service.stream_all("case", "id"):
+            rows.append(row)
+
+    assert rows == [{"id": "a"}]
+
+
+@pytest.mark.asyncio
+async def test_stream_all_ends_on_empty_table(sp_service: SupabaseService):
+    sp_service.get_page = AsyncMock(return_value=([], False))
+
+    rows = [row async for row in sp_service.stream_all("case", "id")]
+
+    assert rows == []
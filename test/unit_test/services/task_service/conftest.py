@@ -0,0 +1,88 @@
+import json
+import pytest
+from app.service import task_registry
+from app.service.task_registry import TaskRegistry
+
+
+class _FakeRedis():
+    """Just enough of the redis client for the task registry: hashes, TTLs, pipelines and its update script (which publishes)."""
+    def __init__(self):
+        self.hashes = {}
+        self.lists = {}
+        self.ttls = {}
+        self.published = []
+        self.now = 1700000000
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def lrange(self, key, start, end):
+        return self.lists.get(key, [])[start:end + 1]
+
+    def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    def expire(self, key, seconds):
+        self.ttls[key] = int(seconds)
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    def register_script(self, source):
+        def update(keys, args, client=None):
+            if client is not None:
+                client.calls.append(lambda: update(keys, args))
+                return client
+            state = self.hashes.get(keys[0], {}).get("state")
+            if state is None or state in ("SUCCESS", "FAILURE", "DEFERRED"):
+                return 0
+            task = self.hashes[keys[0]]
+            task.update(dict(zip(args[3::2], args[4::2])))
+            self.expire(keys[0], args[0])
+            self.published.append((keys[1], json.loads(args[1])))
+
+            new_state = args[2]
+            if task.get("job_id") and new_state and new_state != state:
+                counters = {"PENDING": "pending", "RUNNING": "running", "SUCCESS": "succeeded", "FAILURE": "failed", "DEFERRED": "deferred"}
+                job = self.hashes[f"job:{task['job_id']}"]
+                job[counters[state]] = int(job[counters[state]]) - 1
+                job[counters[new_state]] = int(job[counters[new_state]]) + 1
+                if new_state == "RUNNING":
+                    job.setdefault("started_at", str(self.now))
+                elif new_state == "FAILURE":
+                    failure = {"task_id": task["id"], "case_id": task.get("case_id", ""), "error": task.get("error", "")}
+                    self.lists.setdefault(f"job:{task['job_id']}:failures", []).append(json.dumps(failure))
+                if int(job["succeeded"]) + int(job["failed"]) + int(job["deferred"]) >= int(job["total"]):
+                    job.setdefault("finished_at", str(self.now))
+                self.published.append((f"job:events:{task['job_id']}", json.loads(args[1])))
+            return 1
+        return update
+
+
+class _FakePipeline():
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        command = getattr(self.redis, name)
+        def queue(*args, **kwargs):
+            self.calls.append(lambda: command(*args, **kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        calls, self.calls = self.calls, []
+        return [call() for call in calls]
+
+
+@pytest.fixture(autouse=True)
+def fake_task_registry(mocker):
+    registry = TaskRegistry(ttl_seconds=3600)
+    registry.caching_service.redis = _FakeRedis()
+    registry._update_script = registry.caching_service.redis.register_script("")
+    mocker.patch.object(task_registry, "_REGISTRY", registry)
+    return registry
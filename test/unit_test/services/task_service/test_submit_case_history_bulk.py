@@ -0,0 +1,279 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from concurrent.futures.process import BrokenProcessPool
+from app.service import task_service
+from app.service.task_scheduler import FairScheduler
+
+
+@pytest.fixture
+def fake_case_service(mocker):
+    svc = Mock()
+    svc.sp_service.get_files_by_case_ids = AsyncMock(side_effect=lambda ids: {cid: [{"id": f"F-{cid}"}] for cid in ids})
+    svc.sp_service.get_files_by_case_id = AsyncMock(return_value=[])
+    svc.sp_service.get_latest_responses_by_case_ids = AsyncMock(return_value={})
+    svc.compute_input_fingerprint = AsyncMock(side_effect=lambda cid, files: f"FP-{cid}")
+    svc.get_unchanged_response = AsyncMock(return_value=None)
+    svc.fetch_history_inputs = AsyncMock(side_effect=lambda files: {"manual_input": "", "pdfs": [], "files": files})
+    svc.extract_history_inputs = AsyncMock(side_effect=lambda inputs, executor: (f"details:{inputs['files'][0]['id']}", False))
+    svc.analyze_history_details = AsyncMock(return_value={"decision": "APPROVED"})
+    svc.save_model_responses_bulk = AsyncMock(
+        side_effect=lambda items: [f"R-{item['case_id']}" for item in items]
+    )
+    mocker.patch.object(task_service, "CaseService", return_value=svc)
+    mocker.patch.object(task_service, "_extraction_executor", return_value=None)
+    return svc
+
+
+@pytest.mark.asyncio
+async def test_bulk_history_batches_db_calls(fake_case_service, mocker):
+    mocker.patch.object(task_service, "_BULK_FETCH_CHUNK", 2)
+    mocker.patch.object(task_service, "_BULK_FLUSH_SIZE", 2)
+    case_ids = ["C1", "C2", "C3"]
+
+    accepted = task_service.submit_case_history_bulk(case_ids)["accepted"]
+    for _ in range(50):
+        await asyncio.sleep(0)
+
+    statuses = task_service.get_tasks_status([a["task_id"] for a in accepted])
+    assert [s["state"] for s in statuses] == ["SUCCESS"] * 3
+    # 3 cases -> 2 listing queries (chunks of 2) and 2 flushes (2 + 1)
+    assert fake_case_service.sp_service.get_files_by_case_ids.await_count == 2
+    assert fake_case_service.save_model_responses_bulk.await_count == 2
+    fake_case_service.sp_service.get_files_by_case_id.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_bulk_history_marks_unsaved_cases_failed(fake_case_service):
+    fake_case_service.save_model_responses_bulk = AsyncMock(
+        side_effect=lambda items: ["R1" if item["case_id"] == "C1" else None for item in items]
+    )
+
+    accepted = task_service.submit_case_history_bulk(["C1", "C2"])["accepted"]
+    for _ in range(50):
+        await asyncio.sleep(0)
+
+    states = {a["case_id"]: task_service.get_task_status(a["task_id"])["state"] for a in accepted}
+    assert states == {"C1": "SUCCESS", "C2": "FAILURE"}
+
+
+@pytest.mark.asyncio
+async def test_bulk_history_skips_unchanged_cases(fake_case_service):
+    # Arrange: C1 already has a response for the same input files
+    fake_case_service.sp_service.get_latest_responses_by_case_ids = AsyncMock(
+        return_value={"C1": {"id": "R1", "input_fingerprint": "FP-C1"}}
+    )
+    fake_case_service.get_unchanged_response = AsyncMock(
+        side_effect=lambda latest, fp: {"decision": "APPROVED"} if latest and latest["input_fingerprint"] == fp else None
+    )
+
+    # Act
+    accepted = task_service.submit_case_history_bulk(["C1", "C2"])["accepted"]
+    for _ in range(50):
+        await asyncio.sleep(0)
+
+    # Assert: only C2 reaches the model and the writer
+    results = {a["case_id"]: task_service.get_task_status(a["task_id"]) for a in accepted}
+    assert results["C1"]["state"] == "SUCCESS"
+    assert results["C1"]["result"]["unchanged"] is True
+    assert results["C2"]["state"] == "SUCCESS"
+    fake_case_service.analyze_history_details.assert_awaited_once_with([{"id": "F-C2"}], "details:F-C2", False)
+    saved_items = fake_case_service.save_model_responses_bulk.await_args.args[0]
+    assert [(i["case_id"], i["input_fingerprint"]) for i in saved_items] == [("C2", "FP-C2")]
+
+
+@pytest.mark.asyncio
+async def test_bulk_history_force_skips_change_detection_lookup(fake_case_service):
+    # Act
+    accepted = task_service.submit_case_history_bulk(["C1"], force=True)["accepted"]
+    for _ in range(50):
+        await asyncio.sleep(0)
+
+    # Assert
+    assert task_service.get_task_status(accepted[0]["task_id"])["state"] == "SUCCESS"
+    fake_case_service.sp_service.get_latest_responses_by_case_ids.assert_not_awaited()
+    fake_case_service.analyze_history_details.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_bulk_history_routes_model_calls_through_batcher(fake_case_service, mocker):
+    # Arrange
+    batcher = Mock()
+    batcher.submit = AsyncMock(return_value={"decision": "APPROVED"})
+    mocker.patch.object(task_service, "create_model_batcher", return_value=batcher)
+    fake_case_service.history_tenant_id = Mock(return_value=None)
+    fake_case_service.model_service.prescreen = Mock(return_value=None)
+
+    # Act
+    accepted = task_service.submit_case_history_bulk(["C1", "C2"])["accepted"]
+    for _ in range(50):
+        await asyncio.sleep(0)
+
+    # Assert
+    assert [task_service.get_task_status(a["task_id"])["state"] for a in accepted] == ["SUCCESS"] * 2
+    assert sorted(c.args[0] for c in batcher.submit.await_args_list) == ["details:F-C1", "details:F-C2"]
+    fake_case_service.analyze_history_details.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_batcher_waits_do_not_hold_scheduler_slots(fake_case_service, mocker):
+    # Arrange: one slot, and the batcher only answers once both cases are waiting on it
+    mocker.patch.object(task_service, "_SCHEDULER", FairScheduler(limit=1))
+    waiting = []
+    both_waiting = asyncio.Event()
+
+    async def submit(details):
+        waiting.append(details)
+        if len(waiting) == 2:
+            both_waiting.set()
+        await both_waiting.wait()
+        return {"decision": "APPROVED"}
+
+    batcher = Mock()
+    batcher.submit = submit
+    mocker.patch.object(task_service, "create_model_batcher", return_value=batcher)
+    fake_case_service.history_tenant_id = Mock(return_value=None)
+    fake_case_service.model_service.prescreen = Mock(return_value=None)
+
+    # Act
+    accepted = task_service.submit_case_history_bulk(["C1", "C2"])["accepted"]
+    for _ in range(50):
+        await asyncio.sleep(0)
+
+    # Assert: both could join one packed request
+    assert sorted(waiting) == ["details:F-C1", "details:F-C2"]
+    assert [task_service.get_task_status(a["task_id"])["state"] for a in accepted] == ["SUCCESS"] * 2
+
+
+@pytest.mark.asyncio
+async def test_bulk_job_aggregates_progress_and_failures(fake_case_service, fake_task_registry, mocker):
+    # Arrange
+    fake_case_service.save_model_responses_bulk = AsyncMock(
+        side_effect=lambda items: ["R1" if item["case_id"] == "C1" else None for item in items]
+    )
+    mocker.patch.object(task_service.time, "time", return_value=fake_task_registry.caching_service.redis.now + 60)
+
+    # Act
+    job = task_service.submit_case_history_bulk(["C1", "C2", "C3"])
+    queued = task_service.get_job_status(job["job_id"])
+    for _ in range(50):
+        await asyncio.sleep(0)
+    status = task_service.get_job_status(job["job_id"])
+    first_page = task_service.get_job_failures(job["job_id"], 0, 1)
+    second_page = task_service.get_job_failures(job["job_id"], 1, 1)
+
+    # Assert
+    assert (queued["state"], queued["pending"], queued["eta_seconds"]) == ("PENDING", 3, None)
+    assert status["state"] == "FINISHED"
+    assert (status["total"], status["pending"], status["running"], status["succeeded"], status["failed"]) == (3, 0, 0, 1, 2)
+    assert status["eta_seconds"] == 0.0
+    assert first_page["total"] == 2
+    assert [f["case_id"] for f in first_page["items"] + second_page["items"]] == ["C2", "C3"]
+    assert first_page["next_offset"] == 1
+    assert second_page["next_offset"] is None
+
+
+@pytest.mark.asyncio
+async def test_deferred_cases_are_not_counted_as_succeeded(fake_case_service):
+    # Arrange: the model circuit is open for C2
+    deferred = {"error": "Model unavailable, analysis deferred", "deferred": True, "retry_after_seconds": 30}
+    fake_case_service.analyze_history_details = AsyncMock(
+        side_effect=lambda files, details, failed: deferred if files[0]["id"] == "F-C2" else {"decision": "APPROVED"}
+    )
+    fake_case_service.defer_history_run = Mock(return_value="T-retry")
+
+    # Act
+    job = task_service.submit_case_history_bulk(["C1", "C2"])
+    for _ in range(50):
+        await asyncio.sleep(0)
+
+    # Assert
+    status = task_service.get_job_status(job["job_id"])
+    assert (status["state"], status["succeeded"], status["deferred"]) == ("FINISHED", 1, 1)
+    deferred_task = task_service.get_task_status(job["accepted"][1]["task_id"])
+    assert deferred_task["state"] == "DEFERRED"
+    assert deferred_task["result"]["deferred_task_id"] == "T-retry"
+
+
+def test_job_eta_from_observed_throughput():
+    job = {"total": 10, "pending": 5, "running": 1, "succeeded": 3, "failed": 1, "deferred": 0, "started_at": 1000.0}
+
+    with patch.object(task_service.time, "time", return_value=1120.0):
+        status = task_service._job_status("J1", job)
+
+    # 4 cases in 2 minutes -> 6 remaining take 3 more minutes
+    assert status["state"] == "RUNNING"
+    assert status["throughput_per_minute"] == 2.0
+    assert status["eta_seconds"] == 180.0
+
+
+@pytest.mark.asyncio
+async def test_bulk_history_repeated_case_gets_a_result_per_task(fake_case_service):
+    # Arrange: the second save of C1 fails, the first succeeds
+    fake_case_service.save_model_responses_bulk = AsyncMock(side_effect=lambda items: ["R1", None][:len(items)])
+
+    # Act
+    accepted = task_service.submit_case_history_bulk(["C1", "C1"])["accepted"]
+    for _ in range(50):
+        await asyncio.sleep(0)
+
+    # Assert
+    states = sorted(task_service.get_task_status(a["task_id"])["state"] for a in accepted)
+    assert states == ["FAILURE", "SUCCESS"]
+
+
+@pytest.mark.asyncio
+async def test_extract_replaces_a_broken_process_pool(fake_case_service, mocker):
+    # Arrange: the first pool lost a child, the replacement works
+    broken, fresh = Mock(), Mock()
+    mocker.patch.object(task_service, "_EXTRACTION_POOL", broken)
+    mocker.patch.object(task_service, "_extraction_executor", return_value=fresh)
+    fake_case_service.extract_history_inputs = AsyncMock(side_effect=[BrokenProcessPool(), ("details", False)])
+    stages = task_service._HistoryPipelineStages(fake_case_service, {}, Mock(), Mock(), executor=broken)
+
+    # Act
+    work = await stages.extract({"task_id": "T1", "case_id": "C1", "inputs": {"pdfs": []}})
+
+    # Assert
+    assert (work["details"], work["extraction_failed"]) == ("details", False)
+    assert task_service._EXTRACTION_POOL is None
+    broken.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+    assert fake_case_service.extract_history_inputs.await_args_list[1].args[1] is fresh
+
+
+@pytest.mark.asyncio
+async def test_extract_falls_back_to_threads_when_pools_keep_breaking(fake_case_service, mocker):
+    # Arrange
+    mocker.patch.object(task_service, "_extraction_executor", side_effect=lambda: Mock())
+    fake_case_service.extract_history_inputs = AsyncMock(
+        side_effect=[BrokenProcessPool(), BrokenProcessPool(), ("details", False)]
+    )
+    stages = task_service._HistoryPipelineStages(fake_case_service, {}, Mock(), Mock(), executor=Mock())
+
+    # Act
+    work = await stages.extract({"task_id": "T1", "case_id": "C1", "inputs": {"pdfs": []}})
+
+    # Assert
+    assert work["details"] == "details"
+    assert fake_case_service.extract_history_inputs.await_args_list[2].args[1] is None
+
+
+@pytest.mark.asyncio
+async def test_single_history_run_records_a_deferral(fake_case_service, mocker):
+    # Arrange: the model circuit is open and the case was handed to a later run
+    fake_case_service.proceed_with_model_history_files = AsyncMock(return_value={
+        "error": "Model unavailable, analysis deferred", "deferred": True, "retry_after_seconds": 30,
+        "deferred_task_id": "T-retry"
+    })
+    record_stage = mocker.patch.object(task_service, "_record_stage")
+
+    # Act
+    task_id = task_service.submit_case_history("C1")
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+    # Assert
+    status = task_service.get_task_status(task_id)
+    assert status["state"] == "DEFERRED"
+    assert status["result"] == {"case_id": "C1", "success": False, "deferred": True, "deferred_task_id": "T-retry"}
+    assert record_stage.call_args.kwargs["error"] is True
@@ -0,0 +1,140 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from app.service import task_service
+from app.service.task_registry import TaskRegistry
+
+
+def test_create_and_get_many_round_trip(fake_task_registry: TaskRegistry):
+    # Arrange
+    fake_task_registry.create(["T1", "T2"], enqueued_at="2024-01-01T00:00:00+00:00", meta={"step": "queued"})
+
+    # Act
+    tasks = fake_task_registry.get_many(["T1", "missing", "T2"])
+
+    # Assert
+    assert tasks[0] == {"id": "T1", "state": "PENDING", "meta": {"step": "queued"}, "enqueued_at": "2024-01-01T00:00:00+00:00"}
+    assert tasks[1] is None
+    assert tasks[2]["id"] == "T2"
+    assert fake_task_registry.caching_service.redis.ttls == {"task:T1": 3600, "task:T2": 3600}
+
+
+def test_finished_tasks_are_never_overwritten(fake_task_registry: TaskRegistry):
+    # Arrange
+    fake_task_registry.create(["T1"], enqueued_at="now")
+    fake_task_registry.update("T1", state="SUCCESS", result={"case_id": "C1", "success": True})
+
+    # Act
+    applied = fake_task_registry.update_many([("T1", {"state": "FAILURE", "error": "Batch aborted"}), ("unknown", {"state": "RUNNING"})])
+
+    # Assert
+    assert applied == [False, False]
+    assert fake_task_registry.get("T1")["state"] == "SUCCESS"
+    assert fake_task_registry.get("unknown") is None
+
+
+def test_status_of_unknown_and_finished_tasks(fake_task_registry: TaskRegistry):
+    # Arrange
+    fake_task_registry.create(["T1"], enqueued_at="now")
+    fake_task_registry.update("T1", state="FAILURE", error="boom")
+
+    # Act
+    statuses = task_service.get_tasks_status(["T1", "T2"])
+
+    # Assert
+    assert statuses[0] == {"id": "T1", "state": "FAILURE", "meta": None, "ready": True, "result": None, "error": "boom"}
+    assert statuses[1]["state"] == "NOT_FOUND"
+
+
+def test_applied_updates_are_published(fake_task_registry: TaskRegistry):
+    # Arrange
+    fake_task_registry.create(["T1"], enqueued_at="now")
+
+    # Act
+    fake_task_registry.update("T1", state="RUNNING", meta={"step": "analyze"})
+    fake_task_registry.update("T1", state="SUCCESS")
+    fake_task_registry.update("T1", state="FAILURE")
+
+    # Assert: the refused update is not announced
+    assert fake_task_registry.caching_service.redis.published == [
+        ("task:events:T1", {"id": "T1", "state": "RUNNING", "meta": {"step": "analyze"}}),
+        ("task:events:T1", {"id": "T1", "state": "SUCCESS"}),
+    ]
+
+
+class _FakeSubscription():
+    def __init__(self, events):
+        self.events = list(events)
+        self.closed = False
+
+    async def next_event(self, timeout_seconds):
+        return self.events.pop(0) if self.events else None
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_watch_tasks_streams_snapshot_then_updates_until_finished(fake_task_registry: TaskRegistry, mocker):
+    # Arrange
+    fake_task_registry.create(["T1", "T2"], enqueued_at="now")
+    fake_task_registry.update("T2", state="SUCCESS")
+    subscription = _FakeSubscription([None, {"id": "T1", "state": "RUNNING"}, {"id": "T1", "state": "FAILURE", "error": "boom"}])
+    mocker.patch.object(fake_task_registry, "subscribe", AsyncMock(return_value=subscription))
+
+    # Act
+    events = [(event, data) async for event, data in task_service.watch_tasks(["T1", "T2", "T3"])]
+
+    # Assert
+    assert [event for event, _ in events] == ["task", "task", "task", "ping", "update", "update", "end"]
+    assert [data["state"] for _, data in events[:3]] == ["PENDING", "SUCCESS", "NOT_FOUND"]
+    assert events[5][1] == {"id": "T1", "state": "FAILURE", "error": "boom"}
+    assert subscription.closed
+
+
+@pytest.mark.asyncio
+async def test_watch_tasks_heartbeat_ends_stream_on_missed_events_and_expired_tasks(fake_task_registry: TaskRegistry, mocker):
+    # Arrange: once watching, T1 finishes without its event arriving and T2 expires
+    fake_task_registry.create(["T1", "T2"], enqueued_at="now")
+    redis = fake_task_registry.caching_service.redis
+
+    class _SilentSubscription(_FakeSubscription):
+        async def next_event(self, timeout_seconds):
+            fake_task_registry.update("T1", state="SUCCESS")
+            redis.hashes = {key: value for key, value in redis.hashes.items() if "T2" not in key}
+            return None
+
+    subscription = _SilentSubscription([])
+    mocker.patch.object(fake_task_registry, "subscribe", AsyncMock(return_value=subscription))
+
+    # Act
+    events = [(event, data) async for event, data in task_service.watch_tasks(["T1", "T2"])]
+
+    # Assert
+    assert [event for event, _ in events] == ["task", "task", "ping", "task", "end"]
+    assert (events[3][1]["id"], events[3][1]["state"]) == ("T1", "SUCCESS")
+    assert subscription.closed
+
+
+@pytest.mark.asyncio
+async def test_watch_tasks_ends_after_max_seconds(fake_task_registry: TaskRegistry, mocker):
+    # Arrange: a task that never finishes
+    fake_task_registry.create(["T1"], enqueued_at="now")
+
+    class _SlowSubscription(_FakeSubscription):
+        async def next_event(self, timeout_seconds):
+            await asyncio.sleep(0.02)
+            return None
+
+    mocker.patch.object(fake_task_registry, "subscribe", AsyncMock(return_value=_SlowSubscription([])))
+
+    # Act
+    events = await asyncio.wait_for(_collect(task_service.watch_tasks(["T1"], max_seconds=0.05)), timeout=1)
+
+    # Assert
+    assert events[0] == "task" and events[-1] == "end"
+    assert set(events[1:-1]) == {"ping"}
+
+
+async def _collect(stream):
+    return [event async for event, _ in stream]
@@ -0,0 +1,136 @@
+import asyncio
+import pytest
+from app.service.task_scheduler import AdaptiveConcurrency, FairScheduler
+from app.utils.metrics import metrics
+
+
+async def _run_all(scheduler: FairScheduler, jobs):
+    """Start jobs (name, tenant, priority) in order while a blocker holds every slot; return the service order."""
+    order = []
+    release = asyncio.Event()
+
+    async def blocker():
+        async with scheduler.slot("blocker"):
+            await release.wait()
+
+    async def job(name, tenant, priority):
+        async with scheduler.slot(tenant, priority):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    blockers = [asyncio.create_task(blocker()) for _ in range(scheduler.limit)]
+    await asyncio.sleep(0)
+    tasks = [asyncio.create_task(job(*j)) for j in jobs]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(*blockers, *tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_higher_priority_is_served_first():
+    scheduler = FairScheduler(limit=1)
+
+    order = await _run_all(scheduler, [("bulk-1", "T1", "bulk"), ("normal-1", "T1", "normal"), ("high-1", "T2", "high")])
+
+    assert order == ["high-1", "normal-1", "bulk-1"]
+
+
+@pytest.mark.asyncio
+async def test_tenants_share_slots_fairly_within_a_priority():
+    scheduler = FairScheduler(limit=1)
+    jobs = [(f"A{i}", "A", "bulk") for i in range(4)] + [("B0", "B", "bulk"), ("B1", "B", "bulk")]
+
+    order = await _run_all(scheduler, jobs)
+
+    # B arrives after A's whole backlog but alternates with it
+    assert order == ["A0", "B0", "A1", "B1", "A2", "A3"]
+
+
+@pytest.mark.asyncio
+async def test_weights_give_a_tenant_a_larger_share():
+    scheduler = FairScheduler(limit=1, tenant_weights={"A": 2})
+    jobs = [(f"A{i}", "A", "bulk") for i in range(4)] + [(f"B{i}", "B", "bulk") for i in range(2)]
+
+    order = await _run_all(scheduler, jobs)
+
+    assert order == ["A0", "B0", "A1", "A2", "B1", "A3"]
+
+
+@pytest.mark.asyncio
+async def test_tenant_cap_leaves_slots_for_others():
+    # Arrange
+    metrics.reset()
+    scheduler = FairScheduler(limit=3, tenant_caps={"A": 1})
+    release = asyncio.Event()
+
+    async def job(tenant):
+        async with scheduler.slot(tenant):
+            await release.wait()
+
+    # Act
+    tasks = [asyncio.create_task(job("A")) for _ in range(3)] + [asyncio.create_task(job("B"))]
+    await asyncio.sleep(0)
+    stats = scheduler.stats()
+    release.set()
+    await asyncio.gather(*tasks)
+
+    # Assert: A holds one slot despite three free, B gets another
+    assert stats["in_use"] == 2
+    assert stats["tenants"]["A"] == {"queued": {"normal": 2}, "running": 1}
+    assert stats["tenants"]["B"] == {"queued": {}, "running": 1}
+    assert metrics.get("task_queue_wait_seconds", tenant="A", priority="normal")["count"] == 3
+    assert scheduler.stats()["in_use"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    scheduler = FairScheduler(limit=1)
+    release = asyncio.Event()
+
+    async def holder():
+        async with scheduler.slot("A"):
+            await release.wait()
+
+    async def waiter():
+        async with scheduler.slot("B"):
+            pass
+
+    held = asyncio.create_task(holder())
+    waiting = asyncio.create_task(waiter())
+    await asyncio.sleep(0)
+    waiting.cancel()
+    await asyncio.gather(waiting, return_exceptions=True)
+    release.set()
+    await held
+
+    assert scheduler.stats() == {"limit": 1, "in_use": 0, "tenants": {}}
+
+
+def test_adaptive_limit_grows_on_fast_stages_and_halves_on_slow_or_failed_ones(mocker):
+    # Arrange
+    metrics.reset()
+    clock = mocker.patch("app.service.task_scheduler.time.monotonic", return_value=100.0)
+    scheduler = FairScheduler(limit=4)
+    adaptive = AdaptiveConcurrency(scheduler, floor=2, ceiling=6, stage_targets={"model": 30})
+
+    # Act / Assert: one slot per limit's worth of fast completions, capped at the ceiling
+    for _ in range(4):
+        adaptive.record("model", 5.0)
+    assert scheduler.limit == 5
+    for _ in range(20):
+        adaptive.record("model", 5.0)
+    assert scheduler.limit == 6
+
+    # a stage over its target halves the limit, further signals in the cooldown do not
+    adaptive.record("model", 45.0)
+    adaptive.record("save", 1.0, error=True)
+    assert scheduler.limit == 3
+
+    clock.return_value = 200.0
+    adaptive.record("save", 1.0, error=True)
+    assert scheduler.limit == 2
+    assert metrics.get("task_runner_concurrency_limit") == 2
+    assert metrics.get("task_stage_errors_total", stage="save") == 2
+    assert metrics.get("task_stage_slow_total", stage="model") == 1
+    assert metrics.get("task_stage_seconds", stage="model")["count"] == 25
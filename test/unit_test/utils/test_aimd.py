@@ -0,0 +1,29 @@
+from app.utils.aimd import AIMDController
+
+
+def test_additive_increase_up_to_maximum():
+    controller = AIMDController(initial=2, minimum=1, maximum=3, increase=0.5)
+
+    controller.on_success(0.1, now=0)
+    controller.on_success(0.1, now=1)
+    controller.on_success(0.1, now=2)
+
+    assert controller.value == 3
+
+
+def test_multiplicative_decrease_once_per_cooldown():
+    controller = AIMDController(initial=8, minimum=1, maximum=8, cooldown_seconds=1.0)
+
+    controller.on_overload(now=10.0)
+    controller.on_overload(now=10.5)  # same overload episode
+    controller.on_overload(now=11.5)
+
+    assert controller.value == 2
+
+
+def test_slow_success_counts_as_overload():
+    controller = AIMDController(initial=4, minimum=1, maximum=4, latency_target_seconds=5)
+
+    controller.on_success(9.0, now=0)
+
+    assert controller.value == 2
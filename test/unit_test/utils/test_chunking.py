@@ -0,0 +1,24 @@
+from app.utils.chunking import estimate_tokens, split_into_chunks
+
+
+def test_estimate_tokens_uses_chars_per_token():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+
+def test_split_keeps_documents_together_when_they_fit():
+    text = "a" * 30 + "\n\n" + "b" * 30 + "\n\n" + "c" * 30
+
+    chunks = split_into_chunks(text, max_tokens=16)  # 64 chars
+
+    assert chunks == ["a" * 30 + "\n\n" + "b" * 30, "c" * 30]
+
+
+def test_split_falls_back_to_hard_cuts_and_respects_budget():
+    text = "x" * 100
+
+    chunks = split_into_chunks(text, max_tokens=10)
+
+    assert "".join(chunks) == text
+    assert all(estimate_tokens(chunk) <= 10 for chunk in chunks)
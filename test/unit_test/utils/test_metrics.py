@@ -0,0 +1,25 @@
+from app.utils.metrics import MetricsRegistry
+
+
+def test_render_prometheus():
+    registry = MetricsRegistry()
+    registry.incr("calls_total", model="flash")
+    registry.incr("calls_total", model="flash")
+    registry.set_gauge("in_flight", 3)
+    registry.observe("latency_seconds", 0.5, tier="fast")
+    registry.observe("latency_seconds", 1.5, tier="fast")
+
+    text = registry.render_prometheus()
+
+    assert 'calls_total{model="flash"} 2' in text
+    assert "in_flight 3" in text
+    assert 'latency_seconds_count{tier="fast"} 2' in text
+    assert 'latency_seconds_sum{tier="fast"} 2.0' in text
+    assert 'latency_seconds_max{tier="fast"} 1.5' in text
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.incr("errors_total", reason='bad "json"')
+
+    assert 'errors_total{reason="bad \\"json\\""} 1' in registry.render_prometheus()
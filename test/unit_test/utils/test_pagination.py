@@ -0,0 +1,51 @@
+import json
+import pytest
+from app.utils.pagination import encode_cursor, decode_cursor, clamp_limit, resolve_columns, to_ndjson, MAX_PAGE_SIZE
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("7b1d2f4e-0000-4000-8000-000000000001")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == "7b1d2f4e-0000-4000-8000-000000000001"
+
+
+def test_decode_cursor_none_when_missing():
+    assert decode_cursor(None) is None
+    assert decode_cursor("") is None
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30", "eyJpZCI6IDF9"])  # garbage, {}, {"id": 1}
+def test_decode_cursor_rejects_malformed(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("limit, expected", [(None, 100), (0, 100), (-5, 100), (20, 20), (10_000, MAX_PAGE_SIZE)])
+def test_clamp_limit(limit, expected):
+    assert clamp_limit(limit) == expected
+
+
+def test_resolve_columns_defaults_and_adds_id():
+    allowed = ("id", "name", "status")
+    assert resolve_columns(None, allowed, "id, name") == "id, name"
+    assert resolve_columns("status, name, status", allowed, "id, name") == "id, status, name"
+
+
+def test_resolve_columns_rejects_unknown():
+    with pytest.raises(ValueError):
+        resolve_columns("name, secret", ("id", "name"), "id, name")
+
+
+@pytest.mark.asyncio
+async def test_to_ndjson_ends_a_failed_export_with_an_error():
+    async def rows():
+        yield {"id": "a"}
+        raise RuntimeError("page failed")
+
+    lines = []
+    with pytest.raises(RuntimeError):
+        async for line in to_ndjson(rows()):
+            lines.append(json.loads(line))
+
+    assert lines[0] == {"id": "a"}
+    assert lines[1] == {"error": "Export incomplete: page failed"}
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from app.utils.pipeline import Stage, StagePipeline
+
+
+@pytest.mark.asyncio
+async def test_slow_stage_does_not_hold_back_the_stage_before_it():
+    # Arrange: the second stage blocks until the first has handled every item
+    first_done = asyncio.Event()
+    seen, finished = [], []
+
+    async def first(item):
+        seen.append(item)
+        if len(seen) == 4:
+            first_done.set()
+        return item
+
+    async def second(item):
+        await first_done.wait()
+        finished.append(item)
+
+    pipeline = StagePipeline("test", [Stage("first", first, 1, queue_size=4), Stage("second", second, 1, queue_size=4)])
+
+    # Act
+    await asyncio.wait_for(pipeline.run(range(4)), timeout=1)
+
+    # Assert
+    assert finished == [0, 1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_failed_and_finished_items_leave_the_pipeline():
+    # Arrange
+    errors, passed = [], []
+
+    async def check(item):
+        if item == 2:
+            raise ValueError("bad item")
+        return None if item == 3 else item
+
+    async def collect(item):
+        passed.append(item)
+
+    pipeline = StagePipeline(
+        "test",
+        [Stage("check", check, 2), Stage("collect", collect, 1)],
+        on_error=lambda stage, item, error: errors.append((stage, item, str(error)))
+    )
+
+    # Act
+    await pipeline.run(range(5))
+
+    # Assert
+    assert sorted(passed) == [0, 1, 4]
+    assert errors == [("check", 2, "bad item")]
+
+
+@pytest.mark.asyncio
+async def test_stage_runs_up_to_its_concurrency():
+    # Arrange
+    running, peak = 0, 0
+
+    async def work(item):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    # Act
+    await StagePipeline("test", [Stage("work", work, 3)]).run(range(10))
+
+    # Assert
+    assert peak == 3
@@ -0,0 +1,5 @@
+from app.utils.sse import format_sse
+
+
+def test_format_sse_frames_json_payload():
+    assert format_sse("stage", {"stage": "saving"}) == 'event: stage\ndata: {"stage": "saving"}\n\n'
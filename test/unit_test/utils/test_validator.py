@@ -0,0 +1,42 @@
+from app.utils.validator import Validator
+
+
+def _valid():
+    return {"decision": "APPROVED", "reasoning": "ok", "confidence": 90, "riskScore": "LOW", "flags": ["STANDARD_PROCESSING"]}
+
+
+def test_validate_rejects_out_of_schema_values():
+    validator = Validator()
+
+    assert validator.validate_gemini_data(_valid()) == (True, _valid())
+    assert validator.validate_gemini_data({**_valid(), "decision": "MAYBE"})[0] is False
+    assert validator.validate_gemini_data({**_valid(), "confidence": 150})[0] is False
+    assert validator.validate_gemini_data({**_valid(), "flags": ["MADE_UP"]})[0] is False
+
+
+def test_repair_strips_fences_prose_and_trailing_commas():
+    text = (
+        "Here is the analysis:\n```json\n"
+        '{"decision": "approved", "reasoning": "ok", "confidence": "90%", '
+        '"riskScore": "low", "flags": ["standard processing", "MADE_UP",],}\n'
+        "```\nLet me know if you need more."
+    )
+
+    is_valid, data = Validator().repair_gemini_response(text)
+
+    assert is_valid is True
+    assert data == _valid()
+
+
+def test_repair_accepts_python_style_literals():
+    text = "{'decision': 'REVIEW_REQUIRED', 'reasoning': 'x', 'confidence': 55.0, 'riskScore': 'HIGH', 'flags': []}"
+
+    is_valid, data = Validator().repair_gemini_response(text)
+
+    assert is_valid is True
+    assert data["decision"] == "REVIEW_REQUIRED"
+    assert data["confidence"] == 55
+
+
+def test_repair_fails_without_json_object():
+    assert Validator().repair_gemini_response("I cannot help with that.") == (False, "No JSON object found")